@@ -1,4 +1,26 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import GeocodedPlace, GeocodeQuery, PlaceSearch, PointOfInterest
 
+
+@admin.register(GeocodedPlace)
+class GeocodedPlaceAdmin(admin.ModelAdmin):
+    list_display = ('formatted', 'place_id', 'latitude', 'longitude', 'updated_at')
+    search_fields = ('name', 'formatted', 'place_id')
+
+
+@admin.register(GeocodeQuery)
+class GeocodeQueryAdmin(admin.ModelAdmin):
+    list_display = ('query', 'place', 'created_at')
+    search_fields = ('query',)
+
+
+@admin.register(PointOfInterest)
+class PointOfInterestAdmin(admin.ModelAdmin):
+    list_display = ('name', 'place_id', 'geohash', 'updated_at')
+    search_fields = ('name', 'place_id')
+
+
+@admin.register(PlaceSearch)
+class PlaceSearchAdmin(admin.ModelAdmin):
+    list_display = ('categories', 'geohash', 'radius', 'limit', 'result_count', 'fetched_at')
@@ -0,0 +1,511 @@
+"""
+Cache backends for the travel API.
+"""
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+LRU = 'lru'
+LFU = 'lfu'
+
+# Namespace of keys that match none of the configured prefixes
+OTHER = 'other'
+
+
+class TieredCache(BaseCache):
+    """
+    Two-tier cache: a small in-process cache (L1) in front of a SQLite file on
+    local disk (L2) shared by every worker process on the node.
+
+    Writes go to both tiers. Reads try L1, then L2; an L2 hit is promoted
+    into L1. L1 is split into namespaces by key prefix (geocode_, weather_,
+    hotels_ and so on), each holding at most its quota of bytes, so a few
+    large hotel lists cannot push out thousands of small geocodes. Entry
+    sizes are approximate: the pickled value and key plus a fixed overhead.
+    When a namespace is over its quota, its least recently (LRU) or least
+    frequently (LFU) used entries are demoted, i.e. dropped from L1 while
+    L2 keeps them. L1 entries live at most L1_TIMEOUT seconds, which bounds
+    how stale a worker can be after another worker overwrites or deletes a
+    key. add() is decided by L2 alone so it stays atomic across processes.
+
+    The async methods answer L1 hits inline and run L2 queries on a thread
+    pool, rather than through the single thread BaseCache hands every async
+    call to, so concurrent requests do not queue behind each other's disk reads.
+
+    Options:
+        L1_QUOTAS: bytes of L1 per key prefix, e.g. {'hotels': 8 << 20};
+            keys matching no prefix share the 'other' quota
+        L1_DEFAULT_QUOTA: bytes of L1 for a namespace without a quota
+            (default 4 MiB)
+        L1_EVICTION: 'lru' or 'lfu' (default 'lru')
+        L1_TIMEOUT: longest time an entry stays in L1 (default 60 seconds)
+        MAX_ENTRIES: entries kept in the on-disk tier (default 100000)
+        CULL_FREQUENCY: fraction (1/n) of L2 culled when full (default 3)
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location: str, params: Dict):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 60))
+        quotas = {name: int(quota) for name, quota in options.get('L1_QUOTAS', {}).items()}
+        default_quota = int(options.get('L1_DEFAULT_QUOTA', 4 << 20))
+        quotas.setdefault(OTHER, default_quota)
+        eviction = str(options.get('L1_EVICTION', LRU)).lower()
+        if eviction not in (LRU, LFU):
+            raise ImproperlyConfigured(f"L1_EVICTION must be '{LRU}' or '{LFU}', not {eviction!r}")
+        self._eviction = eviction
+        # Longest prefix first, so 'reverse_geocode' would win over 'reverse'
+        self._prefixes: List[str] = sorted((name for name in quotas if name != OTHER), key=len, reverse=True)
+
+        # Django creates a cache instance per thread; like LocMemCache, the
+        # tiers and counters live at module level so the whole process shares them
+        with _tiers_lock:
+            if location not in _tiers:
+                _tiers[location] = _Tiers(
+                    location, self._max_entries, self._cull_frequency, quotas, eviction
+                )
+            tiers = _tiers[location]
+        self._l1 = tiers.l1
+        self._l1_lock = tiers.l1_lock
+        self._l2 = tiers.l2
+        self._stats = tiers.stats
+        self._stats_lock = tiers.stats_lock
+
+    # ------------------------
+    # Cache API
+    # ------------------------
+    def get(self, key, default=None, version=None):
+        namespace = self._namespace(key)
+        key = self.make_and_validate_key(key, version=version)
+
+        value = self._l1_get(namespace, key)
+        if value is not None:
+            self._count('l1', 'hits', namespace=namespace)
+            return pickle.loads(value)
+        self._count('l1', 'misses')
+        return self._l2_get(namespace, key, default)
+
+    def _l2_get(self, namespace: str, key: str, default=None):
+        entry = self._l2.get(key)
+        if entry is None:
+            self._count('l2', 'misses', namespace=namespace)
+            return default
+
+        self._count('l2', 'hits', namespace=namespace)
+        value, expires = entry
+        self._l1_set(namespace, key, value, expires)
+        self._count('l1', 'promotions')
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        namespace = self._namespace(key)
+        key = self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None and expires <= time.time():
+            self._l1_delete(namespace, key)
+            self._l2.delete(key)
+            return
+
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        self._l2.set(key, pickled, expires)
+        self._count('l2', 'sets')
+        self._l1_set(namespace, key, pickled, expires)
+        self._count('l1', 'sets', namespace=namespace)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        namespace = self._namespace(key)
+        key = self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None and expires <= time.time():
+            return False
+
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        if not self._l2.add(key, pickled, expires):
+            return False
+        self._count('l2', 'sets')
+        self._l1_set(namespace, key, pickled, expires)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        namespace = self._namespace(key)
+        key = self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        self._l1_delete(namespace, key)
+        return self._l2.touch(key, expires)
+
+    def delete(self, key, version=None):
+        namespace = self._namespace(key)
+        key = self.make_and_validate_key(key, version=version)
+        self._l1_delete(namespace, key)
+        return self._l2.delete(key)
+
+    def has_key(self, key, version=None):
+        namespace = self._namespace(key)
+        key = self.make_and_validate_key(key, version=version)
+        return self._l1_get(namespace, key) is not None or self._l2.get(key) is not None
+
+    def clear(self):
+        with self._l1_lock:
+            for namespace in self._l1.values():
+                namespace.clear()
+        self._l2.clear()
+
+    # ------------------------
+    # Async cache API
+    # ------------------------
+    async def aget(self, key, default=None, version=None):
+        namespace = self._namespace(key)
+        key = self.make_and_validate_key(key, version=version)
+
+        value = self._l1_get(namespace, key)
+        if value is not None:
+            self._count('l1', 'hits', namespace=namespace)
+            return pickle.loads(value)
+        self._count('l1', 'misses')
+        return await _in_pool(self._l2_get)(namespace, key, default)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        await _in_pool(self.set)(key, value, timeout, version)
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await _in_pool(self.add)(key, value, timeout, version)
+
+    async def atouch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return await _in_pool(self.touch)(key, timeout, version)
+
+    async def adelete(self, key, version=None):
+        return await _in_pool(self.delete)(key, version)
+
+    async def ahas_key(self, key, version=None):
+        namespace = self._namespace(key)
+        key = self.make_and_validate_key(key, version=version)
+        if self._l1_get(namespace, key) is not None:
+            return True
+        return await _in_pool(self._l2.get)(key) is not None
+
+    async def aclear(self):
+        await _in_pool(self.clear)()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-tier hit, miss, promotion and demotion counters for this process,
+        and the size, demotions and hit ratio of each L1 namespace
+        """
+        with self._stats_lock:
+            stats = {tier: dict(counters) for tier, counters in self._stats.items() if tier != 'namespaces'}
+            namespaces = {name: dict(counters) for name, counters in self._stats['namespaces'].items()}
+        with self._l1_lock:
+            stats['l1']['entries'] = sum(len(namespace) for namespace in self._l1.values())
+            stats['l1']['bytes'] = sum(namespace.size for namespace in self._l1.values())
+            for name, namespace in self._l1.items():
+                namespaces.setdefault(name, {}).update(
+                    entries=len(namespace),
+                    bytes=namespace.size,
+                    max_bytes=namespace.max_bytes,
+                    demotions=namespace.evictions,
+                    too_large=namespace.too_large
+                )
+        stats['l1']['max_bytes'] = sum(namespace.max_bytes for namespace in self._l1.values())
+        stats['l1']['eviction'] = self._eviction
+        stats['l2']['entries'] = self._l2.count()
+        stats['l2']['max_entries'] = self._max_entries
+        for counters in stats.values():
+            lookups = counters['hits'] + counters['misses']
+            counters['hit_ratio'] = round(counters['hits'] / lookups, 4) if lookups else None
+        stats['namespaces'] = {}
+        for name, counters in namespaces.items():
+            l1_hits = counters.pop('l1_hits', 0)
+            hits = l1_hits + counters.pop('l2_hits', 0)
+            misses = counters.pop('l2_misses', 0)
+            lookups = hits + misses
+            stats['namespaces'][name] = {
+                'hits': hits,
+                'misses': misses,
+                'sets': counters.pop('l1_sets', 0),
+                **counters,
+                'hit_ratio': round(hits / lookups, 4) if lookups else None,
+                'l1_hit_ratio': round(l1_hits / lookups, 4) if lookups else None,
+            }
+        return stats
+
+    def _namespace(self, key: str) -> str:
+        """The L1 namespace of a raw cache key, by its prefix"""
+        key = str(key)
+        for prefix in self._prefixes:
+            if key.startswith(prefix):
+                return prefix
+        return OTHER
+
+    # ------------------------
+    # L1
+    # ------------------------
+    def _l1_get(self, namespace: str, key: str) -> Optional[bytes]:
+        with self._l1_lock:
+            return self._l1[namespace].get(key)
+
+    def _l1_set(self, namespace: str, key: str, value: bytes, expires: Optional[float]) -> None:
+        l1_expires = time.time() + self._l1_timeout
+        if expires is not None:
+            l1_expires = min(l1_expires, expires)
+
+        with self._l1_lock:
+            demoted = self._l1[namespace].set(key, value, l1_expires)
+        if demoted:
+            self._count('l1', 'demotions', demoted)
+
+    def _l1_delete(self, namespace: str, key: str) -> None:
+        with self._l1_lock:
+            self._l1[namespace].delete(key)
+
+    def _count(self, tier: str, counter: str, amount: int = 1, namespace: Optional[str] = None) -> None:
+        with self._stats_lock:
+            self._stats[tier][counter] += amount
+            if namespace is not None:
+                counters = self._stats['namespaces'].setdefault(namespace, {})
+                name = f"{tier}_{counter}"
+                counters[name] = counters.get(name, 0) + amount
+
+
+def _in_pool(fn):
+    # The SQLite store keeps a connection per thread, so any thread will do
+    return sync_to_async(fn, thread_sensitive=False)
+
+
+class _Namespace:
+    """L1 entries under one key prefix, bounded by their approximate size in bytes"""
+
+    # Bytes an entry costs beyond its key and pickled value: the dict slots,
+    # the entry list and its numbers
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, name: str, max_bytes: int, policy: str):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.size = 0
+        self.evictions = 0
+        self.too_large = 0
+        # key -> [value, expires, size, uses], least recently used first
+        self._entries: 'OrderedDict[str, List]' = OrderedDict()
+        # For LFU, keys by use count, each least recently used first. Every
+        # L1 entry expires within L1_TIMEOUT, so counts need no ageing.
+        self._by_uses: Dict[int, 'OrderedDict[str, None]'] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            self.delete(key)
+            return None
+        self._used(key, entry)
+        return entry[0]
+
+    def set(self, key: str, value: bytes, expires: float) -> int:
+        """Store an entry, returning how many others were demoted to make room"""
+        size = sys.getsizeof(value) + sys.getsizeof(key) + self.ENTRY_OVERHEAD
+        old = self._entries.get(key)
+        if size > self.max_bytes:
+            # Larger than the whole quota; L2 still holds it
+            self.too_large += 1
+            self.delete(key)
+            return 0
+
+        if old is None:
+            self._entries[key] = [value, expires, size, 1]
+            if self.policy == LFU:
+                self._by_uses.setdefault(1, OrderedDict())[key] = None
+        else:
+            # An overwritten entry keeps its uses, so refreshing a popular
+            # key does not make it the next to go
+            self.size -= old[2]
+            old[:3] = value, expires, size
+            self._used(key, old)
+        self.size += size
+
+        demoted = 0
+        while self.size > self.max_bytes:
+            self.delete(self._victim(key))
+            demoted += 1
+        self.evictions += demoted
+        return demoted
+
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry[2]
+        if self.policy == LFU:
+            self._unlink(key, entry[3])
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_uses.clear()
+        self.size = 0
+
+    def _used(self, key: str, entry: List) -> None:
+        self._entries.move_to_end(key)
+        if self.policy == LFU:
+            self._unlink(key, entry[3])
+            entry[3] += 1
+            self._by_uses.setdefault(entry[3], OrderedDict())[key] = None
+
+    def _unlink(self, key: str, uses: int) -> None:
+        keys = self._by_uses[uses]
+        del keys[key]
+        if not keys:
+            del self._by_uses[uses]
+
+    def _victim(self, spare: str) -> str:
+        """The entry to demote next, other than spare, the one just stored"""
+        if self.policy == LFU:
+            # A new entry has the fewest uses; without sparing it, it would
+            # go at once whenever the namespace is full
+            for uses in sorted(self._by_uses):
+                for key in self._by_uses[uses]:
+                    if key != spare:
+                        return key
+        for key in self._entries:
+            if key != spare:
+                return key
+        raise KeyError(spare)
+
+
+class _Tiers:
+    """State of one TieredCache location shared by all its instances"""
+
+    def __init__(self, location: str, max_entries: int, cull_frequency: int, quotas: Dict[str, int],
+                 eviction: str):
+        self.l1 = {name: _Namespace(name, quota, eviction) for name, quota in quotas.items()}
+        self.l1_lock = threading.Lock()
+        self.l2 = _SQLiteStore(location, max_entries, cull_frequency)
+        self.stats = {
+            'l1': {'hits': 0, 'misses': 0, 'sets': 0, 'promotions': 0, 'demotions': 0},
+            'l2': {'hits': 0, 'misses': 0, 'sets': 0},
+            'namespaces': {},
+        }
+        self.stats_lock = threading.Lock()
+
+
+_tiers: Dict[str, _Tiers] = {}
+_tiers_lock = threading.Lock()
+
+
+class _SQLiteStore:
+    """Key-value table in a SQLite file in WAL mode, shared across processes"""
+
+    # Check the table size every this many writes rather than on each one
+    CULL_CHECK_INTERVAL = 100
+
+    def __init__(self, location: str, max_entries: int, cull_frequency: int):
+        self._path = str(location)
+        self._max_entries = max_entries
+        self._cull_frequency = cull_frequency
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._ensure_table(connection)
+        return connection
+
+    def _ensure_table(self, connection: sqlite3.Connection) -> None:
+        with self._init_lock:
+            if self._initialized:
+                return
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+            self._initialized = True
+
+    def get(self, key: str):
+        row = self._connection().execute(
+            'SELECT value, expires FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone()
+        return row
+
+    def set(self, key: str, value: bytes, expires: Optional[float]) -> None:
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (key, value, expires)
+        )
+        self._maybe_cull()
+
+    def add(self, key: str, value: bytes, expires: Optional[float]) -> bool:
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires IS NOT NULL AND expires <= ?',
+                (key, time.time())
+            )
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                (key, value, expires)
+            ).rowcount == 1
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        if added:
+            self._maybe_cull()
+        return added
+
+    def touch(self, key: str, expires: Optional[float]) -> bool:
+        return self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (expires, key, time.time())
+        ).rowcount == 1
+
+    def delete(self, key: str) -> bool:
+        return self._connection().execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+
+    def clear(self) -> None:
+        self._connection().execute('DELETE FROM cache')
+
+    def count(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def _maybe_cull(self) -> None:
+        with self._writes_lock:
+            self._writes += 1
+            if self._writes % self.CULL_CHECK_INTERVAL:
+                return
+
+        connection = self._connection()
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),)
+        )
+        count = self.count()
+        if count > self._max_entries and self._cull_frequency:
+            # Drop the entries closest to expiry first
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,)
+            )
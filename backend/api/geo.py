@@ -0,0 +1,115 @@
+"""
+Geohash and distance helpers for spatial lookups.
+"""
+import math
+from typing import List, Tuple
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_M = 6371000
+
+# Rough metres per degree, used to size geohash cells
+METERS_PER_DEGREE_LAT = 110574
+METERS_PER_DEGREE_LON = 111320
+
+
+def encode(lat: float, lon: float, precision: int = 9) -> str:
+    """Encode coordinates as a geohash of the given length"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit, ch, even = 0, 0, True
+
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch = (ch << 1) | 1
+            rng[0] = mid
+        else:
+            ch = ch << 1
+            rng[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(BASE32[ch])
+            bit, ch = 0, 0
+
+    return ''.join(chars)
+
+
+def decode(geohash: str) -> Tuple[float, float, float, float]:
+    """Decode a geohash to (lat, lon, lat_error, lon_error) of its cell centre"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        bits = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (bits >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+
+    return (
+        (lat_range[0] + lat_range[1]) / 2,
+        (lon_range[0] + lon_range[1]) / 2,
+        (lat_range[1] - lat_range[0]) / 2,
+        (lon_range[1] - lon_range[0]) / 2,
+    )
+
+
+def cell_size_m(precision: int, lat: float = 0.0) -> Tuple[float, float]:
+    """Approximate (height, width) in metres of a geohash cell at a latitude"""
+    bits = precision * 5
+    lat_bits = bits // 2
+    lon_bits = bits - lat_bits
+    height = 180 / (2 ** lat_bits) * METERS_PER_DEGREE_LAT
+    width = 360 / (2 ** lon_bits) * METERS_PER_DEGREE_LON * math.cos(math.radians(lat))
+    return height, width
+
+
+def precision_for_radius(lat: float, radius_m: float, max_precision: int = 9) -> int:
+    """Longest geohash whose cells are at least radius_m on both sides"""
+    precision = 1
+    for candidate in range(1, max_precision + 1):
+        height, width = cell_size_m(candidate, lat)
+        if min(height, width) < radius_m:
+            break
+        precision = candidate
+    return precision
+
+
+def neighbors(geohash: str) -> List[str]:
+    """The cell itself plus its eight neighbours"""
+    lat, lon, lat_err, lon_err = decode(geohash)
+    cells = []
+    for dlat in (-1, 0, 1):
+        for dlon in (-1, 0, 1):
+            n_lat = lat + dlat * 2 * lat_err
+            n_lon = lon + dlon * 2 * lon_err
+            if n_lat > 90 or n_lat < -90:
+                continue
+            n_lon = (n_lon + 180) % 360 - 180
+            cell = encode(n_lat, n_lon, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def cover_circle(lat: float, lon: float, radius_m: float) -> List[str]:
+    """Geohash prefixes whose cells together cover a circle"""
+    precision = precision_for_radius(lat, radius_m)
+    return neighbors(encode(lat, lon, precision))
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in metres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
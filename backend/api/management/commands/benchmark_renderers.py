@@ -0,0 +1,147 @@
+"""
+Compare the response renderers on realistic payloads.
+"""
+import gzip
+import time
+from typing import Callable, Dict, List
+
+from django.core.management.base import BaseCommand
+from rest_framework import renderers as drf_renderers
+
+from api import renderers
+from api.services.hotels_service import HotelsService
+from api.services.travel_service import TravelService
+
+
+class Command(BaseCommand):
+    help = (
+        "Time DRF's JSONRenderer against the API's JSON and MessagePack renderers "
+        "on payloads shaped like travel info and hotels responses, and report the "
+        "encoded and gzipped sizes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500, help='Renders per renderer and payload (default: 500)')
+
+    def handle(self, *args, **options):
+        iterations = max(1, options['iterations'])
+        candidates = {
+            'drf json': drf_renderers.JSONRenderer(),
+            'json': renderers.JSONRenderer(),
+        }
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed; json falls back to the standard library'))
+        if renderers.msgpack is not None:
+            candidates['msgpack'] = renderers.MessagePackRenderer()
+        else:
+            self.stdout.write(self.style.WARNING('msgpack is not installed; skipping MessagePack'))
+
+        for name, payload in self._payloads().items():
+            self.stdout.write(f"\n{name}")
+            self.stdout.write(f"  {'renderer':<10} {'us/render':>10} {'speedup':>8} {'bytes':>8} {'gzipped':>8}")
+            baseline = None
+            for label, renderer in candidates.items():
+                per_render = self._time(lambda: renderer.render(payload, renderer.media_type, {}), iterations)
+                baseline = baseline or per_render
+                body = renderer.render(payload, renderer.media_type, {})
+                self.stdout.write(
+                    f"  {label:<10} {per_render * 1e6:>10.1f} {baseline / per_render:>7.1f}x "
+                    f"{len(body):>8} {len(gzip.compress(body)):>8}"
+                )
+
+    def _time(self, render: Callable, iterations: int) -> float:
+        """Best of three runs, in seconds per render"""
+        best = float('inf')
+        for _ in range(3):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                render()
+            best = min(best, (time.perf_counter() - started) / iterations)
+        return best
+
+    def _payloads(self) -> Dict[str, Dict]:
+        # Built with the services' own parsers from upstream-shaped data, so
+        # the payloads have the keys, nesting and value types the API sends
+        travel = TravelService()
+        hotels = HotelsService()._parse_hotels({'features': self._features(10, 'accommodation.hotel')})
+        info = {
+            'place': {
+                'name': 'Paris',
+                'formatted_address': 'Paris, Ile-de-France, France',
+                'coordinates': {'latitude': 48.8588897, 'longitude': 2.3200410217200766},
+                'details': travel._parse_place_details({'features': self._features(20, 'tourism.sights')})
+            },
+            'images': travel._parse_images({'results': [self._photo(i) for i in range(10)]}),
+            'weather': travel._parse_weather({
+                'main': {'temp': 18.42, 'feels_like': 17.9, 'humidity': 63, 'pressure': 1014},
+                'weather': [{'description': 'scattered clouds', 'icon': '03d'}],
+                'wind': {'speed': 4.12}
+            }),
+            'attractions': travel._parse_attractions({'features': self._features(15, 'tourism.attraction')}),
+            'distance': travel._parse_route('London, UK', 'Paris', {
+                'routes': [{'summary': {'distance': 463521.7, 'duration': 21142.3}}]
+            }),
+            'timestamp': time.time(),
+            'hotels': hotels
+        }
+        return {
+            'travel info': info,
+            'hotels (10)': {'total': len(hotels), 'hotels': hotels},
+        }
+
+    def _photo(self, i: int) -> Dict:
+        base = f"https://images.unsplash.com/photo-1502602898657-3e91760cbb3{i}"
+        return {
+            'id': f"nnzkZNYWHaU{i}",
+            'urls': {
+                'regular': f"{base}?crop=entropy&cs=tinysrgb&fit=max&fm=jpg&ixid=M3w1NjQ&ixlib=rb-4.0.3&q=80&w=1080",
+                'thumb': f"{base}?crop=entropy&cs=tinysrgb&fit=max&fm=jpg&ixid=M3w1NjQ&ixlib=rb-4.0.3&q=80&w=200",
+                'full': f"{base}?crop=entropy&cs=srgb&fm=jpg&ixid=M3w1NjQ&ixlib=rb-4.0.3&q=85"
+            },
+            'user': {'name': f"Photographer {i}", 'links': {'html': f"https://unsplash.com/@photographer{i}"}},
+            'description': 'Eiffel Tower seen from the Trocadéro at sunset',
+            'alt_description': 'brown and white concrete building',
+            'width': 4000 + i,
+            'height': 6000 - i
+        }
+
+    def _features(self, count: int, category: str) -> List[Dict]:
+        features = []
+        for i in range(count):
+            lon, lat = 2.2945 + i * 0.0013, 48.8584 - i * 0.0009
+            features.append({
+                'geometry': {'coordinates': [lon, lat]},
+                'properties': {
+                    'name': f"Place {i} de la Concorde",
+                    'formatted': f"{i} Rue de Rivoli, 75001 Paris, France",
+                    'categories': [category.split('.')[0], category, 'building', 'wheelchair.limited'],
+                    'distance': 120 + i * 37,
+                    'place_id': f"51a3d8a1f7c0e0024059c8{i:04d}f1e46d484f40f00103f9",
+                    'website': f"https://example{i}.fr",
+                    'contact': {'phone': f"+33 1 42 60 {i:02d} {i:02d}", 'email': f"info{i}@example.fr"},
+                    # Geoapify's datasource carries the raw OpenStreetMap tags
+                    'datasource': {
+                        'sourcename': 'openstreetmap',
+                        'attribution': '© OpenStreetMap contributors',
+                        'license': 'Open Database License',
+                        'url': 'https://www.openstreetmap.org/copyright',
+                        'raw': {
+                            'name': f"Place {i} de la Concorde",
+                            'osm_id': 240109189 + i,
+                            'osm_type': 'w',
+                            'tourism': category.split('.')[-1],
+                            'building': 'yes',
+                            'wheelchair': 'limited',
+                            'addr:street': 'Rue de Rivoli',
+                            'addr:postcode': '75001',
+                            'addr:housenumber': str(i),
+                            'opening_hours': 'Mo-Su 09:00-18:00',
+                            'wikidata': f"Q{243 + i}",
+                            'wikipedia': 'fr:Place de la Concorde',
+                            'stars': 4,
+                            'rooms': 120 + i
+                        }
+                    }
+                }
+            })
+        return features
@@ -0,0 +1,200 @@
+"""
+Pre-populate the travel caches for a list of destinations.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Set
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import GeocodeQuery
+from api.services.batch_service import TravelBatch
+from api.services.geocoding_service import normalize_place
+from api.services.rate_limiter import patient, rate_limiter
+from api.services.travel_service import TravelService
+
+
+class Command(BaseCommand):
+    help = (
+        "Warm the geocode, weather, images, attractions, place details and hotels "
+        "caches for popular destinations, through the same services the API uses. "
+        "Run it against the cache the web workers share (the on-disk tier of the "
+        "default cache), e.g. after a deploy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('places', nargs='*', help='Places to warm')
+        parser.add_argument(
+            '--file', help="File with one place per line; blank lines and lines starting with '#' are skipped"
+        )
+        parser.add_argument(
+            '--recent', type=int, default=0,
+            help='Also warm the N places most recently geocoded for the first time'
+        )
+        parser.add_argument(
+            '--fields', help=f"Comma-separated sections to warm (default: all of {', '.join(TravelService.SECTIONS)})"
+        )
+        parser.add_argument('--concurrency', type=int, help='Places warmed at a time (default: TRAVEL_BATCH_CONCURRENCY)')
+        parser.add_argument(
+            '--max-wait', type=float, default=30,
+            help='Seconds an upstream call may wait for its rate-limit budget (default: 30)'
+        )
+        parser.add_argument(
+            '--progress-file',
+            help=(
+                'Where warmed places are recorded, so an interrupted run resumes where it stopped '
+                '(default: a file in the temp directory named after the places and fields)'
+            )
+        )
+        parser.add_argument('--restart', action='store_true', help='Ignore the progress of an earlier run')
+
+    def handle(self, *args, **options):
+        places = self._places(options)
+        if not places:
+            raise CommandError('No places to warm; pass places, --file or --recent')
+
+        fields = self._fields(options['fields'])
+        progress_file = options['progress_file'] or self._default_progress_file(places, fields)
+        if options['restart'] and os.path.exists(progress_file):
+            os.remove(progress_file)
+
+        done = self._read_progress(progress_file)
+        pending = [place for place in places if normalize_place(place) not in done]
+        if len(pending) < len(places):
+            self.stdout.write(f"Resuming: {len(places) - len(pending)} of {len(places)} places already warmed")
+        if not pending:
+            self._finish(progress_file)
+            self.stdout.write(self.style.SUCCESS('All places already warmed'))
+            return
+
+        with patient(options['max_wait']):
+            completed = asyncio.run(self._warm(pending, fields, options['concurrency'], progress_file))
+
+        if completed:
+            self._finish(progress_file)
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"Not all places were warmed; run the command again to resume from {progress_file}"
+            ))
+
+    def _places(self, options) -> List[str]:
+        places = list(options['places'])
+        if options['file']:
+            try:
+                with open(options['file'], encoding='utf-8') as f:
+                    places += [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+            except OSError as e:
+                raise CommandError(f"Cannot read {options['file']}: {e}")
+        if options['recent']:
+            places += list(
+                GeocodeQuery.objects.order_by('-created_at').values_list('query', flat=True)[:options['recent']]
+            )
+
+        # One entry per distinct place, in the order given
+        unique = {}
+        for place in places:
+            unique.setdefault(normalize_place(place), place)
+        unique.pop('', None)
+        return list(unique.values())
+
+    def _fields(self, raw: Optional[str]) -> Optional[Set[str]]:
+        if not raw:
+            return None
+        fields = {name.strip().lower() for name in raw.split(',') if name.strip()}
+        unknown = fields - set(TravelService.SECTIONS)
+        if unknown:
+            raise CommandError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return fields
+
+    def _default_progress_file(self, places: List[str], fields: Optional[Set[str]]) -> str:
+        # One file per place list and fields, so runs for other lists do not
+        # resume from each other's progress
+        run = json.dumps([sorted(normalize_place(place) for place in places), sorted(fields or [])])
+        digest = hashlib.sha1(run.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(tempfile.gettempdir(), f"warm_travel_cache-{digest}.progress")
+
+    async def _warm(self, places: List[str], fields: Optional[Set[str]], concurrency: Optional[int],
+                    progress_file: str) -> bool:
+        """
+        Warm places concurrently, recording each one that is done with.
+
+        Returns:
+            True if every place was warmed or not found, False if the run
+            stopped because an upstream budget ran out or some places failed
+            and should be tried again
+        """
+        batch = TravelBatch([(place, None) for place in places], fields, concurrency)
+        started = time.monotonic()
+        denied = sum(rate_limiter.denied().values())
+        warmed = not_found = failed = 0
+
+        results = batch.results()
+        with open(progress_file, 'a', encoding='utf-8') as progress:
+            async for entry in results:
+                count = warmed + not_found + failed + 1
+                place = entry['place']
+                elapsed = time.monotonic() - started
+
+                # A call that found no budget left means this place, and
+                # possibly others in flight, lack sections; stop and let a
+                # later run pick them up again
+                now_denied = sum(rate_limiter.denied().values())
+                if entry['status'] == 503 or now_denied > denied:
+                    self.stdout.write(self.style.WARNING(
+                        f"[{count}/{len(places)}] {place}: upstream budget spent, stopping"
+                    ))
+                    # Cancels the places still in flight
+                    await results.aclose()
+                    return False
+
+                if entry['status'] == 200:
+                    incomplete = self._incomplete_sections(entry['result'])
+                    if incomplete:
+                        # Skipped, stale or possibly failed; a later run may do better
+                        failed += 1
+                        self.stdout.write(self.style.WARNING(
+                            f"[{count}/{len(places)}] {place}: incomplete {', '.join(incomplete)}"
+                        ))
+                        continue
+                    warmed += 1
+                    self.stdout.write(f"[{count}/{len(places)}] {place}: warmed ({elapsed:.1f}s)")
+                else:
+                    error = entry['result'].get('error', 'failed')
+                    self.stdout.write(self.style.WARNING(f"[{count}/{len(places)}] {place}: {error}"))
+                    if entry['status'] != 404:
+                        # Upstream failed or was too slow; a later run may do better
+                        failed += 1
+                        continue
+                    # Not found; warming it again would not help
+                    not_found += 1
+                progress.write(normalize_place(place) + '\n')
+                progress.flush()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {warmed} places in {time.monotonic() - started:.1f}s"
+            + (f", {not_found} not found" if not_found else '')
+            + (f", {failed} failed" if failed else '')
+        ))
+        return not failed
+
+    def _incomplete_sections(self, info: Dict) -> List[str]:
+        """Sections of a warmed place that were not fetched, were stale or came back empty"""
+        partial = info.get('partial', {})
+        incomplete = partial.get('skipped', []) + partial.get('stale', [])
+        return incomplete + [name for name in TravelService().empty_sections(info) if name not in incomplete]
+
+    def _read_progress(self, progress_file: str) -> Set[str]:
+        try:
+            with open(progress_file, encoding='utf-8') as f:
+                return {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def _finish(self, progress_file: str) -> None:
+        # The run is complete, so the next one starts over
+        if os.path.exists(progress_file):
+            os.remove(progress_file)
@@ -1,4 +1,85 @@
 from django.db import models
 
-# Add models here if needed in the future
 
+class GeocodedPlace(models.Model):
+    """A place resolved by the Geoapify geocoder, keyed by its provider place_id"""
+
+    place_id = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255, blank=True)
+    formatted = models.CharField(max_length=512, blank=True)
+    country = models.CharField(max_length=255, null=True, blank=True)
+    city = models.CharField(max_length=255, null=True, blank=True)
+    state = models.CharField(max_length=255, null=True, blank=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    geohash = models.CharField(max_length=12, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.formatted or self.name
+
+
+class GeocodeQuery(models.Model):
+    """A normalized place string and the place it geocoded to"""
+
+    query = models.CharField(max_length=255, unique=True)
+    place = models.ForeignKey(GeocodedPlace, on_delete=models.CASCADE, related_name='queries')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.query
+
+
+class PointOfInterest(models.Model):
+    """A hotel, restaurant or attraction fetched from Geoapify Places"""
+
+    place_id = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255, blank=True)
+    categories = models.JSONField(default=list)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    geohash = models.CharField(max_length=12, db_index=True)
+    # Raw Geoapify feature properties, so stored POIs parse like live results
+    properties = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name or self.place_id
+
+
+class PlaceSearch(models.Model):
+    """A Geoapify places query whose results are held in PointOfInterest"""
+
+    categories = models.CharField(max_length=512)
+    geohash = models.CharField(max_length=12)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    radius = models.PositiveIntegerField()
+    limit = models.PositiveIntegerField()
+    result_count = models.PositiveIntegerField()
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['categories', 'geohash', 'radius', 'limit'],
+                name='unique_place_search'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.categories} within {self.radius}m of {self.geohash}"
+
+
+class ProviderBudget(models.Model):
+    """Token bucket and daily call count of an upstream API, shared by all workers"""
+
+    provider = models.CharField(max_length=32, unique=True)
+    tokens = models.FloatField()
+    # Unix time the bucket was last refilled
+    refilled_at = models.FloatField()
+    day = models.DateField()
+    used_today = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.provider}: {self.used_today} calls on {self.day}"
@@ -0,0 +1,106 @@
+"""
+Renderers for the API.
+
+JSONRenderer encodes with orjson when it is installed, which takes a
+fraction of the CPU time of the standard library encoder on the large
+travel info and hotels payloads, and falls back to DRF's encoder otherwise.
+MessagePackRenderer answers clients that send `Accept: application/msgpack`
+with MessagePack, which is smaller still; it is offered only when the
+msgpack package is installed. `python manage.py benchmark_renderers`
+compares them on realistic payloads.
+
+Streaming endpoints write their events straight into a StreamingHttpResponse
+with ndjson_line/sse_event. The streaming renderers let DRF accept the
+matching Accept headers and render any plain Response from those endpoints,
+such as a validation error, in the same format.
+"""
+import json
+from typing import Any
+from rest_framework import renderers
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Types orjson and msgpack cannot encode themselves (Decimal, lazy
+# translations, querysets...) are converted as DRF's encoder does
+_encoder = JSONEncoder()
+
+
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON, as DRF's JSONRenderer writes it"""
+    if orjson is None:
+        return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # Dates and times are left to DRF's encoder too, which writes UTC as Z
+    # and cuts microseconds to milliseconds
+    return orjson.dumps(
+        data, default=_encoder.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
+
+def ndjson_line(data: Any) -> str:
+    """One newline-delimited JSON line"""
+    return dumps(data).decode('utf-8') + '\n'
+
+
+def sse_event(event: str, data: Any) -> str:
+    """One server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """DRF's JSONRenderer, encoding with orjson when it is installed"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        # orjson cannot indent by an arbitrary amount; leave that to DRF
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context)):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = dumps(data)
+        # As DRF does, escape the line separators JavaScript treats as newlines
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return ndjson_line(data).encode(self.charset)
+
+
+class EventStreamRenderer(BaseRenderer):
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        event = 'error' if isinstance(data, dict) and 'error' in data else 'message'
+        return sse_event(event, data).encode(self.charset)
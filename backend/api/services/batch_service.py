@@ -0,0 +1,102 @@
+"""
+Travel info for many destinations in one request.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+
+from .executor import cancel_and_wait, stream_from
+from .geocoding_service import normalize_place
+from .errors import UpstreamUnavailable, unavailable_error
+from .request_memo import cancel_pending, memo_scope
+from .travel_service import AsyncTravelService
+
+logger = logging.getLogger(__name__)
+
+
+class TravelBatch:
+    """
+    Runs AsyncTravelService for a list of (place, user_location) items.
+
+    Items whose normalized place and user location are equal are computed
+    once. All items share one request memo, so a place or user location that
+    appears in several items is geocoded once, and at most `concurrency`
+    items run at a time. Results are yielded as each item finishes.
+    """
+
+    def __init__(self, items: List[Tuple[str, Optional[str]]], fields: Optional[Iterable[str]] = None,
+                 concurrency: Optional[int] = None):
+        self.items = items
+        self.fields = fields
+        self.concurrency = concurrency or getattr(settings, 'TRAVEL_BATCH_CONCURRENCY', 8)
+
+    def _groups(self) -> Dict[Tuple[str, str], List[int]]:
+        """Indexes of the items, grouped by normalized (place, user_location)"""
+        groups = {}
+        for index, (place, user_location) in enumerate(self.items):
+            key = (normalize_place(place), normalize_place(user_location or ''))
+            groups.setdefault(key, []).append(index)
+        return groups
+
+    def results(self) -> AsyncIterator[Dict]:
+        """
+        Yield one entry per item, in completion order.
+
+        Each entry holds the item's index, place and user_location, an HTTP
+        style status and either the travel info or an error.
+        """
+        # Not wrapped in a generator of its own, so that closing the results
+        # closes stream_from's at once and the batch is cancelled
+        return stream_from(self._run)
+
+    async def _run(self, emit: Callable[[Dict], None]) -> None:
+        # Every item task inherits this memo scope
+        with memo_scope():
+            semaphore = asyncio.Semaphore(self.concurrency)
+            service = AsyncTravelService()
+            tasks = [
+                asyncio.ensure_future(self._run_group(service, semaphore, indexes, emit))
+                for indexes in self._groups().values()
+            ]
+            try:
+                # Unlike gather, wait leaves the items running when this is
+                # cancelled; the cancellation below then reaches each of them
+                # once, as a second one would interrupt their cleanup
+                if tasks:
+                    await asyncio.wait(tasks)
+                for task in tasks:
+                    task.result()
+            finally:
+                # The client went away before the batch finished; let the
+                # items wind down so their single-flight locks are released
+                await cancel_and_wait(set(tasks))
+                await cancel_pending()
+
+    async def _run_group(self, service: AsyncTravelService, semaphore: asyncio.Semaphore,
+                         indexes: List[int], emit: Callable[[Dict], None]) -> None:
+        place, user_location = self.items[indexes[0]]
+        async with semaphore:
+            try:
+                result = await service.get_travel_info(place, user_location, self.fields)
+                status = 404 if 'error' in result else 200
+            except UpstreamUnavailable as e:
+                result = unavailable_error(e)
+                status = 503
+            except Exception as e:
+                logger.error(f"Error in travel batch for {place}: {str(e)}", exc_info=True)
+                result = {
+                    'error': 'An error occurred while fetching travel information',
+                    'details': str(e)
+                }
+                status = 500
+
+        for index in indexes:
+            item_place, item_user_location = self.items[index]
+            emit({
+                'index': index,
+                'place': item_place,
+                'user_location': item_user_location or None,
+                'status': status,
+                'result': result
+            })
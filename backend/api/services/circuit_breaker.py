@@ -0,0 +1,195 @@
+"""
+Circuit breakers around upstream endpoints.
+
+Each provider endpoint (say geoapify /v2/places, or openweather onecall) has
+a breaker in every worker process that watches the outcome of its recent
+calls. A call fails when it raises, returns a 5xx or takes longer than
+CIRCUIT_BREAKER_SLOW_CALL seconds. Once enough recent calls failed, the
+breaker opens. While it is open, calls raise CircuitOpen at once instead of
+waiting on the upstream timeout, and callers take their fallback: cached
+data, mock weather or routes, or leaving the section out.
+
+After CIRCUIT_BREAKER_OPEN_SECONDS the breaker half-opens and lets a few
+probe calls through. The breaker closes again if they succeed, or opens for
+another period if they fail.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from django.conf import settings
+
+from .errors import UpstreamUnavailable
+from .rate_limiter import provider_for
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(UpstreamUnavailable):
+    """An upstream call was not sent because its endpoint keeps failing"""
+
+    reason = 'Upstream is failing'
+
+
+class CircuitBreaker:
+    """Failure-rate and latency breaker for one upstream endpoint"""
+
+    def __init__(self, name: str, provider: str):
+        self.name = name
+        self.provider = provider
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes = 0
+        # (time, failed) of recent calls
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def window(self) -> float:
+        return getattr(settings, 'CIRCUIT_BREAKER_WINDOW', 60)
+
+    @property
+    def min_calls(self) -> int:
+        return getattr(settings, 'CIRCUIT_BREAKER_MIN_CALLS', 5)
+
+    @property
+    def failure_rate(self) -> float:
+        return getattr(settings, 'CIRCUIT_BREAKER_FAILURE_RATE', 0.5)
+
+    @property
+    def slow_call(self) -> float:
+        return getattr(settings, 'CIRCUIT_BREAKER_SLOW_CALL', 3.0)
+
+    @property
+    def open_seconds(self) -> float:
+        return getattr(settings, 'CIRCUIT_BREAKER_OPEN_SECONDS', 30)
+
+    @property
+    def max_probes(self) -> int:
+        return getattr(settings, 'CIRCUIT_BREAKER_PROBES', 1)
+
+    def check(self) -> None:
+        """Raise CircuitOpen while the breaker is open, without admitting a call"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state != OPEN or now >= self.opened_at + self.open_seconds:
+                return
+            self._rejected += 1
+            retry_after = self.opened_at + self.open_seconds - now
+        raise CircuitOpen(self.provider, retry_after)
+
+    def before_call(self) -> None:
+        """Admit a call, or raise CircuitOpen"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == OPEN and now >= self.opened_at + self.open_seconds:
+                self.state = HALF_OPEN
+                logger.info(f"Circuit {self.name} half-open, probing")
+            if self.state == HALF_OPEN and self.probes < self.max_probes:
+                self.probes += 1
+                return
+            self._rejected += 1
+            retry_after = max(0.0, self.opened_at + self.open_seconds - now)
+        raise CircuitOpen(self.provider, retry_after)
+
+    def record(self, failed: Optional[bool], latency: float = 0.0) -> None:
+        """
+        Record the outcome of an admitted call.
+
+        Args:
+            failed: Whether the call failed, or None if it never reached
+                upstream (it was cancelled or rate limited)
+            latency: Seconds the call took; slow calls count as failed
+        """
+        if failed is not None and latency > self.slow_call:
+            failed = True
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probes = max(0, self.probes - 1)
+                if failed is None:
+                    return
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    logger.info(f"Circuit {self.name} closed")
+                return
+
+            if failed is None:
+                return
+            self._outcomes.append((now, failed))
+            self._trim(now)
+            failures = sum(1 for _, outcome in self._outcomes if outcome)
+            if (self.state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open(now)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            calls = len(self._outcomes)
+            failures = sum(1 for _, outcome in self._outcomes if outcome)
+            return {
+                'state': self.state,
+                'recent_calls': calls,
+                'failure_rate': round(failures / calls, 2) if calls else 0.0,
+                'rejected': self._rejected
+            }
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self._outcomes.clear()
+        logger.warning(f"Circuit {self.name} open for {self.open_seconds:g}s")
+
+    def _trim(self, now: float) -> None:
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+
+class CircuitBreakers:
+    """The breakers of this process, one per provider endpoint"""
+
+    # Path segments that name an endpoint; later ones are arguments such as
+    # a Wikipedia article title
+    ENDPOINT_SEGMENTS = 3
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def for_url(self, url: Any) -> Optional[CircuitBreaker]:
+        """The breaker of the endpoint a URL calls, or None if it is not an upstream API"""
+        provider = provider_for(url)
+        if provider is None:
+            return None
+        segments = [segment for segment in urlsplit(str(url)).path.split('/') if segment]
+        name = f"{provider}:/{'/'.join(segments[:self.ENDPOINT_SEGMENTS])}"
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, provider)
+            return breaker
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.stats() for breaker in breakers}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._breakers.clear()
+
+
+circuit_breakers = CircuitBreakers()
@@ -0,0 +1,51 @@
+"""
+Quantization of client coordinates for cache keys.
+
+Coordinate-keyed lookups snap the point to the centre of its geohash cell,
+key the cache on the cell and fetch for the centre, so requests from nearby
+points share one entry. The cell size is set per data type in
+CACHE_KEY_GEOHASH_PRECISION: coarse for weather, finer for places lists,
+whose distances are then measured again from the caller's own position.
+"""
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+
+from .. import geo
+
+# Geohash length per data type: 5 is ~4.9 km, 6 ~1.2 km, 7 ~150 m, 8 ~38 m
+DEFAULT_PRECISION = {
+    'weather': 5,
+    'attractions': 6,
+    'hotels': 7,
+    'restaurants': 8,
+}
+
+
+def quantize(kind: str, lat: float, lon: float) -> Tuple[str, float, float]:
+    """Return (geohash cell, centre latitude, centre longitude) for a point"""
+    precisions = getattr(settings, 'CACHE_KEY_GEOHASH_PRECISION', DEFAULT_PRECISION)
+    precision = precisions.get(kind, DEFAULT_PRECISION.get(kind, 9))
+    cell = geo.encode(lat, lon, precision)
+    centre_lat, centre_lon, _, _ = geo.decode(cell)
+    return cell, round(centre_lat, 6), round(centre_lon, 6)
+
+
+def measure_from(places: List[Dict], lat: float, lon: float,
+                 radius: Optional[float] = None) -> List[Dict]:
+    """
+    Copies of parsed places with 'distance' measured from (lat, lon), nearest
+    first, dropping those beyond radius if given.
+    """
+    measured = []
+    for place in places:
+        coords = place.get('coordinates') or {}
+        if 'latitude' not in coords or 'longitude' not in coords:
+            measured.append(place)
+            continue
+        distance = geo.haversine_m(lat, lon, coords['latitude'], coords['longitude'])
+        if radius is not None and distance > radius:
+            continue
+        measured.append({**place, 'distance': round(distance)})
+
+    measured.sort(key=lambda place: (place.get('distance') is None, place.get('distance') or 0))
+    return measured
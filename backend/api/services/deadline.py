@@ -0,0 +1,166 @@
+"""
+End-to-end deadlines for composite requests.
+
+A view opens a deadline around one request. Every upstream call made inside
+it, on the shared executor or in sibling asyncio tasks, has its timeout cut
+to the time left, and calls that would start with no time left are not sent:
+they raise DeadlineExceeded. Waits for a rate-limit token or for another
+worker's fetch are cut the same way, and the section fan-out stops waiting
+once the deadline passes, so the request answers in time with whichever
+sections finished.
+
+The deadline also records how each section fell short: sections that did not
+finish, or whose upstream call was cut, are skipped; sections answered from
+a stale cache entry are stale.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set
+
+from .errors import UpstreamUnavailable
+
+_deadline: ContextVar[Optional['Deadline']] = ContextVar('request_deadline', default=None)
+_section: ContextVar[Optional[str]] = ContextVar('request_section', default=None)
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """An upstream call was not sent, or was cut short, because the request ran out of time"""
+
+    reason = 'Request deadline exceeded'
+
+
+class Deadline:
+    """The time left for one request, and the sections it could not fully serve"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self.skipped: Set[str] = set()
+        self.stale: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def skip(self, section: Optional[str]) -> None:
+        if section:
+            with self._lock:
+                self.skipped.add(section)
+
+    def mark_stale(self, section: Optional[str]) -> None:
+        if section:
+            with self._lock:
+                self.stale.add(section)
+
+    def report(self) -> Dict[str, List[str]]:
+        with self._lock:
+            # A skipped fetch whose section was served from the cache is only stale
+            return {
+                'skipped': sorted(self.skipped - self.stale),
+                'stale': sorted(self.stale)
+            }
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """
+    Bound the upstream calls made inside the block to seconds from now.
+
+    An enclosing deadline that expires sooner stays in force. With seconds
+    None there is no new deadline.
+    """
+    current = _deadline.get()
+    if not seconds or (current is not None and current.expires_at <= time.monotonic() + seconds):
+        yield current
+        return
+
+    token = _deadline.set(Deadline(seconds))
+    try:
+        yield _deadline.get()
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def detached():
+    """Lift the request deadline inside the block, for work that outlives the request"""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one"""
+    current = _deadline.get()
+    return None if current is None else current.remaining()
+
+
+def expired() -> bool:
+    current = _deadline.get()
+    return current is not None and current.expired()
+
+
+def cap(seconds: float) -> float:
+    """seconds, cut to the time left before the current deadline"""
+    left = remaining()
+    return seconds if left is None else min(seconds, left)
+
+
+def call_timeout(timeout: Any, provider: str) -> Any:
+    """
+    The timeout for an upstream call, cut to the time left.
+
+    Raises:
+        DeadlineExceeded: If no time is left, marking the current section skipped
+    """
+    current = _deadline.get()
+    if current is None:
+        return timeout
+    left = current.remaining()
+    if left <= 0:
+        skip_section()
+        raise DeadlineExceeded(provider)
+    return left if not isinstance(timeout, (int, float)) else min(timeout, left)
+
+
+@contextmanager
+def section(name: str):
+    """Attribute what happens inside the block to the response section name"""
+    token = _section.set(name)
+    try:
+        yield
+    finally:
+        _section.reset(token)
+
+
+def skip_section() -> None:
+    """Record that the current section was cut short by the deadline"""
+    current = _deadline.get()
+    if current is not None:
+        current.skip(_section.get())
+
+
+def mark_stale() -> None:
+    """Record that the current section was served from a stale cache entry"""
+    current = _deadline.get()
+    if current is not None:
+        current.mark_stale(_section.get())
+
+
+def incomplete_sections() -> Optional[Dict[str, List[str]]]:
+    """Skipped and stale sections of the current request, or None if all were served fresh"""
+    current = _deadline.get()
+    if current is None:
+        return None
+    report = current.report()
+    return report if report['skipped'] or report['stale'] else None
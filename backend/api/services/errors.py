@@ -0,0 +1,25 @@
+"""
+Errors raised instead of sending an upstream call that cannot succeed.
+"""
+import math
+from typing import Dict, Optional
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream call was not sent; retry_after says when it may be, if known"""
+
+    reason = 'Upstream temporarily unavailable'
+
+    def __init__(self, provider: str, retry_after: Optional[float] = None):
+        self.provider = provider
+        self.retry_after = retry_after
+        super().__init__(f"{provider}: {self.reason}")
+
+
+def unavailable_error(error: UpstreamUnavailable) -> Dict:
+    """Response body for a request that could not be served for now"""
+    return {
+        'error': f"{error.reason}, try again later",
+        'provider': error.provider,
+        'retry_after': None if error.retry_after is None else math.ceil(error.retry_after)
+    }
@@ -0,0 +1,182 @@
+"""
+Fan-out helpers for independent upstream calls on the running event loop.
+
+Work that must outlive the request that starts it runs on the process-wide
+thread pool, or for coroutines on the process-wide event loop: under WSGI a
+request's own event loop is closed as soon as its view returns.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Tuple
+from django.conf import settings
+
+from . import deadline
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor = None
+_executor_lock = threading.Lock()
+
+_loop: asyncio.AbstractEventLoop = None
+_loop_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the shared executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'UPSTREAM_MAX_WORKERS', 32),
+                    thread_name_prefix='upstream'
+                )
+    return _executor
+
+
+def submit(fn: Callable, *args, **kwargs) -> Future:
+    """Run fn on the shared executor, carrying over the caller's context variables."""
+    context = contextvars.copy_context()
+    return get_executor().submit(context.run, fn, *args, **kwargs)
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop, starting its thread on first use."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='background-loop', daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def submit_async(fn: Callable[..., Awaitable], *args) -> Future:
+    """
+    Run coroutine function fn on the process-wide event loop.
+
+    Unlike submit, the caller's context variables are not carried over: the
+    coroutine runs apart from the request that started it.
+    """
+    # The task would otherwise start in a copy of the caller's context
+    return contextvars.Context().run(asyncio.run_coroutine_threadsafe, fn(*args), get_loop())
+
+
+async def agather_sections(tasks: Dict[str, Tuple[Awaitable, Any]]) -> Dict[str, Any]:
+    """
+    Await independent sections concurrently and collect their results.
+
+    Args:
+        tasks: Mapping of section name to (awaitable, default)
+
+    Returns:
+        Mapping of section name to its result, or its default if it raised
+        or did not finish before the request deadline
+    """
+    futures = {name: asyncio.ensure_future(_in_section(name, awaitable)) for name, (awaitable, _) in tasks.items()}
+    pending = set()
+    if futures:
+        _, pending = await asyncio.wait(futures.values(), timeout=deadline.remaining())
+        await cancel_and_wait(pending)
+
+    results = {}
+    for name, future in futures.items():
+        if future in pending:
+            deadline.current_deadline().skip(name)
+            results[name] = tasks[name][1]
+        elif future.cancelled():
+            results[name] = tasks[name][1]
+        elif future.exception() is not None:
+            logger.error(f"Error fetching {name}: {str(future.exception())}", exc_info=future.exception())
+            results[name] = tasks[name][1]
+        else:
+            results[name] = future.result()
+    return results
+
+
+async def _in_section(name: str, awaitable: Awaitable) -> Any:
+    # Runs in a task of its own, so the section only applies to this awaitable
+    with deadline.section(name):
+        return await awaitable
+
+
+async def aiter_sections(tasks: Dict[str, Tuple[Awaitable, Any]]) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Await independent sections concurrently, yielding each as it finishes.
+
+    Args:
+        tasks: Mapping of section name to (awaitable, default)
+
+    Yields:
+        (section name, result or its default if it raised), in completion order.
+        Sections still running at the request deadline are cancelled and not
+        yielded.
+    """
+    pending = {asyncio.ensure_future(_in_section(name, awaitable)): name for name, (awaitable, _) in tasks.items()}
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                for name in pending.values():
+                    deadline.current_deadline().skip(name)
+                break
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    yield name, future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching {name}: {str(e)}", exc_info=e)
+                    yield name, tasks[name][1]
+    finally:
+        await cancel_and_wait(pending)
+
+
+async def cancel_and_wait(futures) -> None:
+    """
+    Cancel futures and wait for them to wind down.
+
+    A cancelled section still runs its cleanup, such as releasing a
+    single-flight lock. Under WSGI each request has an event loop of its own
+    that is closed once the view returns, so cleanup left to run after that
+    never completes.
+    """
+    for future in futures:
+        future.cancel()
+    if futures:
+        await asyncio.wait(futures)
+
+
+async def stream_from(produce: Callable[[Callable[[Any], None]], Awaitable[None]]) -> AsyncIterator[Any]:
+    """
+    Iterate over the items a producer coroutine emits, as it emits them.
+
+    The producer runs in a task of its own and is given a callable to emit
+    items with. Context it sets up (such as a memo scope) therefore stays
+    within one task while the consumer is suspended between items, for
+    example while a streaming response writes each item out. The producer is
+    cancelled if the consumer stops early.
+    """
+    queue = asyncio.Queue()
+    done = object()
+
+    async def run():
+        try:
+            await produce(queue.put_nowait)
+        finally:
+            queue.put_nowait(done)
+
+    task = asyncio.ensure_future(run())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+        # Re-raise an error from the producer
+        await task
+    finally:
+        await cancel_and_wait({task})
@@ -0,0 +1,224 @@
+"""
+Geoapify geocoding shared by every service.
+"""
+import httpx
+import requests
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from typing import Dict, Optional
+
+from .http_client import get_async_client, get_session
+from .place_store import place_store
+from .rate_limiter import essential
+from .request_memo import amemoize, memoize
+from .single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_place(place: str) -> str:
+    """Normalize a place string so spelling variants share one cache entry"""
+    return ' '.join(unicodedata.normalize('NFKC', place).casefold().split())
+
+
+class UnresolvablePlaces:
+    """
+    Normalized place strings Geoapify could not resolve, held in process
+    memory so a repeated garbage query is answered without a cache lookup or
+    upstream call. Entries expire with NEGATIVE_CACHE_NOT_FOUND_TTL; the
+    oldest are dropped past UNRESOLVABLE_PLACES_MAX_ENTRIES.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Normalized place -> time it may be tried again
+        self._places: OrderedDict = OrderedDict()
+        self.rejected = 0
+
+    @property
+    def ttl(self) -> float:
+        return getattr(settings, 'NEGATIVE_CACHE_NOT_FOUND_TTL', 60 * 60)
+
+    @property
+    def max_entries(self) -> int:
+        return getattr(settings, 'UNRESOLVABLE_PLACES_MAX_ENTRIES', 10000)
+
+    def __contains__(self, normalized: str) -> bool:
+        with self._lock:
+            expires = self._places.get(normalized)
+            if expires is None:
+                return False
+            if expires <= time.monotonic():
+                del self._places[normalized]
+                return False
+            self.rejected += 1
+            return True
+
+    def add(self, normalized: str) -> None:
+        with self._lock:
+            self._places.pop(normalized, None)
+            self._places[normalized] = time.monotonic() + self.ttl
+            while len(self._places) > self.max_entries:
+                self._places.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._places), 'rejected': self.rejected}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._places.clear()
+            self.rejected = 0
+
+
+unresolvable_places = UnresolvablePlaces()
+
+
+class GeocodingService:
+    """
+    Resolves place names to coordinates with Geoapify.
+
+    Results are cached under a normalized place key, persisted in the place
+    store and memoized for the current request, so one composite request
+    geocodes each distinct place at most once no matter how many services
+    ask for it.
+    """
+
+    GEOCODE_URL = "https://api.geoapify.com/v1/geocode/search"
+
+    CACHE_TTL = 60 * 60 * 24  # Cache for 24 hours
+
+    def __init__(self, session: Optional[requests.Session] = None):
+        self.api_key = settings.GEOPI_API_KEY
+        self.session = session or get_session()
+
+    def geocode(self, place: str, strict: bool = False) -> Optional[Dict]:
+        """
+        Geocode a place name.
+
+        Args:
+            place: Place name or address
+            strict: Raise when Geoapify cannot be called or fails, rather
+                than return None as for an unknown place
+
+        Returns:
+            Dict with lat, lon, name, formatted, country, city and state,
+            or None if the place could not be resolved
+        """
+        normalized = normalize_place(place)
+        if not normalized or normalized in unresolvable_places:
+            return None
+
+        try:
+            result = memoize(
+                f"geocode:{normalized}",
+                lambda: single_flight.get_or_fetch(
+                    self._cache_key(normalized),
+                    lambda: self._fetch(place, normalized),
+                    self.CACHE_TTL
+                )
+            )
+        except Exception as e:
+            return self._failed(e, strict)
+        return self._resolved(normalized, result)
+
+    def _failed(self, error: Exception, strict: bool) -> None:
+        if strict:
+            raise error
+        logger.error(f"Geocoding error: {str(error)}")
+        return None
+
+    def _resolved(self, normalized: str, result: Optional[Dict]) -> Optional[Dict]:
+        if result is None:
+            unresolvable_places.add(normalized)
+        return result
+
+    def _fetch(self, place: str, normalized: str) -> Optional[Dict]:
+        stored = place_store.get_geocode(normalized)
+        if stored:
+            return stored
+
+        # Every endpoint needs the geocode, so it may use the reserved quota
+        with essential():
+            response = self.session.get(self.GEOCODE_URL, params=self._params(place), timeout=10)
+        response.raise_for_status()
+
+        result = self._parse(place, response.json())
+        if result:
+            place_store.save_geocode(normalized, result)
+        return result
+
+    def _cache_key(self, normalized: str) -> str:
+        return f"geocode_{normalized.replace(' ', '_')}"
+
+    def _params(self, place: str) -> Dict:
+        return {
+            'text': place,
+            'apiKey': self.api_key,
+            'limit': 1
+        }
+
+    def _parse(self, place: str, data: Dict) -> Optional[Dict]:
+        if not data.get('features'):
+            return None
+
+        feature = data['features'][0]
+        properties = feature['properties']
+        coords = feature['geometry']['coordinates']
+
+        return {
+            'lat': coords[1],
+            'lon': coords[0],
+            'name': properties.get('name', place),
+            'formatted': properties.get('formatted', place),
+            'country': properties.get('country'),
+            'city': properties.get('city'),
+            'state': properties.get('state'),
+            'place_id': properties.get('place_id')
+        }
+
+
+class AsyncGeocodingService(GeocodingService):
+    """Async counterpart of GeocodingService on the shared httpx client"""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__()
+        self.client = client or get_async_client()
+
+    async def geocode(self, place: str, strict: bool = False) -> Optional[Dict]:
+        """Geocode a place name."""
+        normalized = normalize_place(place)
+        if not normalized or normalized in unresolvable_places:
+            return None
+
+        try:
+            result = await amemoize(
+                f"geocode:{normalized}",
+                lambda: single_flight.aget_or_fetch(
+                    self._cache_key(normalized),
+                    lambda: self._fetch(place, normalized),
+                    self.CACHE_TTL
+                )
+            )
+        except Exception as e:
+            return self._failed(e, strict)
+        return self._resolved(normalized, result)
+
+    async def _fetch(self, place: str, normalized: str) -> Optional[Dict]:
+        stored = await sync_to_async(place_store.get_geocode)(normalized)
+        if stored:
+            return stored
+
+        with essential():
+            response = await self.client.get(self.GEOCODE_URL, params=self._params(place), timeout=10)
+        response.raise_for_status()
+
+        result = self._parse(place, response.json())
+        if result:
+            await sync_to_async(place_store.save_geocode)(normalized, result)
+        return result
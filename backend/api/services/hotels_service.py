@@ -1,9 +1,16 @@
+import httpx
 import requests
 import logging
 from django.conf import settings
-from django.core.cache import cache
 from typing import List, Dict, Optional
 
+from .geocoding_service import AsyncGeocodingService, GeocodingService, normalize_place
+from . import limited_results
+from .coordinates import measure_from, quantize
+from .http_client import get_async_client, get_session
+from .place_store import place_store
+from .request_memo import memo_scope
+
 logger = logging.getLogger(__name__)
 
 
@@ -12,142 +19,194 @@ class HotelsService:
     Professional service for fetching hotel information using Geoapify API
     """
 
-    def __init__(self):
+    CACHE_TTL = 60 * 60 * 6  # Cache for 6 hours
+
+    def __init__(self, session: Optional[requests.Session] = None):
         self.api_key = settings.GEOPI_API_KEY
         self.base_url = "https://api.geoapify.com/v2/places"
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': 'TravelAI/1.0'})
+        self.session = session or get_session()
+        self.geocoder = GeocodingService(self.session)
 
     def get_hotels(self, place: str, limit: int = 10) -> List[Dict]:
         """
         Get hotels near a specific place.
-        
+
         Args:
             place: Place name or address
             limit: Maximum number of hotels to return
-            
+
         Returns:
             List of hotel information
         """
-        cache_key = f"hotels_{place.lower().replace(' ', '_')}_{limit}"
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-
         try:
-            # First, geocode the place
-            coords = self._geocode_place(place)
-            if not coords:
-                return []
-
-            lat, lon = coords['lat'], coords['lon']
-
-            # Get hotels using Geoapify
-            hotels = self._fetch_hotels(lat, lon, limit)
-            
-            cache.set(cache_key, hotels, 60 * 60 * 6)  # Cache for 6 hours
-            return hotels
+            with memo_scope():
+                hotels = limited_results.get_or_fetch(
+                    self._hotels_cache_key(place),
+                    limit,
+                    lambda fetch_limit: self._fetch_place_hotels(place, fetch_limit),
+                    self.CACHE_TTL
+                )
+            return hotels or []
 
         except Exception as e:
             logger.error(f"Error in get_hotels: {str(e)}", exc_info=True)
             return []
 
+    def _fetch_place_hotels(self, place: str, limit: int) -> Optional[List[Dict]]:
+        # First, geocode the place
+        coords = self._geocode_place(place)
+        if not coords:
+            return None
+
+        # Get hotels using Geoapify
+        return self._fetch_hotels(coords['lat'], coords['lon'], limit)
+
+    def _hotels_cache_key(self, place: str) -> str:
+        # Holds the largest result fetched; smaller limits are sliced from it
+        return f"hotels_{normalize_place(place).replace(' ', '_')}"
+
     def _geocode_place(self, place: str) -> Optional[Dict]:
         """Geocode place to coordinates"""
-        try:
-            url = "https://api.geoapify.com/v1/geocode/search"
-            params = {
-                'text': place,
-                'apiKey': self.api_key,
-                'limit': 1
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get('features'):
-                coords = data['features'][0]['geometry']['coordinates']
-                return {
-                    'lat': coords[1],
-                    'lon': coords[0]
-                }
-
-        except Exception as e:
-            logger.error(f"Geocoding error: {str(e)}")
-            
-        return None
+        # Strict, so a failed geocode is not cached as a place without hotels
+        return self.geocoder.geocode(place, strict=True)
 
     def _fetch_hotels(self, lat: float, lon: float, limit: int) -> List[Dict]:
-        """Fetch hotels from Geoapify API"""
-        try:
-            params = {
-                'categories': 'accommodation.hotel,accommodation',
-                'filter': f'circle:{lon},{lat},10000',  # 10km radius
-                'limit': limit,
-                'apiKey': self.api_key
+        """Fetch hotels from the place store or Geoapify API; errors propagate to the caller"""
+        params = self._hotels_params(lat, lon, limit)
+        return self._parse_hotels(place_store.fetch_places(params, lambda: self._get_places(params)))
+
+    def _get_places(self, params: Dict) -> Dict:
+        response = self.session.get(self.base_url, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def _hotels_params(self, lat: float, lon: float, limit: int) -> Dict:
+        return {
+            'categories': 'accommodation.hotel,accommodation',
+            'filter': f'circle:{lon},{lat},10000',  # 10km radius
+            'bias': f'proximity:{lon},{lat}',  # Nearest first
+            'limit': limit,
+            'apiKey': self.api_key
+        }
+
+    def _parse_hotels(self, data: Dict) -> List[Dict]:
+        hotels = []
+        for feature in data.get('features', []):
+            props = feature['properties']
+            coords = feature['geometry']['coordinates']
+
+            hotel = {
+                'name': props.get('name', 'Unnamed Hotel'),
+                'address': props.get('formatted', 'Address not available'),
+                'coordinates': {
+                    'latitude': coords[1],
+                    'longitude': coords[0]
+                },
+                'distance': props.get('distance'),
+                'categories': props.get('categories', []),
+                'place_id': props.get('place_id'),
+                'datasource': props.get('datasource', {})
             }
-            
-            response = self.session.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            hotels = []
-            for feature in data.get('features', []):
-                props = feature['properties']
-                coords = feature['geometry']['coordinates']
-                
-                hotel = {
-                    'name': props.get('name', 'Unnamed Hotel'),
-                    'address': props.get('formatted', 'Address not available'),
-                    'coordinates': {
-                        'latitude': coords[1],
-                        'longitude': coords[0]
-                    },
-                    'distance': props.get('distance'),
-                    'categories': props.get('categories', []),
-                    'place_id': props.get('place_id'),
-                    'datasource': props.get('datasource', {})
-                }
-
-                # Add contact info if available
-                if 'contact' in props:
-                    hotel['contact'] = props['contact']
-
-                # Add website if available
-                if 'website' in props:
-                    hotel['website'] = props['website']
-
-                hotels.append(hotel)
-
-            return hotels
 
-        except Exception as e:
-            logger.error(f"Error fetching hotels: {str(e)}")
-            return []
+            # Add contact info if available
+            if 'contact' in props:
+                hotel['contact'] = props['contact']
+
+            # Add website if available
+            if 'website' in props:
+                hotel['website'] = props['website']
+
+            hotels.append(hotel)
+
+        return hotels
 
     def get_hotels_by_coordinates(self, lat: float, lon: float, limit: int = 10) -> List[Dict]:
         """
         Get hotels by latitude and longitude directly.
-        
+
         Args:
             lat: Latitude
             lon: Longitude
             limit: Maximum number of hotels
-            
+
         Returns:
             List of hotel information
         """
-        cache_key = f"hotels_coords_{lat}_{lon}_{limit}"
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
+        cell, cell_lat, cell_lon = quantize('hotels', lat, lon)
+        try:
+            hotels = limited_results.get_or_fetch(
+                self._hotels_coords_cache_key(cell),
+                limit,
+                lambda fetch_limit: self._fetch_hotels(cell_lat, cell_lon, fetch_limit),
+                self.CACHE_TTL
+            )
+            return measure_from(hotels or [], lat, lon)
+
+        except Exception as e:
+            logger.error(f"Error in get_hotels_by_coordinates: {str(e)}")
+            return []
+
+    def _hotels_coords_cache_key(self, cell: str) -> str:
+        return f"hotels_coords_{cell}"
+
+
+class AsyncHotelsService(HotelsService):
+    """Async counterpart of HotelsService on the shared httpx client"""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__()
+        self.client = client or get_async_client()
+        self.geocoder = AsyncGeocodingService(self.client)
+
+    async def get_hotels(self, place: str, limit: int = 10) -> List[Dict]:
+        """Get hotels near a specific place."""
+        try:
+            with memo_scope():
+                hotels = await limited_results.aget_or_fetch(
+                    self._hotels_cache_key(place),
+                    limit,
+                    lambda fetch_limit: self._fetch_place_hotels(place, fetch_limit),
+                    self.CACHE_TTL
+                )
+            return hotels or []
 
+        except Exception as e:
+            logger.error(f"Error in get_hotels: {str(e)}", exc_info=True)
+            return []
+
+    async def _fetch_place_hotels(self, place: str, limit: int) -> Optional[List[Dict]]:
+        coords = await self._geocode_place(place)
+        if not coords:
+            return None
+
+        return await self._fetch_hotels(coords['lat'], coords['lon'], limit)
+
+    async def _geocode_place(self, place: str) -> Optional[Dict]:
+        """Geocode place to coordinates"""
+        return await self.geocoder.geocode(place, strict=True)
+
+    async def _fetch_hotels(self, lat: float, lon: float, limit: int) -> List[Dict]:
+        """Fetch hotels from the place store or Geoapify API; errors propagate to the caller"""
+        params = self._hotels_params(lat, lon, limit)
+        return self._parse_hotels(await place_store.afetch_places(params, lambda: self._get_places(params)))
+
+    async def _get_places(self, params: Dict) -> Dict:
+        response = await self.client.get(self.base_url, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_hotels_by_coordinates(self, lat: float, lon: float, limit: int = 10) -> List[Dict]:
+        """Get hotels by latitude and longitude directly."""
+        cell, cell_lat, cell_lon = quantize('hotels', lat, lon)
         try:
-            hotels = self._fetch_hotels(lat, lon, limit)
-            cache.set(cache_key, hotels, 60 * 60 * 6)  # Cache for 6 hours
-            return hotels
+            hotels = await limited_results.aget_or_fetch(
+                self._hotels_coords_cache_key(cell),
+                limit,
+                lambda fetch_limit: self._fetch_hotels(cell_lat, cell_lon, fetch_limit),
+                self.CACHE_TTL
+            )
+            return measure_from(hotels or [], lat, lon)
 
         except Exception as e:
             logger.error(f"Error in get_hotels_by_coordinates: {str(e)}")
-            return []
\ No newline at end of file
+            return []
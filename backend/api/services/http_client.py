@@ -0,0 +1,316 @@
+"""
+Shared HTTP clients for upstream API calls.
+
+Every service talks to upstream through one of two pooled clients instead of
+opening its own connections: a process-wide requests.Session for the sync
+services and an httpx.AsyncClient per event loop for the async ones. Both
+keep connections alive between requests, so TCP and TLS setup to a host is
+paid once per pooled connection rather than once per call. Services take the
+client as an optional constructor argument and fall back to these.
+
+Before sending, both clients check the endpoint's circuit breaker and spend
+the provider's shared rate-limit budget. They raise CircuitOpen or
+RateLimited instead of sending a call that would fail or be rejected. Inside
+a request deadline, call timeouts are cut to the time left, and a call that
+runs out of it raises DeadlineExceeded.
+"""
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Dict, Optional
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import deadline
+from .circuit_breaker import circuit_breakers
+from .errors import UpstreamUnavailable
+from .rate_limiter import provider_for, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'TravelAI/1.0'
+
+_session = None
+_session_lock = threading.Lock()
+
+# httpx.AsyncClient is bound to the event loop it was first used on, so keep
+# one client per running loop (in practice one per ASGI worker process; under
+# WSGI every request runs on a loop of its own and gets a client of its own).
+_async_clients = weakref.WeakKeyDictionary()
+# Tasks that close each loop's client when the loop shuts down
+_async_closers = set()
+
+# Requests sent per host by the async clients of this process
+_async_requests = Counter()
+
+
+def _pool_maxsize() -> int:
+    # Connections kept per host: one for each thread that may call upstream
+    return getattr(settings, 'HTTP_POOL_MAXSIZE', None) or getattr(settings, 'UPSTREAM_MAX_WORKERS', 32)
+
+
+def _http2_enabled() -> bool:
+    if not getattr(settings, 'HTTP2_ENABLED', False):
+        return False
+    if importlib.util.find_spec('h2') is None:
+        logger.warning("HTTP2_ENABLED is set but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def _retry_after(headers) -> Optional[float]:
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class _UpstreamAdapter(HTTPAdapter):
+    """Connection pools that guard each upstream call with its breaker and rate limit"""
+
+    def send(self, request, **kwargs):
+        provider = provider_for(request.url)
+        if provider is None:
+            return super().send(request, **kwargs)
+
+        # Checked first, so calls to a failing endpoint spend no budget
+        breaker = circuit_breakers.for_url(request.url)
+        breaker.before_call()
+        started = time.monotonic()
+        try:
+            rate_limiter.acquire(provider)
+            started = time.monotonic()
+            response = super().send(request, **kwargs)
+        except UpstreamUnavailable:
+            breaker.record(None)
+            raise
+        except Exception:
+            # A call cut short by the request deadline says nothing about upstream
+            breaker.record(None if deadline.expired() else True, time.monotonic() - started)
+            raise
+
+        breaker.record(response.status_code >= 500, time.monotonic() - started)
+        if response.status_code == 429:
+            rate_limiter.penalize(provider, _retry_after(response.headers))
+        return response
+
+
+class _UpstreamSession(requests.Session):
+    """Session that turns calls to an open circuit away before preparing them"""
+
+    def request(self, method, url, *args, **kwargs):
+        # Preparing a request reads the proxy environment and costs
+        # milliseconds; a call that will be rejected should not pay for it
+        breaker = circuit_breakers.for_url(url)
+        if breaker is None:
+            return super().request(method, url, *args, **kwargs)
+        breaker.check()
+        kwargs['timeout'] = deadline.call_timeout(kwargs.get('timeout'), breaker.provider)
+        try:
+            return super().request(method, url, *args, **kwargs)
+        except requests.Timeout as e:
+            if not deadline.expired():
+                raise
+            deadline.skip_section()
+            raise deadline.DeadlineExceeded(breaker.provider) from e
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide requests session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = _UpstreamSession()
+                session.headers.update({'User-Agent': USER_AGENT})
+                adapter = _UpstreamAdapter(
+                    pool_connections=getattr(settings, 'HTTP_POOL_HOSTS', 10),
+                    pool_maxsize=_pool_maxsize()
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+class _UpstreamTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of _UpstreamAdapter, wrapping the pooled transport"""
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        _async_requests[request.url.host] += 1
+        provider = provider_for(request.url)
+        if provider is None:
+            return await self.transport.handle_async_request(request)
+
+        breaker = circuit_breakers.for_url(request.url)
+        breaker.before_call()
+        started = time.monotonic()
+        try:
+            await rate_limiter.aacquire(provider)
+            started = time.monotonic()
+            response = await self.transport.handle_async_request(request)
+        except (UpstreamUnavailable, asyncio.CancelledError):
+            breaker.record(None)
+            raise
+        except Exception:
+            breaker.record(None if deadline.expired() else True, time.monotonic() - started)
+            raise
+
+        breaker.record(response.status_code >= 500, time.monotonic() - started)
+        if response.status_code == 429:
+            await sync_to_async(rate_limiter.penalize)(provider, _retry_after(response.headers))
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class _UpstreamAsyncClient(httpx.AsyncClient):
+    """Async counterpart of _UpstreamSession"""
+
+    async def request(self, method, url, *args, **kwargs):
+        breaker = circuit_breakers.for_url(url)
+        if breaker is None:
+            return await super().request(method, url, *args, **kwargs)
+        breaker.check()
+        if deadline.current_deadline() is not None:
+            kwargs['timeout'] = deadline.call_timeout(kwargs.get('timeout', self.timeout.read), breaker.provider)
+        try:
+            return await super().request(method, url, *args, **kwargs)
+        except httpx.TimeoutException as e:
+            if not deadline.expired():
+                raise
+            deadline.skip_section()
+            raise deadline.DeadlineExceeded(breaker.provider) from e
+
+
+class _RunningLoopClient:
+    """
+    Sends each call through the async client of the event loop awaiting it.
+
+    Services hold one of these rather than a loop's client, so the fetches
+    they hand to single_flight can also be awaited by a background refresh
+    on the process-wide loop.
+    """
+
+    async def request(self, method: str, url, **kwargs) -> httpx.Response:
+        return await _loop_client().request(method, url, **kwargs)
+
+    async def get(self, url, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+
+_running_loop_client = _RunningLoopClient()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the async client, which uses the pool of whichever event loop awaits it."""
+    return _running_loop_client
+
+
+def _loop_client() -> httpx.AsyncClient:
+    """Return the async client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        max_connections = getattr(settings, 'ASYNC_HTTP_MAX_CONNECTIONS', 1000)
+        # httpx limits are not per host, so keep enough idle connections for
+        # every upstream host to hold a full per-host pool
+        keepalive = _pool_maxsize() * getattr(settings, 'HTTP_POOL_HOSTS', 10)
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(keepalive, max_connections),
+                keepalive_expiry=getattr(settings, 'HTTP_KEEPALIVE_EXPIRY', 30)
+            ),
+            http2=_http2_enabled()
+        )
+        client = _UpstreamAsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            transport=_UpstreamTransport(transport),
+            timeout=10
+        )
+        _async_clients[loop] = client
+        closer = loop.create_task(_close_with_loop(client))
+        # The loop only keeps weak references to tasks
+        _async_closers.add(closer)
+        closer.add_done_callback(_async_closers.discard)
+    return client
+
+
+async def _close_with_loop(client: httpx.AsyncClient) -> None:
+    """Close a loop's client, and its pooled connections, when the loop shuts down"""
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # asyncio.run (which asgiref runs WSGI requests' async views in) and
+        # ASGI servers cancel the tasks left on a loop before closing it
+        await client.aclose()
+
+
+def pool_stats() -> Dict:
+    """Connection pool counters of this process, per upstream host."""
+    return {
+        'sync': _session_stats(),
+        'async': _async_stats()
+    }
+
+
+def _session_stats() -> Dict:
+    hosts = {}
+    if _session is not None:
+        adapter = _session.get_adapter('https://')
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            # urllib3 fills the queue with None placeholders up to maxsize
+            idle = sum(conn is not None for conn in list(pool.pool.queue)) if pool.pool is not None else 0
+            hosts[key.key_host] = {
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle': idle,
+                'maxsize': pool.pool.maxsize if pool.pool is not None else 0
+            }
+    return {
+        'pool_maxsize': _pool_maxsize(),
+        'hosts': hosts
+    }
+
+
+def _async_stats() -> Dict:
+    hosts = {}
+    clients = [client for client in list(_async_clients.values()) if not client.is_closed]
+    for client in clients:
+        # httpx does not expose its pool, so read httpcore's connection list
+        transport = getattr(getattr(client, '_transport', None), 'transport', None)
+        pool = getattr(transport, '_pool', None)
+        for connection in getattr(pool, 'connections', []):
+            origin = getattr(connection, '_origin', None)
+            host = origin.host.decode() if origin is not None else 'unknown'
+            entry = hosts.setdefault(host, {'connections': 0, 'idle': 0, 'http2': 0})
+            entry['connections'] += 1
+            entry['idle'] += connection.is_idle()
+            entry['http2'] += 'HTTP/2' in connection.info()
+    for host, count in _async_requests.items():
+        hosts.setdefault(host, {'connections': 0, 'idle': 0, 'http2': 0})['requests'] = count
+    return {
+        'clients': len(clients),
+        'http2_enabled': _http2_enabled(),
+        'hosts': hosts
+    }
@@ -0,0 +1,82 @@
+"""
+Caching of results fetched with a limit.
+
+Cache keys for such results leave the limit out and hold the largest result
+fetched so far, so a request for fewer items is answered by slicing it.
+Upstream is only asked again when a request wants more items than are held
+and the held result was cut off at its limit.
+"""
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional
+
+from .single_flight import single_flight
+
+
+class LimitedResults(NamedTuple):
+    """Items fetched from upstream with a limit"""
+    items: List[Any]
+    limit: int
+
+    def covers(self, limit: int) -> bool:
+        # Fewer items than the limit means upstream had no more to give
+        return limit <= self.limit or len(self.items) < self.limit
+
+
+def get_or_fetch(key: str, limit: int, fetch: Callable[[int], Optional[List]],
+                 timeout: float, hard_timeout: Optional[float] = None) -> Optional[List]:
+    """
+    Return up to limit cached items for key, fetching more when needed.
+
+    Args:
+        key: Cache key, without the limit
+        limit: Number of items wanted
+        fetch: Callable taking a limit and returning the items; None and
+            empty results are kept as short-lived misses, for any limit
+        timeout, hard_timeout: As for single_flight.get_or_fetch
+
+    Returns:
+        At most limit items, or what fetch returned if it had none
+    """
+    fetch_limit = [limit]
+
+    def accept(held: Any) -> bool:
+        if not isinstance(held, LimitedResults):
+            return False
+        # A background refresh of a stale entry keeps its size
+        fetch_limit[0] = max(limit, held.limit)
+        return held.covers(limit)
+
+    def fetch_limited():
+        return _wrap(fetch(fetch_limit[0]), fetch_limit[0])
+
+    result = single_flight.get_or_fetch(key, fetch_limited, timeout, hard_timeout, accept=accept)
+    return _unwrap(result, limit)
+
+
+async def aget_or_fetch(key: str, limit: int, fetch: Callable[[int], Awaitable[Optional[List]]],
+                        timeout: float, hard_timeout: Optional[float] = None) -> Optional[List]:
+    """Async counterpart of get_or_fetch; fetch returns an awaitable"""
+    fetch_limit = [limit]
+
+    def accept(held: Any) -> bool:
+        if not isinstance(held, LimitedResults):
+            return False
+        fetch_limit[0] = max(limit, held.limit)
+        return held.covers(limit)
+
+    async def fetch_limited():
+        return _wrap(await fetch(fetch_limit[0]), fetch_limit[0])
+
+    result = await single_flight.aget_or_fetch(key, fetch_limited, timeout, hard_timeout, accept=accept)
+    return _unwrap(result, limit)
+
+
+def _wrap(items: Optional[List], limit: int) -> Any:
+    # Empty results stay unwrapped for single_flight to cache as misses; no
+    # items at one limit means none at any other
+    return LimitedResults(items, limit) if items else items
+
+
+def _unwrap(result: Any, limit: int) -> Optional[List]:
+    if isinstance(result, LimitedResults):
+        return result.items[:limit]
+    return result
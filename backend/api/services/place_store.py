@@ -0,0 +1,305 @@
+"""
+Durable store of geocoded places and fetched points of interest.
+
+Geocoding results and Geoapify places features are written to the database
+so they survive restarts and deploys and are shared by every worker.
+Services consult the store before calling Geoapify, after the in-memory
+spatial index of this process:
+
+- a geocode query is answered from the stored place it resolved to before;
+- a places query is answered from stored POIs when a fresh search for the
+  same categories, centred in the same ~150 m geohash cell, already covered
+  at least the requested radius and limit. Matching POIs are found through
+  the geohash index and filtered and sorted by distance locally.
+
+Places answers are recorded with freshness() as fresh until the search they
+came from is older than PLACE_STORE_PLACES_TTL_DAYS, when the store would
+fetch it again.
+"""
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .. import geo
+from ..models import GeocodedPlace, GeocodeQuery, PlaceSearch, PointOfInterest
+from .places_planner import Query, current_plan, parse_query
+from .single_flight import note_freshness
+from .spatial_index import spatial_index
+
+logger = logging.getLogger(__name__)
+
+
+class PlaceStore:
+    """Read-through persistence for geocodes and Geoapify places queries"""
+
+    # Search centres within one geohash cell of this length (~150 m) are
+    # treated as the same search
+    SEARCH_PRECISION = 7
+    POI_PRECISION = 9
+
+    @property
+    def geocode_ttl(self) -> timedelta:
+        return timedelta(days=getattr(settings, 'PLACE_STORE_GEOCODE_TTL_DAYS', 30))
+
+    @property
+    def places_ttl(self) -> timedelta:
+        return timedelta(days=getattr(settings, 'PLACE_STORE_PLACES_TTL_DAYS', 7))
+
+    # ------------------------
+    # Geocoding
+    # ------------------------
+    def get_geocode(self, query: str) -> Optional[Dict]:
+        """Return the stored geocode result for a normalized query, if fresh"""
+        try:
+            entry = (
+                GeocodeQuery.objects
+                .select_related('place')
+                .filter(query=query, place__updated_at__gte=timezone.now() - self.geocode_ttl)
+                .first()
+            )
+        except DatabaseError as e:
+            logger.warning(f"Place store unavailable: {str(e)}")
+            return None
+
+        if entry is None:
+            return None
+
+        place = entry.place
+        return {
+            'lat': place.latitude,
+            'lon': place.longitude,
+            'name': place.name,
+            'formatted': place.formatted,
+            'country': place.country,
+            'city': place.city,
+            'state': place.state,
+            'place_id': place.place_id
+        }
+
+    def save_geocode(self, query: str, result: Dict) -> None:
+        """Store a geocode result under its provider place_id"""
+        place_id = result.get('place_id') or f"{result['lat']},{result['lon']}"
+        # Single-statement upserts rather than update_or_create: SQLite fails a
+        # read transaction that upgrades to a write immediately instead of
+        # waiting on the busy timeout when another worker is writing.
+        try:
+            GeocodedPlace.objects.bulk_create(
+                [GeocodedPlace(
+                    place_id=place_id,
+                    name=result.get('name') or '',
+                    formatted=result.get('formatted') or '',
+                    country=result.get('country'),
+                    city=result.get('city'),
+                    state=result.get('state'),
+                    latitude=result['lat'],
+                    longitude=result['lon'],
+                    geohash=geo.encode(result['lat'], result['lon'], self.POI_PRECISION)
+                )],
+                update_conflicts=True,
+                unique_fields=['place_id'],
+                update_fields=['name', 'formatted', 'country', 'city', 'state',
+                               'latitude', 'longitude', 'geohash', 'updated_at']
+            )
+            place = GeocodedPlace.objects.only('pk').get(place_id=place_id)
+            GeocodeQuery.objects.bulk_create(
+                [GeocodeQuery(query=query, place=place)],
+                update_conflicts=True,
+                unique_fields=['query'],
+                update_fields=['place']
+            )
+        except DatabaseError as e:
+            logger.warning(f"Could not store geocode for {query}: {str(e)}")
+
+    # ------------------------
+    # Places
+    # ------------------------
+    def fetch_places(self, params: Dict, fetch: Callable[[], Dict]) -> Dict:
+        """
+        Answer a Geoapify places query from the store, or fetch and store it.
+
+        Inside a places plan, a miss first runs the plan's merged queries and
+        is answered from them when they cover it.
+
+        Args:
+            params: Geoapify /v2/places query parameters
+            fetch: Callable returning the upstream FeatureCollection
+
+        Returns:
+            A Geoapify-style FeatureCollection
+        """
+        query = parse_query(params)
+        if query is None:
+            return fetch()
+
+        data = self.lookup_places(query)
+        if data is None:
+            plan = current_plan()
+            if plan is not None and plan.prefetch(self, query):
+                data = spatial_index.find(*query)
+        if data is None:
+            data = self.store_places(query, fetch())
+        return self._served(data)
+
+    async def afetch_places(self, params: Dict, fetch: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Async counterpart of fetch_places; fetch returns an awaitable"""
+        query = parse_query(params)
+        if query is None:
+            return await fetch()
+
+        data = await self.alookup_places(query)
+        if data is None:
+            plan = current_plan()
+            if plan is not None and await plan.aprefetch(self, query):
+                data = spatial_index.find(*query)
+        if data is None:
+            data = await self.astore_places(query, await fetch())
+        return self._served(data)
+
+    def _served(self, data: Dict) -> Dict:
+        # Data without fetched_at came from upstream just now
+        fetched_at = data.get('fetched_at') or time.time()
+        note_freshness(fetched_at + self.places_ttl.total_seconds())
+        return data
+
+    def lookup_places(self, query: Query) -> Optional[Dict]:
+        """Answer a parsed places query from the spatial index, then the database"""
+        data = spatial_index.find(*query)
+        if data is None:
+            data = self.find_places(*query)
+            if data is not None:
+                spatial_index.add(*query, data)
+        return data
+
+    async def alookup_places(self, query: Query) -> Optional[Dict]:
+        data = spatial_index.find(*query)
+        if data is None:
+            data = await sync_to_async(self.find_places)(*query)
+            if data is not None:
+                spatial_index.add(*query, data)
+        return data
+
+    def store_places(self, query: Query, data: Dict) -> Dict:
+        """Save an upstream response to a parsed places query and index it"""
+        self.save_places(*query, data)
+        spatial_index.add(*query, data)
+        return data
+
+    async def astore_places(self, query: Query, data: Dict) -> Dict:
+        await sync_to_async(self.save_places)(*query, data)
+        spatial_index.add(*query, data)
+        return data
+
+    def find_places(self, categories: str, lat: float, lon: float,
+                    radius: int, limit: int) -> Optional[Dict]:
+        """Return stored POIs for a query already covered by a fresh search"""
+        try:
+            # The newest search covering the query
+            fetched_at = PlaceSearch.objects.filter(
+                Q(limit__gte=limit) | Q(result_count__lt=F('limit')),
+                categories=categories,
+                geohash=geo.encode(lat, lon, self.SEARCH_PRECISION),
+                radius__gte=radius,
+                fetched_at__gte=timezone.now() - self.places_ttl
+            ).order_by('-fetched_at').values_list('fetched_at', flat=True).first()
+            if fetched_at is None:
+                return None
+
+            wanted = categories.split(',')
+            matches = [
+                (distance, poi)
+                for distance, poi in self.nearby(lat, lon, radius)
+                if self._matches_categories(poi.categories, wanted)
+            ]
+        except DatabaseError as e:
+            logger.warning(f"Place store unavailable: {str(e)}")
+            return None
+
+        matches.sort(key=lambda match: match[0])
+        return {
+            'type': 'FeatureCollection',
+            'fetched_at': fetched_at.timestamp(),
+            'features': [self._to_feature(poi, distance) for distance, poi in matches[:limit]]
+        }
+
+    def save_places(self, categories: str, lat: float, lon: float,
+                    radius: int, limit: int, data: Dict) -> None:
+        """Store the features of a places response and record the search"""
+        pois = []
+        for feature in data.get('features', []):
+            props = feature.get('properties', {})
+            coords = feature.get('geometry', {}).get('coordinates')
+            if not props.get('place_id') or not coords:
+                continue
+            pois.append(PointOfInterest(
+                place_id=props['place_id'],
+                name=props.get('name') or '',
+                categories=props.get('categories', []),
+                latitude=coords[1],
+                longitude=coords[0],
+                geohash=geo.encode(coords[1], coords[0], self.POI_PRECISION),
+                properties=props
+            ))
+
+        try:
+            PointOfInterest.objects.bulk_create(
+                pois,
+                update_conflicts=True,
+                unique_fields=['place_id'],
+                update_fields=['name', 'categories', 'latitude', 'longitude', 'geohash', 'properties', 'updated_at']
+            )
+            PlaceSearch.objects.bulk_create(
+                [PlaceSearch(
+                    categories=categories,
+                    geohash=geo.encode(lat, lon, self.SEARCH_PRECISION),
+                    latitude=lat,
+                    longitude=lon,
+                    radius=radius,
+                    limit=limit,
+                    result_count=len(data.get('features', []))
+                )],
+                update_conflicts=True,
+                unique_fields=['categories', 'geohash', 'radius', 'limit'],
+                update_fields=['latitude', 'longitude', 'result_count', 'fetched_at']
+            )
+        except DatabaseError as e:
+            logger.warning(f"Could not store places for {categories}: {str(e)}")
+
+    def nearby(self, lat: float, lon: float, radius: float) -> List[Tuple[float, PointOfInterest]]:
+        """Stored POIs within radius metres, as (distance, poi) pairs"""
+        cells = Q()
+        for prefix in geo.cover_circle(lat, lon, radius):
+            # A range on the indexed column rather than LIKE, so SQLite uses the index
+            cells |= Q(geohash__gte=prefix, geohash__lt=prefix + '~')
+
+        results = []
+        for poi in PointOfInterest.objects.filter(cells):
+            distance = geo.haversine_m(lat, lon, poi.latitude, poi.longitude)
+            if distance <= radius:
+                results.append((distance, poi))
+        return results
+
+    def _matches_categories(self, poi_categories: List[str], wanted: List[str]) -> bool:
+        return any(
+            category == w or category.startswith(w + '.')
+            for category in poi_categories
+            for w in wanted
+        )
+
+    def _to_feature(self, poi: PointOfInterest, distance: float) -> Dict[str, Any]:
+        return {
+            'type': 'Feature',
+            'properties': {**poi.properties, 'distance': round(distance)},
+            'geometry': {
+                'type': 'Point',
+                'coordinates': [poi.longitude, poi.latitude]
+            }
+        }
+
+
+place_store = PlaceStore()
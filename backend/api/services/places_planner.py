@@ -0,0 +1,189 @@
+"""
+Merging of the Geoapify places queries one operation makes around a centre.
+
+A composite request queries /v2/places several times around the same point:
+attractions, place details and hotels for a destination, or the nearby
+categories of a Wikipedia description. The service declares those queries
+up front in a places plan. The first of them that the spatial index and the
+place store cannot answer triggers one merged query instead of its own: the
+union of the declared categories, over a circle holding every declared
+circle, nearest first. The merged response is recorded like any other, so
+each declared query is then split out of it locally by category and
+distance.
+
+A merged response cut off at its limit may not reach far enough for every
+query. The ones it misses are merged again in a second round, and a query
+still not covered after that makes its own upstream call.
+
+Queries for broad categories (PLACES_PLAN_UNMERGED_CATEGORIES, by default
+commercial) are not merged at all: in a city centre their nearest features
+alone would fill the merged limit and crowd out every other query's.
+"""
+import asyncio
+import logging
+import math
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+
+from .. import geo
+from .spatial_index import spatial_index
+
+logger = logging.getLogger(__name__)
+
+# (categories, lat, lon, radius, limit) of a circle query
+Query = Tuple[str, float, float, int, int]
+
+_plan: ContextVar[Optional['PlacesPlan']] = ContextVar('places_plan', default=None)
+
+
+def parse_query(params: Dict) -> Optional[Query]:
+    """Extract (categories, lat, lon, radius, limit) from a circle query"""
+    circle = params.get('filter', '')
+    if not circle.startswith('circle:'):
+        return None
+    try:
+        lon, lat, radius = (float(part) for part in circle[len('circle:'):].split(','))
+        return params['categories'], lat, lon, int(radius), int(params['limit'])
+    except (KeyError, ValueError):
+        return None
+
+
+class PlacesPlan:
+    """The places queries an operation will make, merged on first use"""
+
+    # Merged rounds before queries fall back to their own upstream calls
+    MAX_ROUNDS = 2
+
+    def __init__(self, queries: List[Query], get_places: Callable[[Dict], Any], api_key: Optional[str]):
+        self.queries = queries
+        self.get_places = get_places
+        self.api_key = api_key
+        # Merged circles are centred on the first declared query
+        _, self.lat, self.lon, _, _ = queries[0]
+        self.rounds = 0
+        self._lock = threading.Lock()
+        self._alock = asyncio.Lock()
+
+    @property
+    def limit(self) -> int:
+        return getattr(settings, 'PLACES_PLAN_LIMIT', 200)
+
+    @property
+    def max_offset(self) -> float:
+        # Queries centred farther than this from the plan are not merged
+        return getattr(settings, 'PLACES_PLAN_MAX_OFFSET', 2000)
+
+    def prefetch(self, store, query: Query) -> bool:
+        """
+        Run merged rounds until the spatial index covers query.
+
+        Args:
+            store: PlaceStore the merged responses are read from and saved to
+            query: The places query about to miss
+
+        Returns:
+            True if the spatial index now answers query
+        """
+        # Concurrent sections wait for the merged round instead of fetching
+        with self._lock:
+            while True:
+                merged = self._next_round(query)
+                if merged is None:
+                    return spatial_index.covers(*query)
+                params, merged_query = merged
+                try:
+                    if store.lookup_places(merged_query) is None:
+                        store.store_places(merged_query, self.get_places(params))
+                except Exception as e:
+                    logger.warning(f"Merged places query failed: {str(e)}")
+                    return False
+
+    async def aprefetch(self, store, query: Query) -> bool:
+        """Async counterpart of prefetch; get_places returns an awaitable"""
+        async with self._alock:
+            while True:
+                merged = self._next_round(query)
+                if merged is None:
+                    return spatial_index.covers(*query)
+                params, merged_query = merged
+                try:
+                    if await store.alookup_places(merged_query) is None:
+                        await store.astore_places(merged_query, await self.get_places(params))
+                except Exception as e:
+                    logger.warning(f"Merged places query failed: {str(e)}")
+                    return False
+
+    def _next_round(self, query: Query) -> Optional[Tuple[Dict, Query]]:
+        """Params and parsed query of the next merged round, or None if there is none to run"""
+        if self.rounds >= self.MAX_ROUNDS or _unmerged(query) or spatial_index.covers(*query):
+            return None
+        if geo.haversine_m(self.lat, self.lon, query[1], query[2]) > self.max_offset:
+            return None
+
+        pending = [planned for planned in self.queries if planned != query and not spatial_index.covers(*planned)]
+        pending.append(query)
+        self.rounds += 1
+        return self._merge(pending)
+
+    def _merge(self, queries: List[Query]) -> Tuple[Dict, Query]:
+        categories = ','.join(_union_categories(
+            category for query in queries for category in query[0].split(',')
+        ))
+        radius = math.ceil(max(
+            query_radius + geo.haversine_m(self.lat, self.lon, lat, lon)
+            for _, lat, lon, query_radius, _ in queries
+        ))
+        params = {
+            'categories': categories,
+            'filter': f'circle:{self.lon},{self.lat},{radius}',
+            'bias': f'proximity:{self.lon},{self.lat}',  # Nearest first
+            'limit': self.limit,
+            'apiKey': self.api_key
+        }
+        return params, (categories, self.lat, self.lon, radius, self.limit)
+
+
+def _unmerged(query: Query) -> bool:
+    """Whether a query asks for a category too broad to share a merged query"""
+    broad = getattr(settings, 'PLACES_PLAN_UNMERGED_CATEGORIES', ['commercial'])
+    return any(
+        category == parent or category.startswith(parent + '.')
+        for category in query[0].split(',') for parent in broad
+    )
+
+
+def _union_categories(categories: Iterable[str]) -> List[str]:
+    # Subcategories of a category already present add nothing to the query
+    unique = sorted(set(categories))
+    return [c for c in unique if not any(c.startswith(parent + '.') for parent in unique)]
+
+
+@contextmanager
+def places_plan(params: Iterable[Dict], get_places: Callable[[Dict], Any]):
+    """
+    Declare the places queries made inside the block.
+
+    Args:
+        params: Geoapify /v2/places query parameters of each planned query
+        get_places: Callable sending one such query upstream (sync or async,
+            matching the service)
+    """
+    params = list(params)
+    queries = [query for query in map(parse_query, params) if query is not None and not _unmerged(query)]
+    # A single query has nothing to be merged with
+    if len(queries) < 2:
+        yield
+        return
+
+    token = _plan.set(PlacesPlan(queries, get_places, params[0].get('apiKey')))
+    try:
+        yield
+    finally:
+        _plan.reset(token)
+
+
+def current_plan() -> Optional[PlacesPlan]:
+    return _plan.get()
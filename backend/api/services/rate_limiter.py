@@ -0,0 +1,271 @@
+"""
+Upstream rate limits and daily quotas, shared by all workers.
+
+Each provider has a token bucket (a refill rate and a burst) and an optional
+daily quota, kept in one ProviderBudget row so every worker process draws
+from the same budget. The shared HTTP clients take a token before each
+upstream call and raise RateLimited instead of sending a call the provider
+would reject. Callers then fall back: cached values that fell short are
+served anyway, and sections that would need the call are left out.
+
+Calls made inside essential() may also use the last UPSTREAM_QUOTA_RESERVE
+share of a daily quota; others stop short of it. Geocoding is essential,
+since every endpoint needs it before anything else can be fetched. Calls
+made inside patient() wait longer for a token, for background work that
+would rather be slow than lose sections.
+
+A 429 from upstream empties the provider's bucket for its Retry-After
+period.
+"""
+import asyncio
+import datetime
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from ..models import ProviderBudget
+from . import deadline
+from .errors import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Refill rate in requests per second, burst and daily quota (None: no quota)
+DEFAULT_LIMITS = {
+    'geoapify': {'rate': 5, 'burst': 5, 'daily': 3000},
+    'unsplash': {'rate': 50 / 3600, 'burst': 50, 'daily': None},
+    'openweather': {'rate': 1, 'burst': 60, 'daily': 1000},
+    'openrouteservice': {'rate': 40 / 60, 'burst': 40, 'daily': 2000},
+    'wikipedia': {'rate': 50, 'burst': 50, 'daily': None},
+}
+
+PROVIDER_HOSTS = {
+    'api.geoapify.com': 'geoapify',
+    'api.unsplash.com': 'unsplash',
+    'api.openweathermap.org': 'openweather',
+    'api.openrouteservice.org': 'openrouteservice',
+    'en.wikipedia.org': 'wikipedia',
+}
+
+_essential: ContextVar[bool] = ContextVar('essential_call', default=False)
+_max_wait: ContextVar[Optional[float]] = ContextVar('rate_limit_max_wait', default=None)
+
+
+class RateLimited(UpstreamUnavailable):
+    """An upstream call was not sent because the provider's budget is spent"""
+
+    reason = 'Upstream rate limit reached'
+
+
+@contextmanager
+def essential():
+    """Let upstream calls made inside the block use the reserved quota"""
+    token = _essential.set(True)
+    try:
+        yield
+    finally:
+        _essential.reset(token)
+
+
+@contextmanager
+def patient(seconds: float):
+    """Let upstream calls made inside the block wait up to seconds for a token"""
+    token = _max_wait.set(seconds)
+    try:
+        yield
+    finally:
+        _max_wait.reset(token)
+
+
+def provider_for(url: Any) -> Optional[str]:
+    """The rate-limited provider an upstream URL belongs to, if any"""
+    return PROVIDER_HOSTS.get(urlsplit(str(url)).hostname or '')
+
+
+class RateLimiter:
+    """Token buckets and daily quotas per upstream provider"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._created = set()
+        self._denied: Dict[str, int] = {}
+
+    @property
+    def limits(self) -> Dict[str, Dict]:
+        return getattr(settings, 'UPSTREAM_RATE_LIMITS', DEFAULT_LIMITS)
+
+    @property
+    def reserve(self) -> float:
+        return getattr(settings, 'UPSTREAM_QUOTA_RESERVE', 0.1)
+
+    @property
+    def max_wait(self) -> float:
+        waited = _max_wait.get()
+        if waited is not None:
+            return waited
+        return getattr(settings, 'UPSTREAM_RATE_LIMIT_MAX_WAIT', 1.0)
+
+    def acquire(self, provider: str) -> None:
+        """
+        Take one call from the provider's budget, or raise RateLimited.
+
+        Waits for the bucket to refill when a token is due within max_wait,
+        or before the request deadline if that comes first.
+        """
+        give_up_at = time.monotonic() + deadline.cap(self.max_wait)
+        while not self.try_acquire(provider):
+            retry_after = self.retry_after(provider)
+            if retry_after is None or time.monotonic() + retry_after > give_up_at:
+                self._deny(provider)
+                raise RateLimited(provider, retry_after)
+            time.sleep(retry_after)
+
+    async def aacquire(self, provider: str) -> None:
+        """Async counterpart of acquire"""
+        give_up_at = time.monotonic() + deadline.cap(self.max_wait)
+        while not await sync_to_async(self.try_acquire)(provider):
+            retry_after = await sync_to_async(self.retry_after)(provider)
+            if retry_after is None or time.monotonic() + retry_after > give_up_at:
+                self._deny(provider)
+                raise RateLimited(provider, retry_after)
+            await asyncio.sleep(retry_after)
+
+    def _deny(self, provider: str) -> None:
+        with self._lock:
+            self._denied[provider] = self._denied.get(provider, 0) + 1
+        logger.warning(f"{provider} budget spent, not calling upstream")
+
+    def try_acquire(self, provider: str) -> bool:
+        """Take one call from the provider's budget if there is one"""
+        limits = self.limits.get(provider)
+        if not limits:
+            return True
+
+        now = time.time()
+        today = timezone.now().date()
+        available = self._available(limits, now)
+        conditions = Q(provider=provider)
+        daily = limits.get('daily')
+        if daily:
+            quota = daily if _essential.get() else int(daily * (1 - self.reserve))
+            conditions &= Q(day__lt=today) | Q(used_today__lt=quota)
+
+        try:
+            self._ensure(provider, limits, now)
+            # One conditional UPDATE, so workers cannot both take the last token
+            granted = (
+                ProviderBudget.objects
+                .alias(available=available)
+                .filter(conditions, available__gte=1)
+                .update(
+                    tokens=available - 1,
+                    refilled_at=now,
+                    used_today=Case(When(day=today, then=F('used_today') + 1), default=Value(1)),
+                    day=today
+                )
+            )
+        except DatabaseError as e:
+            logger.warning(f"Rate limiter unavailable, allowing {provider} call: {str(e)}")
+            return True
+        return bool(granted)
+
+    def penalize(self, provider: str, retry_after: Optional[float]) -> None:
+        """Empty the provider's bucket after upstream answered 429"""
+        limits = self.limits.get(provider)
+        if not limits:
+            return
+        retry_after = retry_after or 60
+        try:
+            self._ensure(provider, limits, time.time())
+            # Negative tokens refill back to zero after retry_after seconds
+            ProviderBudget.objects.filter(provider=provider).update(
+                tokens=-limits['rate'] * retry_after,
+                refilled_at=time.time()
+            )
+        except DatabaseError as e:
+            logger.warning(f"Rate limiter unavailable: {str(e)}")
+        logger.warning(f"{provider} answered 429, pausing calls for {retry_after:.0f}s")
+
+    def retry_after(self, provider: str) -> Optional[float]:
+        """Seconds until the provider's bucket holds a token again"""
+        budget = self._budget(provider)
+        if budget is None:
+            return None
+        limits = self.limits[provider]
+        daily = limits.get('daily')
+        if daily:
+            quota = daily if _essential.get() else int(daily * (1 - self.reserve))
+            if budget['used_today'] >= quota:
+                return budget['resets_in']
+        # A little past the refill, so the retry is not a hair too early
+        return max(0.0, (1 - budget['tokens']) / limits['rate']) + 0.01
+
+    def denied(self) -> Dict[str, int]:
+        """Calls not sent per provider by this process, for lack of budget"""
+        with self._lock:
+            return dict(self._denied)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Remaining budget of every provider"""
+        return {provider: self._budget(provider) for provider in self.limits}
+
+    def _budget(self, provider: str) -> Optional[Dict]:
+        limits = self.limits.get(provider)
+        if not limits:
+            return None
+        try:
+            row = ProviderBudget.objects.filter(provider=provider).first()
+        except DatabaseError:
+            row = None
+
+        now = timezone.now()
+        tomorrow = datetime.datetime.combine(
+            now.date() + datetime.timedelta(days=1), datetime.time(), tzinfo=datetime.timezone.utc
+        )
+        used_today = row.used_today if row is not None and row.day == now.date() else 0
+        tokens = limits['burst'] if row is None else min(
+            limits['burst'], row.tokens + (time.time() - row.refilled_at) * limits['rate']
+        )
+        daily = limits.get('daily')
+        return {
+            'rate_per_second': limits['rate'],
+            'burst': limits['burst'],
+            'tokens': round(tokens, 2),
+            'daily_quota': daily,
+            'used_today': used_today,
+            'remaining_today': max(0, daily - used_today) if daily else None,
+            'resets_in': round((tomorrow - now).total_seconds()),
+            'denied': self._denied.get(provider, 0)
+        }
+
+    def _available(self, limits: Dict, now: float):
+        """Tokens in the bucket at now, as a database expression"""
+        return Least(
+            Value(float(limits['burst'])),
+            F('tokens') + (Value(now) - F('refilled_at')) * Value(float(limits['rate']))
+        )
+
+    def _ensure(self, provider: str, limits: Dict, now: float) -> None:
+        if provider in self._created:
+            return
+        ProviderBudget.objects.get_or_create(
+            provider=provider,
+            defaults={
+                'tokens': limits['burst'],
+                'refilled_at': now,
+                'day': timezone.now().date()
+            }
+        )
+        self._created.add(provider)
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,85 @@
+"""
+Request-scoped memoization of upstream calls.
+
+A memo scope covers one logical operation (one composite API request). Inside
+it, identical calls made through memoize/amemoize run once and every caller,
+including concurrent ones on the shared executor or in sibling asyncio tasks,
+shares the result. Outside a scope the call simply runs.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .executor import cancel_and_wait
+
+_memo: ContextVar[Optional[Dict[str, Any]]] = ContextVar('request_memo', default=None)
+_memo_lock = threading.Lock()
+
+
+@contextmanager
+def memo_scope():
+    """Open a memo scope, or join the enclosing one if there already is one"""
+    if _memo.get() is not None:
+        yield
+        return
+
+    token = _memo.set({})
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+
+def memoize(key: str, fn: Callable[[], Any]) -> Any:
+    """Run fn once per key within the current memo scope"""
+    memo = _memo.get()
+    if memo is None:
+        return fn()
+
+    with _memo_lock:
+        future = memo.get(key)
+        owner = future is None
+        if owner:
+            future = memo[key] = Future()
+
+    if not owner:
+        return future.result()
+
+    try:
+        result = fn()
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    future.set_result(result)
+    return result
+
+
+async def amemoize(key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """Async counterpart of memoize; fn returns an awaitable"""
+    memo = _memo.get()
+    if memo is None:
+        return await fn()
+
+    task = memo.get(key)
+    if task is None:
+        task = memo[key] = asyncio.ensure_future(fn())
+    # Shield the shared task so one cancelled caller does not cancel it for the rest
+    return await asyncio.shield(task)
+
+
+async def cancel_pending() -> None:
+    """
+    Cancel the async calls of the current memo scope that are still running
+    and wait for them to wind down.
+
+    amemoize runs each call in a task of its own, shielded from its callers,
+    so cancelling the callers leaves it running.
+    """
+    memo = _memo.get()
+    if memo:
+        await cancel_and_wait({
+            task for task in memo.values() if isinstance(task, asyncio.Future) and not task.done()
+        })
@@ -0,0 +1,146 @@
+"""
+Cache of encoded responses for composite endpoints.
+
+Even when every section of a travel info request is cached, answering it
+costs one cache lookup and unpickle per section, assembling the result and
+encoding it again. The response cache keeps the final body bytes instead,
+optionally gzipped, under a key built from the normalized request, so a hot
+destination is served with one lookup and no re-encoding.
+
+Each body carries a strong ETag, the hash of its bytes, and the time it
+stops being fresh: the shortest freshness of the sections it holds. GET
+endpoints send them as ETag and Cache-Control max-age, and answer a
+matching If-None-Match with 304 straight from the cache entry.
+
+A travel info body's `timestamp` is when its content last changed, not when
+it was assembled, so a body rebuilt with the same sections has the same
+bytes and ETag as before. The timestamp is not part of the key.
+"""
+import gzip
+import hashlib
+import json
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+
+
+class CachedResponse(NamedTuple):
+    """An encoded response body, as cached"""
+    body: bytes
+    content_type: str
+    gzipped: bool
+    # Strong ETag of the uncompressed body
+    etag: str
+    # When the body stops being fresh, or None if it should be revalidated
+    fresh_until: Optional[float]
+
+    def content(self, accepts_gzip: bool) -> bytes:
+        """The body for a client that does or does not accept gzip"""
+        return self.body if accepts_gzip or not self.gzipped else gzip.decompress(self.body)
+
+    def etag_for(self, gzipped: bool) -> str:
+        # The gzipped bytes are another representation, so another strong ETag
+        return f'{self.etag[:-1]}-gzip"' if gzipped else self.etag
+
+    def max_age(self) -> int:
+        """Seconds the body stays fresh for clients and proxies"""
+        return 0 if self.fresh_until is None else max(0, int(self.fresh_until - time.time()))
+
+    def matches(self, if_none_match: str) -> bool:
+        """Whether an If-None-Match header names this body, in either encoding"""
+        etags = parse_etags(if_none_match)
+        return '*' in etags or any(etag in (self.etag, self.etag_for(True)) for etag in etags)
+
+
+def encoded(body: bytes, content_type: str, timeout: Optional[float]) -> CachedResponse:
+    """An uncompressed body with its ETag, fresh for timeout seconds"""
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    return CachedResponse(body, content_type, False, etag, time.time() + timeout if timeout else None)
+
+
+class ResponseCache:
+    """Encoded response bodies, keyed by endpoint, media type and normalized request"""
+
+    KEY_PREFIX = 'responses'
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'RESPONSE_CACHE_ENABLED', True)
+
+    @property
+    def compress(self) -> bool:
+        return getattr(settings, 'RESPONSE_CACHE_GZIP', True)
+
+    @property
+    def gzip_min_bytes(self) -> int:
+        return getattr(settings, 'RESPONSE_CACHE_GZIP_MIN_BYTES', 1024)
+
+    def key(self, endpoint: str, media_type: str, **params: Any) -> str:
+        """Cache key of a request; callers normalize the params"""
+        request = json.dumps([media_type, params], sort_keys=True)
+        digest = hashlib.sha1(request.encode('utf-8')).hexdigest()
+        return f"{self.KEY_PREFIX}_{endpoint}_{digest}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        cached = cache.get(key)
+        return cached if isinstance(cached, CachedResponse) else None
+
+    async def aget(self, key: str) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        cached = await cache.aget(key)
+        return cached if isinstance(cached, CachedResponse) else None
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        """Cache a response until it stops being fresh; one to revalidate is not cached"""
+        timeout = self._timeout(response)
+        if timeout:
+            cache.set(key, self._compressed(response), timeout)
+
+    async def aset(self, key: str, response: CachedResponse) -> None:
+        timeout = self._timeout(response)
+        if timeout:
+            await cache.aset(key, self._compressed(response), timeout)
+
+    def pin_timestamp(self, key: str, data: Dict, remember: float) -> None:
+        """
+        Set data['timestamp'] back to when the same content was first seen
+        under key, within the last remember seconds, or record it as new
+        """
+        digest = self._content_digest(data)
+        held = cache.get(f"{key}_since")
+        if held is not None and held[0] == digest:
+            data['timestamp'] = held[1]
+        else:
+            cache.set(f"{key}_since", (digest, data['timestamp']), remember)
+
+    async def apin_timestamp(self, key: str, data: Dict, remember: float) -> None:
+        digest = self._content_digest(data)
+        held = await cache.aget(f"{key}_since")
+        if held is not None and held[0] == digest:
+            data['timestamp'] = held[1]
+        else:
+            await cache.aset(f"{key}_since", (digest, data['timestamp']), remember)
+
+    def _timeout(self, response: CachedResponse) -> Optional[int]:
+        if not self.enabled or response.fresh_until is None:
+            return None
+        return response.max_age()
+
+    def _compressed(self, response: CachedResponse) -> CachedResponse:
+        # Small bodies gain too little from gzip to be worth it
+        if response.gzipped or not self.compress or len(response.body) < self.gzip_min_bytes:
+            return response
+        return response._replace(body=gzip.compress(response.body), gzipped=True)
+
+    def _content_digest(self, data: Dict) -> str:
+        content = {name: value for name, value in data.items() if name != 'timestamp'}
+        return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,104 @@
+import httpx
+import requests
+import logging
+from django.conf import settings
+from typing import List, Dict, Optional
+
+from .coordinates import measure_from, quantize
+from .http_client import get_async_client, get_session
+from .place_store import place_store
+
+logger = logging.getLogger(__name__)
+
+
+class RestaurantsService:
+    """
+    Service for fetching nearby restaurants using Geoapify Places API.
+
+    Upstream errors are not swallowed here: the restaurants endpoint reports
+    them to the client as a bad gateway.
+    """
+
+    BASE_URL = "https://api.geoapify.com/v2/places"
+    CATEGORIES = 'catering.restaurant,catering.cafe,catering.fast_food'
+
+    # Seconds a restaurants response stays fresh for clients. The place store
+    # trusts stored places for days; this picks up its refreshes sooner.
+    CACHE_TTL = 60 * 60 * 6
+
+    def __init__(self, session: Optional[requests.Session] = None):
+        self.api_key = settings.GEOPI_API_KEY
+        self.session = session or get_session()
+
+    def get_restaurants(self, lat: float, lon: float, limit: int = 20, radius: int = 5000) -> List[Dict]:
+        """
+        Get restaurants around a point.
+
+        Args:
+            lat: Latitude
+            lon: Longitude
+            limit: Maximum number of results
+            radius: Search radius in meters
+
+        Returns:
+            List of restaurant information
+        """
+        logger.info(f"Fetching restaurants near ({lat}, {lon})")
+        _, cell_lat, cell_lon = quantize('restaurants', lat, lon)
+        params = self._restaurants_params(cell_lat, cell_lon, limit, radius)
+        restaurants = self._parse_restaurants(place_store.fetch_places(params, lambda: self._get_places(params)))
+        return measure_from(restaurants, lat, lon, radius)
+
+    def _get_places(self, params: Dict) -> Dict:
+        response = self.session.get(self.BASE_URL, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def _restaurants_params(self, lat: float, lon: float, limit: int, radius: int) -> Dict:
+        return {
+            'categories': self.CATEGORIES,
+            'filter': f'circle:{lon},{lat},{radius}',
+            'bias': f'proximity:{lon},{lat}',  # Nearest first
+            'limit': limit,
+            'apiKey': self.api_key
+        }
+
+    def _parse_restaurants(self, data: Dict) -> List[Dict]:
+        restaurants = []
+        for feature in data.get('features', []):
+            props = feature['properties']
+            coords = feature['geometry']['coordinates']
+
+            restaurants.append({
+                'name': props.get('name', 'Unnamed Restaurant'),
+                'address': props.get('formatted'),
+                'categories': props.get('categories', []),
+                'coordinates': {
+                    'latitude': coords[1],
+                    'longitude': coords[0]
+                },
+                'distance': props.get('distance'),
+                'place_id': props.get('place_id')
+            })
+        return restaurants
+
+
+class AsyncRestaurantsService(RestaurantsService):
+    """Async counterpart of RestaurantsService on the shared httpx client"""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__()
+        self.client = client or get_async_client()
+
+    async def get_restaurants(self, lat: float, lon: float, limit: int = 20, radius: int = 5000) -> List[Dict]:
+        """Get restaurants around a point."""
+        logger.info(f"Fetching restaurants near ({lat}, {lon})")
+        _, cell_lat, cell_lon = quantize('restaurants', lat, lon)
+        params = self._restaurants_params(cell_lat, cell_lon, limit, radius)
+        restaurants = self._parse_restaurants(await place_store.afetch_places(params, lambda: self._get_places(params)))
+        return measure_from(restaurants, lat, lon, radius)
+
+    async def _get_places(self, params: Dict) -> Dict:
+        response = await self.client.get(self.BASE_URL, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
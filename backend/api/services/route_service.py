@@ -2,10 +2,13 @@
 Geoapify Routing API for distance and route calculation.
 """
 import requests
+import httpx
 import logging
 from typing import Optional, Dict
 from django.conf import settings
 
+from .http_client import get_async_client, get_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,9 +17,10 @@ class RouteService:
     
     BASE_URL = "https://api.geoapify.com/v1/routing"
     
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None):
         # Use Geoapify API key (stored as GEOPI_API_KEY in settings)
         self.api_key = getattr(settings, 'GEOPI_API_KEY', None) or settings.OPENROUTESERVICE_API_KEY
+        self.session = session or get_session()
     
     def get_route(self, origin: str, destination: str, profile: str = "driving-car") -> Optional[Dict]:
         """
@@ -35,59 +39,9 @@ class RouteService:
             return self._get_mock_route()
         
         try:
-            # Map profile to Geoapify mode
-            mode_map = {
-                "driving-car": "drive",
-                "driving": "drive",
-                "walking": "walk",
-                "cycling": "bicycle",
-                "transit": "transit"
-            }
-            mode = mode_map.get(profile, "drive")
-            
-            # Format waypoints: origin|destination
-            waypoints = f"{origin}|{destination}"
-            
-            params = {
-                'waypoints': waypoints,
-                'mode': mode,
-                'apiKey': self.api_key
-            }
-            
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
+            response = self.session.get(self.BASE_URL, params=self._route_params(origin, destination, profile), timeout=10)
             response.raise_for_status()
-            data = response.json()
-            
-            # Extract route information from Geoapify response
-            if 'features' in data and len(data['features']) > 0:
-                feature = data['features'][0]
-                properties = feature.get('properties', {})
-                
-                # Distance in meters, convert to km
-                distance_m = properties.get('distance', 0)
-                distance_km = distance_m / 1000
-                
-                # Duration in seconds, convert to minutes/hours
-                duration_sec = properties.get('time', 0)
-                duration_min = duration_sec / 60
-                duration_hours = duration_sec / 3600
-                
-                # Format duration
-                if duration_hours >= 1:
-                    duration_str = f"{duration_hours:.1f} hours"
-                else:
-                    duration_str = f"{duration_min:.0f} minutes"
-                
-                # Format mode name
-                mode_display = mode.replace("drive", "Car").replace("walk", "Walking").replace("bicycle", "Bicycle").replace("transit", "Transit").title()
-                
-                return {
-                    "distance": f"{distance_km:.1f} km",
-                    "duration": duration_str,
-                    "mode": mode_display
-                }
-            
-            return self._get_mock_route()
+            return self._parse_route(response.json(), self._route_mode(profile))
         
         except requests.exceptions.HTTPError as e:
             logger.warning(f"Geoapify API HTTP error: {str(e)}")
@@ -98,6 +52,57 @@ class RouteService:
             logger.warning(f"Route API error: {str(e)}")
             return self._get_mock_route()
     
+    def _route_mode(self, profile: str) -> str:
+        # Map profile to Geoapify mode
+        mode_map = {
+            "driving-car": "drive",
+            "driving": "drive",
+            "walking": "walk",
+            "cycling": "bicycle",
+            "transit": "transit"
+        }
+        return mode_map.get(profile, "drive")
+    
+    def _route_params(self, origin: str, destination: str, profile: str) -> Dict:
+        return {
+            # Format waypoints: origin|destination
+            'waypoints': f"{origin}|{destination}",
+            'mode': self._route_mode(profile),
+            'apiKey': self.api_key
+        }
+    
+    def _parse_route(self, data: Dict, mode: str) -> Dict:
+        # Extract route information from Geoapify response
+        if 'features' in data and len(data['features']) > 0:
+            feature = data['features'][0]
+            properties = feature.get('properties', {})
+            
+            # Distance in meters, convert to km
+            distance_m = properties.get('distance', 0)
+            distance_km = distance_m / 1000
+            
+            # Duration in seconds, convert to minutes/hours
+            duration_sec = properties.get('time', 0)
+            duration_min = duration_sec / 60
+            duration_hours = duration_sec / 3600
+            
+            # Format duration
+            if duration_hours >= 1:
+                duration_str = f"{duration_hours:.1f} hours"
+            else:
+                duration_str = f"{duration_min:.0f} minutes"
+            
+            # Format mode name
+            mode_display = mode.replace("drive", "Car").replace("walk", "Walking").replace("bicycle", "Bicycle").replace("transit", "Transit").title()
+            
+            return {
+                "distance": f"{distance_km:.1f} km",
+                "duration": duration_str,
+                "mode": mode_display
+            }
+        
+        return self._get_mock_route()
+    
     def _get_mock_route(self) -> Dict:
         """Return mock route data when API is unavailable."""
         return {
@@ -106,3 +111,30 @@ class RouteService:
             "mode": "Car"
         }
 
+
+class AsyncRouteService(RouteService):
+    """Async counterpart of RouteService on the shared httpx client."""
+    
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__()
+        self.client = client or get_async_client()
+    
+    async def get_route(self, origin: str, destination: str, profile: str = "driving-car") -> Optional[Dict]:
+        """Get route information between two places using Geoapify."""
+        if not self.api_key:
+            logger.warning("Geoapify API key not configured")
+            return self._get_mock_route()
+        
+        try:
+            response = await self.client.get(self.BASE_URL, params=self._route_params(origin, destination, profile), timeout=10)
+            response.raise_for_status()
+            return self._parse_route(response.json(), self._route_mode(profile))
+        
+        except httpx.HTTPStatusError as e:
+            logger.warning(f"Geoapify API HTTP error: {str(e)}")
+            if e.response.status_code == 401:
+                logger.warning("Geoapify API key is invalid")
+            return self._get_mock_route()
+        except Exception as e:
+            logger.warning(f"Route API error: {str(e)}")
+            return self._get_mock_route()
@@ -0,0 +1,507 @@
+"""
+Single-flight request coalescing for cache misses.
+
+When a cached value is missing, only one caller fetches it from upstream;
+concurrent callers for the same cache key wait for that result instead of
+issuing their own request.
+
+Within a process, callers wait on the in-flight fetch directly (a thread
+event for sync code, a future for async code). Across worker processes the
+leader also takes a short-lived lock in the shared cache, and other processes
+poll the cache until the value appears or the lock is released. Cross-process
+coalescing therefore needs a cache backend shared by all workers.
+
+Entries can also be given a hard timeout longer than their (soft) timeout.
+Past the soft timeout the stale value is still returned at once and a single
+background refresh is started for the key; callers only wait on upstream
+once the hard timeout has passed too and the entry is gone.
+
+Callers may pass an accept predicate to treat a cached value that is not
+good enough for them (say, fewer results than they asked for) as a miss.
+If upstream cannot be called for that fetch (its rate-limit budget is spent,
+its circuit is open or the request deadline has passed), the cached value is
+returned after all rather than nothing.
+
+Values served stale either way are recorded against the request deadline, so
+the response can say which sections are stale. Inside a freshness() block,
+the earliest time any value served stops being fresh is recorded too, so a
+response built from them is cached for no longer than they are.
+
+Lookups that come back empty (None, or an empty list) are cached too, for
+NEGATIVE_CACHE_NOT_FOUND_TTL, and served as such. A fetch that fails while
+nothing is cached is remembered for NEGATIVE_CACHE_ERROR_TTL; until then the
+failure is raised again as CachedFailure without calling upstream. Calls
+that were never sent (UpstreamUnavailable) are not remembered: the rate
+limiter and circuit breakers already answer those without upstream.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+import weakref
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Set, Tuple
+from django.conf import settings
+from django.core.cache import cache
+
+from . import deadline
+from .executor import submit, submit_async
+from .errors import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry(NamedTuple):
+    """A cached value and the time it goes stale"""
+    value: Any
+    fresh_until: float
+
+
+class _Miss(NamedTuple):
+    """A lookup that found nothing, or failed, cached for a short while"""
+    value: Any
+    error: Optional[str] = None
+
+
+class CachedFailure(Exception):
+    """The fetch for a key failed moments ago and is not retried yet"""
+
+    def __init__(self, key: str, error: str):
+        self.key = key
+        super().__init__(f"{key}: {error} (cached failure)")
+
+
+class Freshness:
+    """When the first of the values served inside a freshness() block goes stale"""
+
+    def __init__(self):
+        self.until: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def note(self, fresh_until: float) -> None:
+        with self._lock:
+            self.until = fresh_until if self.until is None else min(self.until, fresh_until)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until then, 0 if a value was already stale, or None if nothing was recorded"""
+        return None if self.until is None else max(0.0, self.until - time.time())
+
+
+_freshness: ContextVar[Optional[Freshness]] = ContextVar('cache_freshness', default=None)
+
+
+@contextmanager
+def freshness():
+    """Record how long the values served inside the block stay fresh"""
+    token = _freshness.set(Freshness())
+    try:
+        yield _freshness.get()
+    finally:
+        _freshness.reset(token)
+
+
+def _served(fresh_until: Optional[float]) -> None:
+    # Older cache entries were stored without their freshness
+    current = _freshness.get()
+    if current is not None and fresh_until is not None:
+        current.note(fresh_until)
+
+
+def note_freshness(fresh_until: float) -> None:
+    """Record a value served from outside single_flight, such as stored places, fresh until then"""
+    _served(fresh_until)
+
+
+class _Flight:
+    """A fetch in progress that other threads can wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self) -> Any:
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Coalesces concurrent cache-miss fetches for the same cache key"""
+
+    LOCK_PREFIX = 'singleflight'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        # asyncio futures belong to one event loop, so keep a map per loop
+        self._async_flights = weakref.WeakKeyDictionary()
+        # Keys with a background refresh running in this process
+        self._refreshing: Set[str] = set()
+        self._refresh_tasks: Set[Future] = set()
+
+    @property
+    def lock_timeout(self) -> float:
+        return getattr(settings, 'SINGLE_FLIGHT_LOCK_TIMEOUT', 30)
+
+    @property
+    def wait_timeout(self) -> float:
+        return getattr(settings, 'SINGLE_FLIGHT_WAIT_TIMEOUT', 15)
+
+    @property
+    def poll_interval(self) -> float:
+        return getattr(settings, 'SINGLE_FLIGHT_POLL_INTERVAL', 0.05)
+
+    @property
+    def not_found_ttl(self) -> float:
+        return getattr(settings, 'NEGATIVE_CACHE_NOT_FOUND_TTL', 60 * 60)
+
+    @property
+    def error_ttl(self) -> float:
+        return getattr(settings, 'NEGATIVE_CACHE_ERROR_TTL', 60)
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.LOCK_PREFIX}:{key}"
+
+    def _read(self, key: str) -> Tuple[Any, Optional[float]]:
+        """Return (value, time it goes stale) for a cached key; None if not known"""
+        cached = cache.get(key)
+        if isinstance(cached, _Entry):
+            return cached.value, cached.fresh_until
+        return cached, None
+
+    async def _aread(self, key: str) -> Tuple[Any, Optional[float]]:
+        cached = await cache.aget(key)
+        if isinstance(cached, _Entry):
+            return cached.value, cached.fresh_until
+        return cached, None
+
+    def _fresh(self, fresh_until: Optional[float]) -> bool:
+        return fresh_until is None or fresh_until > time.time()
+
+    def _entry(self, value: Any, timeout: float, hard_timeout: Optional[float]) -> Tuple[Any, float]:
+        """The object to cache and its cache timeout"""
+        return _Entry(value, time.time() + timeout), max(timeout, hard_timeout or timeout)
+
+    def _accepts(self, value: Any, accept: Optional[Callable[[Any], bool]]) -> bool:
+        return value is not None and (accept is None or accept(value))
+
+    def _replay(self, miss: _Miss, key: str) -> Any:
+        """What a cached miss stands for: the empty result, or its failure"""
+        if miss.error is not None:
+            raise CachedFailure(key, miss.error)
+        return miss.value
+
+    def _remembers(self, held: Any, error: Exception) -> bool:
+        # Only where nothing is cached, so a held value is never replaced by a
+        # failure. Just the error type is kept: messages may carry API keys.
+        return held is None and not isinstance(error, UpstreamUnavailable)
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any], timeout: float,
+                     hard_timeout: Optional[float] = None,
+                     accept: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return the cached value for key, fetching and caching it on a miss.
+
+        Args:
+            key: Cache key
+            fetch: Callable returning the fresh value; None or an empty
+                value is cached as a miss, for a shorter time
+            timeout: Seconds the value is fresh
+            hard_timeout: Seconds the value is kept at all; between timeout
+                and hard_timeout it is served stale while a background
+                refresh runs (default: never served stale)
+            accept: Predicate a cached value must pass to be returned instead
+                of fetched again
+
+        Returns:
+            The cached or freshly fetched value. Errors raised by fetch are
+            re-raised to every caller waiting on it.
+
+        Raises:
+            CachedFailure: If the fetch failed within NEGATIVE_CACHE_ERROR_TTL
+        """
+        value, fresh_until = self._read(key)
+        if isinstance(value, _Miss):
+            return self._replay(value, key)
+        if self._accepts(value, accept):
+            if not self._fresh(fresh_until):
+                deadline.mark_stale()
+                self._schedule_refresh(key, fetch, timeout, hard_timeout)
+            _served(fresh_until)
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+
+        if not leader:
+            result = flight.wait()
+            if accept is None or self._accepts(result, accept):
+                _served(self._fetched_fresh_until(result, timeout))
+                return result
+            # The fetch in flight was not enough for this caller
+            return self._fetch_or_degrade(key, value, fetch, timeout, hard_timeout, accept)
+
+        try:
+            flight.result = self._fetch_or_degrade(key, value, fetch, timeout, hard_timeout, accept)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+
+    def _fetch_or_degrade(self, key: str, held: Any, fetch: Callable[[], Any], timeout: float,
+                          hard_timeout: Optional[float], accept: Optional[Callable[[Any], bool]]) -> Any:
+        try:
+            return self._fetch_with_lock(key, fetch, timeout, hard_timeout, accept)
+        except UpstreamUnavailable:
+            # Upstream budget spent or circuit open: a cached value that fell short will do
+            if held is None:
+                raise
+            logger.info(f"Serving cached {key} as is, upstream unavailable")
+            deadline.mark_stale()
+            _served(time.time())
+            return held
+        except Exception as e:
+            if self._remembers(held, e):
+                cache.set(key, _Miss(None, type(e).__name__), self.error_ttl)
+            raise
+
+    def _fetch_with_lock(self, key: str, fetch: Callable[[], Any], timeout: float,
+                         hard_timeout: Optional[float], accept: Optional[Callable[[Any], bool]]) -> Any:
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        give_up_at = time.monotonic() + deadline.cap(self.wait_timeout)
+
+        while not cache.add(lock_key, token, self.lock_timeout):
+            # Another worker process is fetching this key
+            time.sleep(self.poll_interval)
+            value, fresh_until = self._read(key)
+            if isinstance(value, _Miss):
+                return self._replay(value, key)
+            if self._accepts(value, accept):
+                _served(fresh_until)
+                return value
+            if time.monotonic() >= give_up_at:
+                logger.warning(f"Timed out waiting for in-flight fetch of {key}")
+                return self._store(key, fetch(), timeout, hard_timeout)
+
+        try:
+            # The previous lock holder may have filled the cache
+            value, fresh_until = self._read(key)
+            if isinstance(value, _Miss):
+                return self._replay(value, key)
+            if self._accepts(value, accept):
+                _served(fresh_until)
+                return value
+            return self._store(key, fetch(), timeout, hard_timeout)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    def _store(self, key: str, value: Any, timeout: float, hard_timeout: Optional[float]) -> Any:
+        cache.set(key, *self._cached(value, timeout, hard_timeout))
+        _served(self._fetched_fresh_until(value, timeout))
+        return value
+
+    def _cached(self, value: Any, timeout: float, hard_timeout: Optional[float]) -> Tuple[Any, float]:
+        """The object to cache for a fetched value and its cache timeout"""
+        if not value:
+            # Nothing there: remember that, but not for as long as a result
+            return _Miss(value), min(timeout, self.not_found_ttl)
+        return self._entry(value, timeout, hard_timeout)
+
+    def _fetched_fresh_until(self, value: Any, timeout: float) -> float:
+        """When a value fetched just now goes stale"""
+        return time.time() + (timeout if value else min(timeout, self.not_found_ttl))
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing or key in self._flights:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def _schedule_refresh(self, key: str, fetch: Callable[[], Any], timeout: float,
+                          hard_timeout: Optional[float]) -> None:
+        if not self._claim_refresh(key):
+            return
+        logger.info(f"Serving stale {key}, refreshing in the background")
+        try:
+            submit(self._refresh, key, fetch, timeout, hard_timeout)
+        except RuntimeError:
+            # Executor shut down
+            self._release_refresh(key)
+
+    def _refresh(self, key: str, fetch: Callable[[], Any], timeout: float,
+                 hard_timeout: Optional[float]) -> None:
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        try:
+            # The refresh outlives the request that started it
+            with deadline.detached():
+                # Skip if another worker process is already fetching this key
+                if not cache.add(lock_key, token, self.lock_timeout):
+                    return
+                try:
+                    _, fresh_until = self._read(key)
+                    if not self._fresh(fresh_until):
+                        self._store(key, fetch(), timeout, hard_timeout)
+                finally:
+                    if cache.get(lock_key) == token:
+                        cache.delete(lock_key)
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {str(e)}")
+        finally:
+            self._release_refresh(key)
+
+    async def aget_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]], timeout: float,
+                            hard_timeout: Optional[float] = None,
+                            accept: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Async counterpart of get_or_fetch; fetch returns an awaitable"""
+        value, fresh_until = await self._aread(key)
+        if isinstance(value, _Miss):
+            return self._replay(value, key)
+        if self._accepts(value, accept):
+            if not self._fresh(fresh_until):
+                deadline.mark_stale()
+                self._aschedule_refresh(key, fetch, timeout, hard_timeout)
+            _served(fresh_until)
+            return value
+
+        loop = asyncio.get_running_loop()
+        flights = self._async_flights.setdefault(loop, {})
+        while key in flights:
+            flight = flights[key]
+            try:
+                result = await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                # Only retry when the leader was cancelled, not this caller
+                if not flight.cancelled():
+                    raise
+                continue
+            if accept is None or self._accepts(result, accept):
+                _served(self._fetched_fresh_until(result, timeout))
+                return result
+
+        flight = loop.create_future()
+        flights[key] = flight
+        try:
+            result = await self._afetch_or_degrade(key, value, fetch, timeout, hard_timeout, accept)
+            flight.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            flight.exception()
+            raise
+        finally:
+            del flights[key]
+
+    async def _afetch_or_degrade(self, key: str, held: Any, fetch: Callable[[], Awaitable[Any]], timeout: float,
+                                 hard_timeout: Optional[float], accept: Optional[Callable[[Any], bool]]) -> Any:
+        try:
+            return await self._afetch_with_lock(key, fetch, timeout, hard_timeout, accept)
+        except UpstreamUnavailable:
+            if held is None:
+                raise
+            logger.info(f"Serving cached {key} as is, upstream unavailable")
+            deadline.mark_stale()
+            _served(time.time())
+            return held
+        except Exception as e:
+            if self._remembers(held, e):
+                await cache.aset(key, _Miss(None, type(e).__name__), self.error_ttl)
+            raise
+
+    async def _afetch_with_lock(self, key: str, fetch: Callable[[], Awaitable[Any]], timeout: float,
+                                hard_timeout: Optional[float], accept: Optional[Callable[[Any], bool]]) -> Any:
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        give_up_at = time.monotonic() + deadline.cap(self.wait_timeout)
+
+        while not await cache.aadd(lock_key, token, self.lock_timeout):
+            await asyncio.sleep(self.poll_interval)
+            value, fresh_until = await self._aread(key)
+            if isinstance(value, _Miss):
+                return self._replay(value, key)
+            if self._accepts(value, accept):
+                _served(fresh_until)
+                return value
+            if time.monotonic() >= give_up_at:
+                logger.warning(f"Timed out waiting for in-flight fetch of {key}")
+                return await self._astore(key, await fetch(), timeout, hard_timeout)
+
+        try:
+            value, fresh_until = await self._aread(key)
+            if isinstance(value, _Miss):
+                return self._replay(value, key)
+            if self._accepts(value, accept):
+                _served(fresh_until)
+                return value
+            return await self._astore(key, await fetch(), timeout, hard_timeout)
+        finally:
+            # Released even if this fetch is cancelled again while releasing
+            await asyncio.shield(self._arelease(lock_key, token))
+
+    async def _arelease(self, lock_key: str, token: str) -> None:
+        if await cache.aget(lock_key) == token:
+            await cache.adelete(lock_key)
+
+    async def _astore(self, key: str, value: Any, timeout: float, hard_timeout: Optional[float]) -> Any:
+        await cache.aset(key, *self._cached(value, timeout, hard_timeout))
+        _served(self._fetched_fresh_until(value, timeout))
+        return value
+
+    def _aschedule_refresh(self, key: str, fetch: Callable[[], Awaitable[Any]], timeout: float,
+                           hard_timeout: Optional[float]) -> None:
+        loop = asyncio.get_running_loop()
+        if key in self._async_flights.get(loop, {}) or not self._claim_refresh(key):
+            return
+        logger.info(f"Serving stale {key}, refreshing in the background")
+        # Not on this loop: under WSGI it is closed when the request ends,
+        # before the refresh could finish
+        future = submit_async(self._arefresh, key, fetch, timeout, hard_timeout)
+        # The loop only keeps weak references to tasks
+        self._refresh_tasks.add(future)
+        future.add_done_callback(self._refresh_tasks.discard)
+
+    async def _arefresh(self, key: str, fetch: Callable[[], Awaitable[Any]], timeout: float,
+                        hard_timeout: Optional[float]) -> None:
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        try:
+            with deadline.detached():
+                if not await cache.aadd(lock_key, token, self.lock_timeout):
+                    return
+                try:
+                    _, fresh_until = await self._aread(key)
+                    if not self._fresh(fresh_until):
+                        await self._astore(key, await fetch(), timeout, hard_timeout)
+                finally:
+                    await asyncio.shield(self._arelease(lock_key, token))
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {str(e)}")
+        finally:
+            self._release_refresh(key)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,220 @@
+"""
+In-memory spatial index of fetched points of interest.
+
+Every Geoapify places response is recorded as a covered region: a circle
+around the query centre inside which all POIs of the query's categories are
+known. That is the full query circle when upstream returned fewer features
+than the limit. Otherwise it is the circle up to the farthest returned
+feature, because queries are biased by proximity to their centre so a
+truncated result holds the nearest POIs.
+
+A later query for the same or a subset of a region's categories is answered
+from the region's features by distance filtering and sorting when its
+circle lies inside the region, or when its centre does and the `limit`
+nearest matches all lie within the part of the region around it (no
+unknown POI can then be nearer). So a smaller limit or radius around the
+same centre is served from a larger result. Regions are bucketed by the
+geohash of their centre so only regions near the query centre are examined.
+
+A response may carry `fetched_at`, when its features came from upstream
+(for one read back from the place store, when they were first fetched).
+Regions keep it, and the collections they answer with carry it on.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+
+from .. import geo
+
+logger = logging.getLogger(__name__)
+
+
+class _Region:
+    """A covered circle and the features known inside it"""
+
+    def __init__(self, categories: List[str], lat: float, lon: float, radius: float,
+                 features: List[Tuple[float, float, List[str], Dict]], bucket: str, fetched_at: float):
+        self.categories = categories
+        self.lat = lat
+        self.lon = lon
+        self.radius = radius
+        self.features = features
+        self.bucket = bucket
+        self.fetched_at = fetched_at
+        self.created_at = time.monotonic()
+
+
+class SpatialIndex:
+    """Answers places queries inside already covered circles without upstream calls"""
+
+    # Longest geohash used to bucket region centres (cells of ~20 km and up)
+    BUCKET_PRECISION = 4
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._regions: 'OrderedDict[int, _Region]' = OrderedDict()
+        self._buckets: Dict[str, List[int]] = {}
+        self._next_id = 0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def max_regions(self) -> int:
+        return getattr(settings, 'SPATIAL_INDEX_MAX_REGIONS', 5000)
+
+    @property
+    def ttl(self) -> float:
+        return getattr(settings, 'SPATIAL_INDEX_TTL', 60 * 60 * 6)
+
+    def find(self, categories: str, lat: float, lon: float,
+             radius: float, limit: int) -> Optional[Dict]:
+        """
+        Answer a places query from a covered region.
+
+        Returns:
+            A Geoapify-style FeatureCollection sorted by distance, or None
+            when no fresh region contains the query circle
+        """
+        match = self._match(categories, lat, lon, radius, limit)
+        if match is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        matches, region = match
+        with self._lock:
+            self._hits += 1
+        return {
+            'type': 'FeatureCollection',
+            'fetched_at': region.fetched_at,
+            'features': [
+                {**feature, 'properties': {**feature['properties'], 'distance': round(distance)}}
+                for distance, feature in matches[:limit]
+            ]
+        }
+
+    def covers(self, categories: str, lat: float, lon: float,
+               radius: float, limit: int) -> bool:
+        """Whether find would answer the query, without counting a hit or miss"""
+        return self._match(categories, lat, lon, radius, limit) is not None
+
+    def _match(self, categories: str, lat: float, lon: float,
+               radius: float, limit: int) -> Optional[Tuple[List[Tuple[float, Dict]], _Region]]:
+        """(distance, feature) pairs answering the query, nearest first, and their region, or None"""
+        wanted = categories.split(',')
+        for region, reach in self._regions_around(wanted, lat, lon):
+            matches = []
+            for f_lat, f_lon, f_categories, feature in region.features:
+                distance = geo.haversine_m(lat, lon, f_lat, f_lon)
+                if distance <= radius and _matches_categories(f_categories, wanted):
+                    matches.append((distance, feature))
+            matches.sort(key=lambda match: match[0])
+
+            # Every POI within reach of the centre is known
+            if radius <= reach or (0 < limit <= len(matches) and matches[limit - 1][0] <= reach):
+                return matches, region
+        return None
+
+    def add(self, categories: str, lat: float, lon: float,
+            radius: float, limit: int, data: Dict) -> None:
+        """Record the response to a places query as a covered region"""
+        features = []
+        farthest = 0.0
+        for feature in data.get('features', []):
+            coords = feature.get('geometry', {}).get('coordinates')
+            if not coords:
+                continue
+            f_lon, f_lat = coords[0], coords[1]
+            categories_of = feature.get('properties', {}).get('categories', [])
+            features.append((f_lat, f_lon, categories_of, feature))
+            farthest = max(farthest, geo.haversine_m(lat, lon, f_lat, f_lon))
+
+        if len(features) >= limit:
+            # Truncated: only POIs nearer than the farthest one returned are
+            # known to be complete
+            radius = min(radius, farthest - 1)
+        if radius <= 0:
+            return
+
+        bucket = geo.encode(lat, lon, self._bucket_precision(lat, radius))
+        region = _Region(categories.split(','), lat, lon, radius, features, bucket,
+                         data.get('fetched_at') or time.time())
+        with self._lock:
+            region_id = self._next_id
+            self._next_id += 1
+            self._regions[region_id] = region
+            self._buckets.setdefault(bucket, []).append(region_id)
+            while len(self._regions) > self.max_regions:
+                self._evict(*self._regions.popitem(last=False))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'regions': len(self._regions),
+                'max_regions': self.max_regions,
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._regions.clear()
+            self._buckets.clear()
+
+    def _evict(self, region_id: int, region: _Region) -> None:
+        region_ids = self._buckets.get(region.bucket, [])
+        if region_id in region_ids:
+            region_ids.remove(region_id)
+        if not region_ids:
+            self._buckets.pop(region.bucket, None)
+
+    def _bucket_precision(self, lat: float, radius: float) -> int:
+        # Cells at least as large as the region, so any query centre inside
+        # the region falls in its bucket or a neighbouring one
+        return geo.precision_for_radius(lat, radius, self.BUCKET_PRECISION)
+
+    def _regions_around(self, wanted: List[str], lat: float, lon: float) -> List[Tuple[_Region, float]]:
+        """
+        Fresh regions covering the wanted categories whose circle contains
+        the point, with how far from the point each reaches
+        """
+        expires_before = time.monotonic() - self.ttl
+        regions = []
+        with self._lock:
+            for precision in range(1, self.BUCKET_PRECISION + 1):
+                for bucket in geo.neighbors(geo.encode(lat, lon, precision)):
+                    region_ids = self._buckets.get(bucket)
+                    if not region_ids:
+                        continue
+
+                    # Newest regions first, dropping expired ones as we go
+                    for region_id in reversed(list(region_ids)):
+                        region = self._regions[region_id]
+                        if region.created_at < expires_before:
+                            del self._regions[region_id]
+                            self._evict(region_id, region)
+                        elif self._covers_categories(region, wanted):
+                            reach = region.radius - geo.haversine_m(region.lat, region.lon, lat, lon)
+                            if reach > 0:
+                                regions.append((region, reach))
+        return regions
+
+    def _covers_categories(self, region: _Region, wanted: List[str]) -> bool:
+        return all(
+            any(w == c or w.startswith(c + '.') for c in region.categories)
+            for w in wanted
+        )
+
+
+def _matches_categories(poi_categories: List[str], wanted: List[str]) -> bool:
+    return any(
+        category == w or category.startswith(w + '.')
+        for category in poi_categories
+        for w in wanted
+    )
+
+
+spatial_index = SpatialIndex()
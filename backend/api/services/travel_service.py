@@ -1,10 +1,22 @@
-import requests
+import httpx
 import logging
 from django.conf import settings
-from django.core.cache import cache
-from typing import Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
 import time
 
+from .executor import agather_sections, aiter_sections, stream_from
+from .geocoding_service import AsyncGeocodingService, GeocodingService, normalize_place
+from .hotels_service import AsyncHotelsService, HotelsService
+from . import limited_results
+from .coordinates import measure_from, quantize
+from .deadline import incomplete_sections
+from .http_client import get_async_client
+from .place_store import place_store
+from .places_planner import places_plan
+from .errors import UpstreamUnavailable, unavailable_error
+from .request_memo import cancel_pending, memo_scope
+from .single_flight import single_flight
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,323 +27,502 @@ class TravelService:
     - Unsplash for high-quality images
     - OpenWeatherMap for weather data
     - OpenRouteService for distances and directions
+
+    Holds what does not depend on how upstream is called: the sections and
+    their TTLs, request parameters, cache keys, response parsing and
+    assembly. AsyncTravelService fetches the sections.
     """
 
+    PLACES_URL = "https://api.geoapify.com/v2/places"
+    IMAGES_URL = "https://api.unsplash.com/search/photos"
+    WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+    ROUTE_URL = "https://api.openrouteservice.org/v2/directions/driving-car"
+
+    # Sections a client can ask for; the place itself is always included
+    SECTIONS = ('images', 'weather', 'attractions', 'details', 'hotels', 'distance')
+
+    # Seconds each section's cache entries stay fresh
+    SECTION_TTLS = {
+        'place': GeocodingService.CACHE_TTL,
+        'images': 60 * 60 * 12,
+        'weather': 60 * 30,
+        'attractions': 60 * 60 * 6,
+        'details': 60 * 60 * 12,
+        'hotels': HotelsService.CACHE_TTL,
+        'distance': 60 * 60 * 24,
+    }
+
+    ATTRACTIONS_LIMIT = 15
+    HOTELS_LIMIT = 10
+
     def __init__(self):
         self.geoapify_key = settings.GEOPI_API_KEY
         self.unsplash_key = settings.UNSPLASH_ACCESS_KEY
         self.weather_key = settings.OPENWEATHER_API_KEY
         self.routing_key = settings.OPENROUTESERVICE_API_KEY
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': 'TravelAI/1.0'})
 
-    def get_travel_info(self, place: str, user_location: Optional[str] = None) -> Dict:
+    def _place_summary(self, place: str, place_data: Dict) -> Dict:
+        return {
+            'name': place_data.get('name', place),
+            'formatted_address': place_data.get('formatted', place),
+            'coordinates': {
+                'latitude': place_data['lat'],
+                'longitude': place_data['lon']
+            }
+        }
+
+    def _build_travel_info(self, place: str, place_data: Dict, sections: Dict,
+                           fields: Optional[Iterable[str]] = None) -> Dict:
+        """Assemble the travel info response from the geocoded place and its sections"""
+        info = {
+            'place': {
+                **self._place_summary(place, place_data),
+                'details': sections.get('details')
+            },
+            'images': sections.get('images'),
+            'weather': sections.get('weather'),
+            'attractions': sections.get('attractions'),
+            'distance': sections.get('distance'),
+            'timestamp': time.time(),
+            'hotels': sections.get('hotels')
+        }
+        if fields is not None:
+            # Leave out what was not asked for rather than report it as empty
+            for name in self.SECTIONS:
+                if name not in fields:
+                    (info['place'] if name == 'details' else info).pop(name)
+        partial = incomplete_sections()
+        if partial:
+            info['partial'] = partial
+        return info
+
+    def response_ttl(self, info: Dict, user_location: Optional[str] = None,
+                     fresh_for: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds a travel info response can be reused: how long the cached
+        sections it was built from stay fresh (fresh_for, as recorded by
+        single_flight.freshness(); the shortest section TTL when not known),
+        or NEGATIVE_CACHE_ERROR_TTL at most if one of them came back empty,
+        since that may be a failure. None for a partial response, or one
+        built from a section that is no longer fresh, which should not be
+        reused.
+        """
+        if 'partial' in info:
+            return None
+        ttls = [self.SECTION_TTLS['place']]
+        ttls += [self.SECTION_TTLS[name] for name in self.SECTIONS if name in self._section_holder(info, name)]
+        if fresh_for is not None:
+            ttls.append(fresh_for)
+        ttl = min(ttls)
+        if ttl <= 0:
+            return None
+        return min(ttl, single_flight.error_ttl) if self.empty_sections(info, user_location) else ttl
+
+    def empty_sections(self, info: Dict, user_location: Optional[str] = None) -> List[str]:
+        """
+        Sections of a travel info response that came back empty, which may
+        be because fetching them failed. Distance is only expected with a
+        user location.
+        """
+        return [
+            name for name in self.SECTIONS
+            if name in self._section_holder(info, name) and not self._section_holder(info, name)[name]
+            and (name != 'distance' or user_location)
+        ]
+
+    def _section_holder(self, info: Dict, name: str) -> Dict:
+        # Place details are nested under the place summary
+        return info['place'] if name == 'details' else info
+
+    def _images_cache_key(self, place: str) -> str:
+        # Holds the largest result fetched; smaller limits are sliced from it
+        return f"images_{normalize_place(place).replace(' ', '_')}"
+
+    def _images_params(self, place: str, limit: int) -> Dict:
+        return {
+            'query': place,
+            'per_page': limit,
+            'client_id': self.unsplash_key,
+            'orientation': 'landscape'
+        }
+
+    def _parse_images(self, data: Dict) -> List[Dict]:
+        images = []
+        for photo in data.get('results', []):
+            images.append({
+                'id': photo['id'],
+                'url': photo['urls']['regular'],
+                'thumb': photo['urls']['thumb'],
+                'full': photo['urls']['full'],
+                'photographer': photo['user']['name'],
+                'photographer_url': photo['user']['links']['html'],
+                'description': photo.get('description', photo.get('alt_description')),
+                'width': photo['width'],
+                'height': photo['height']
+            })
+        return images
+
+    def _weather_cache_key(self, cell: str) -> str:
+        return f"weather_{cell}"
+
+    def _weather_params(self, lat: float, lon: float) -> Dict:
+        return {
+            'lat': lat,
+            'lon': lon,
+            'appid': self.weather_key,
+            'units': 'metric'
+        }
+
+    def _parse_weather(self, data: Dict) -> Dict:
+        return {
+            'temperature': data['main']['temp'],
+            'feels_like': data['main']['feels_like'],
+            'humidity': data['main']['humidity'],
+            'description': data['weather'][0]['description'],
+            'icon': data['weather'][0]['icon'],
+            'wind_speed': data['wind']['speed'],
+            'pressure': data['main']['pressure']
+        }
+
+    def _attractions_cache_key(self, cell: str) -> str:
+        return f"attractions_{cell}"
+
+    def _attractions_params(self, lat: float, lon: float, limit: int) -> Dict:
+        return {
+            'categories': 'tourism.attraction,tourism.sights,entertainment,leisure',
+            'filter': f'circle:{lon},{lat},10000',  # 10km radius
+            'bias': f'proximity:{lon},{lat}',  # Nearest first
+            'limit': limit,
+            'apiKey': self.geoapify_key
+        }
+
+    def _parse_attractions(self, data: Dict) -> List[Dict]:
+        attractions = []
+        for feature in data.get('features', []):
+            props = feature['properties']
+            coords = feature['geometry']['coordinates']
+
+            attractions.append({
+                'name': props.get('name', 'Unnamed'),
+                'category': props.get('categories', []),
+                'address': props.get('formatted'),
+                'coordinates': {
+                    'latitude': coords[1],
+                    'longitude': coords[0]
+                },
+                'distance': props.get('distance'),
+                'place_id': props.get('place_id')
+            })
+        return attractions
+
+    def _distance_cache_key(self, origin: str, destination: str) -> str:
+        return f"distance_{normalize_place(origin)}_{normalize_place(destination)}".replace(' ', '_')
+
+    def _route_body(self, origin_coords: Dict, dest_coords: Dict) -> Dict:
+        return {
+            'coordinates': [
+                [origin_coords['lon'], origin_coords['lat']],
+                [dest_coords['lon'], dest_coords['lat']]
+            ]
+        }
+
+    def _parse_route(self, origin: str, destination: str, data: Dict) -> Dict:
+        route = data['routes'][0]
+        summary = route['summary']
+
+        return {
+            'distance_km': round(summary['distance'] / 1000, 2),
+            'duration_hours': round(summary['duration'] / 3600, 2),
+            'origin': origin,
+            'destination': destination
+        }
+
+    def _place_details_cache_key(self, place: str) -> str:
+        return f"place_details_{normalize_place(place).replace(' ', '_')}"
+
+    def _place_details_params(self, lat: float, lon: float) -> Dict:
+        return {
+            'categories': 'tourism,commercial,entertainment',
+            'filter': f'circle:{lon},{lat},1000',
+            'bias': f'proximity:{lon},{lat}',  # Nearest first
+            'limit': 5,
+            'apiKey': self.geoapify_key
+        }
+
+    def _parse_place_details(self, data: Dict) -> Dict:
+        details = {
+            'total_places': len(data.get('features', [])),
+            'categories': []
+        }
+
+        for feature in data.get('features', []):
+            props = feature['properties']
+            if 'categories' in props:
+                details['categories'].extend(props['categories'])
+
+        details['categories'] = list(set(details['categories']))[:10]
+        return details
+
+    def _empty_place_details(self) -> Dict:
+        return {'total_places': 0, 'categories': []}
+
+
+class AsyncTravelService(TravelService):
+    """
+    Fetches travel information on the shared httpx client.
+
+    Every upstream call is awaited, so a worker can hold many in-flight
+    upstream waits without tying up a thread per request.
+    """
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__()
+        self.client = client or get_async_client()
+        self.geocoder = AsyncGeocodingService(self.client)
+
+    async def get_travel_info(self, place: str, user_location: Optional[str] = None,
+                              fields: Optional[Iterable[str]] = None) -> Dict:
         """
         Get comprehensive travel information for a place.
-        
+
+        Once the place is geocoded, images, weather, attractions, place details,
+        hotels and distance are awaited concurrently on the running event loop.
+        All of them share one request memo, so each distinct place is geocoded
+        at most once.
+
+        Inside a request deadline, sections that do not finish in time are
+        left at their defaults; 'partial' then lists them as skipped, along
+        with sections served from a stale cache entry.
+
         Args:
             place: Destination place name
             user_location: User's current location (optional)
-            
+            fields: Sections to include, out of SECTIONS (default: all).
+                Other sections are neither fetched nor looked up in the cache.
+
         Returns:
             Dict containing all travel information
         """
+        with memo_scope():
+            return await self._get_travel_info(place, user_location, fields)
+
+    async def _get_travel_info(self, place: str, user_location: Optional[str],
+                               fields: Optional[Iterable[str]]) -> Dict:
         try:
             # 1. Get place coordinates and details
-            place_data = self._geocode_place(place)
+            place_data = await self._geocode_place(place)
             if not place_data:
                 return {'error': 'Place not found'}
 
-            lat, lon = place_data['lat'], place_data['lon']
-            
-            # 2. Get place images
-            images = self._get_place_images(place, limit=10)
-            
-            # 3. Get weather information
-            weather = self._get_weather(lat, lon)
-            
-            # 4. Get nearby attractions
-            attractions = self._get_nearby_attractions(lat, lon, limit=15)
-            
-            # 5. Calculate distance if user location provided
-            distance_info = None
-            if user_location:
-                distance_info = self._calculate_distance(user_location, place)
-            
-            # 6. Get place categories and details
-            place_details = self._get_place_details(place, lat, lon)
-
-            return {
-                'place': {
-                    'name': place_data.get('name', place),
-                    'formatted_address': place_data.get('formatted', place),
-                    'coordinates': {
-                        'latitude': lat,
-                        'longitude': lon
-                    },
-                    'details': place_details
-                },
-                'images': images,
-                'weather': weather,
-                'attractions': attractions,
-                'distance': distance_info,
-                'timestamp': time.time()
-            }
+            # 2. Fetch every independent section concurrently, with their
+            # places queries merged into as few upstream calls as possible
+            with places_plan(self._planned_places(place_data, fields), self._get_places):
+                sections = await agather_sections(self._section_tasks(place, place_data, user_location, fields))
+
+            return self._build_travel_info(place, place_data, sections, fields)
+
+        except UpstreamUnavailable:
+            raise
 
         except Exception as e:
             logger.error(f"Error in get_travel_info: {str(e)}", exc_info=True)
             raise
 
-    def _geocode_place(self, place: str) -> Optional[Dict]:
-        """Geocode place name to coordinates using Geoapify"""
-        cache_key = f"geocode_{place.lower().replace(' ', '_')}"
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
+    def _section_tasks(self, place: str, place_data: Dict, user_location: Optional[str],
+                       fields: Optional[Iterable[str]] = None) -> Dict:
+        """Sections to fetch for a geocoded place, as (awaitable, default)"""
+        lat, lon = place_data['lat'], place_data['lon']
+        tasks = {
+            'images': (self._get_place_images, (place, 10), []),
+            'weather': (self._get_weather, (lat, lon), None),
+            'attractions': (self._get_nearby_attractions, (lat, lon, self.ATTRACTIONS_LIMIT), []),
+            'details': (self._get_place_details, (place, lat, lon), self._empty_place_details()),
+            'hotels': (self._get_hotels, (place, self.HOTELS_LIMIT), []),
+        }
+        if user_location:
+            tasks['distance'] = (self._calculate_distance, (user_location, place), None)
+        # Coroutines are only created for the sections wanted, so the others never run
+        return {
+            name: (fn(*args), default)
+            for name, (fn, args, default) in tasks.items()
+            if fields is None or name in fields
+        }
+
+    def _planned_places(self, place_data: Dict, fields: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Geoapify places queries the requested sections will make around the place"""
+        lat, lon = place_data['lat'], place_data['lon']
+        _, cell_lat, cell_lon = quantize('attractions', lat, lon)
+        planned = {
+            'attractions': self._attractions_params(cell_lat, cell_lon, self.ATTRACTIONS_LIMIT),
+            'details': self._place_details_params(lat, lon),
+            'hotels': AsyncHotelsService(self.client)._hotels_params(lat, lon, self.HOTELS_LIMIT),
+        }
+        return [params for name, params in planned.items() if fields is None or name in fields]
+
+    def stream_travel_info(self, place: str, user_location: Optional[str] = None,
+                           fields: Optional[Iterable[str]] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Yield travel information for a place section by section.
 
-        try:
-            url = "https://api.geoapify.com/v1/geocode/search"
-            params = {
-                'text': place,
-                'apiKey': self.geoapify_key,
-                'limit': 1
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get('features'):
-                feature = data['features'][0]
-                properties = feature['properties']
-                coords = feature['geometry']['coordinates']
-                
-                result = {
-                    'lat': coords[1],
-                    'lon': coords[0],
-                    'name': properties.get('name', place),
-                    'formatted': properties.get('formatted', place),
-                    'country': properties.get('country'),
-                    'city': properties.get('city'),
-                    'state': properties.get('state')
-                }
-                
-                cache.set(cache_key, result, 60 * 60 * 24)  # Cache for 24 hours
-                return result
+        The first event is ('place', summary) as soon as the place is geocoded,
+        or ('error', {...}) if it cannot be. Then each requested section
+        follows as it finishes, and finally ('done', {...}). Sections still
+        running at the request deadline are not sent; 'done' then carries
+        'partial' as get_travel_info does.
 
-        except Exception as e:
-            logger.error(f"Geocoding error: {str(e)}")
-            
-        return None
+        Closing the iterator cancels the sections still running.
+        """
+        return stream_from(lambda emit: self._stream_travel_info(place, user_location, fields, emit))
+
+    async def _stream_travel_info(self, place: str, user_location: Optional[str],
+                                  fields: Optional[Iterable[str]],
+                                  emit: Callable[[Tuple[str, Any]], None]) -> None:
+        with memo_scope():
+            try:
+                place_data = await self._geocode_place(place)
+                if not place_data:
+                    emit(('error', {'error': 'Place not found'}))
+                    return
+                emit(('place', self._place_summary(place, place_data)))
+
+                with places_plan(self._planned_places(place_data, fields), self._get_places):
+                    tasks = self._section_tasks(place, place_data, user_location, fields)
+                    async for name, value in aiter_sections(tasks):
+                        emit((name, value))
+                done = {'timestamp': time.time()}
+                partial = incomplete_sections()
+                if partial:
+                    done['partial'] = partial
+                emit(('done', done))
+
+            except UpstreamUnavailable as e:
+                emit(('error', unavailable_error(e)))
+
+            except Exception as e:
+                logger.error(f"Error in stream_travel_info: {str(e)}", exc_info=True)
+                emit(('error', {
+                    'error': 'An error occurred while fetching travel information',
+                    'details': str(e)
+                }))
+
+            finally:
+                # Geocodes shared between sections outlive the sections themselves
+                await cancel_pending()
+
+    async def _get_hotels(self, place: str, limit: int) -> List[Dict]:
+        return await AsyncHotelsService(self.client).get_hotels(place, limit)
+
+    async def _geocode_place(self, place: str) -> Optional[Dict]:
+        """Geocode place name to coordinates using Geoapify"""
+        return await self.geocoder.geocode(place, strict=True)
 
-    def _get_place_images(self, place: str, limit: int = 10) -> List[Dict]:
+    async def _get_place_images(self, place: str, limit: int = 10) -> List[Dict]:
         """Get high-quality images from Unsplash"""
-        cache_key = f"images_{place.lower().replace(' ', '_')}_{limit}"
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-
         try:
-            url = "https://api.unsplash.com/search/photos"
-            params = {
-                'query': place,
-                'per_page': limit,
-                'client_id': self.unsplash_key,
-                'orientation': 'landscape'
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            images = []
-            for photo in data.get('results', []):
-                images.append({
-                    'id': photo['id'],
-                    'url': photo['urls']['regular'],
-                    'thumb': photo['urls']['thumb'],
-                    'full': photo['urls']['full'],
-                    'photographer': photo['user']['name'],
-                    'photographer_url': photo['user']['links']['html'],
-                    'description': photo.get('description', photo.get('alt_description')),
-                    'width': photo['width'],
-                    'height': photo['height']
-                })
-
-            cache.set(cache_key, images, 60 * 60 * 12)  # Cache for 12 hours
-            return images
-
+            return await limited_results.aget_or_fetch(
+                self._images_cache_key(place),
+                limit,
+                lambda fetch_limit: self._fetch_place_images(place, fetch_limit),
+                self.SECTION_TTLS['images'],
+                hard_timeout=60 * 60 * 24 * 7  # Then served stale while refreshing, up to a week
+            )
         except Exception as e:
             logger.error(f"Error fetching images: {str(e)}")
             return []
 
-    def _get_weather(self, lat: float, lon: float) -> Optional[Dict]:
+    async def _fetch_place_images(self, place: str, limit: int) -> List[Dict]:
+        response = await self.client.get(self.IMAGES_URL, params=self._images_params(place, limit), timeout=10)
+        response.raise_for_status()
+        return self._parse_images(response.json())
+
+    async def _get_weather(self, lat: float, lon: float) -> Optional[Dict]:
         """Get current weather from OpenWeatherMap"""
         if not self.weather_key:
             return None
 
-        cache_key = f"weather_{lat}_{lon}"
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-
+        cell, cell_lat, cell_lon = quantize('weather', lat, lon)
         try:
-            url = "https://api.openweathermap.org/data/2.5/weather"
-            params = {
-                'lat': lat,
-                'lon': lon,
-                'appid': self.weather_key,
-                'units': 'metric'
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            weather = {
-                'temperature': data['main']['temp'],
-                'feels_like': data['main']['feels_like'],
-                'humidity': data['main']['humidity'],
-                'description': data['weather'][0]['description'],
-                'icon': data['weather'][0]['icon'],
-                'wind_speed': data['wind']['speed'],
-                'pressure': data['main']['pressure']
-            }
-
-            cache.set(cache_key, weather, 60 * 30)  # Cache for 30 minutes
-            return weather
-
+            return await single_flight.aget_or_fetch(
+                self._weather_cache_key(cell),
+                lambda: self._fetch_weather(cell_lat, cell_lon),
+                self.SECTION_TTLS['weather'],
+                hard_timeout=60 * 60 * 3  # Then served stale while refreshing, up to 3 hours
+            )
         except Exception as e:
             logger.error(f"Error fetching weather: {str(e)}")
             return None
 
-    def _get_nearby_attractions(self, lat: float, lon: float, limit: int = 15) -> List[Dict]:
-        """Get nearby tourist attractions using Geoapify"""
-        cache_key = f"attractions_{lat}_{lon}_{limit}"
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
+    async def _fetch_weather(self, lat: float, lon: float) -> Dict:
+        response = await self.client.get(self.WEATHER_URL, params=self._weather_params(lat, lon), timeout=10)
+        response.raise_for_status()
+        return self._parse_weather(response.json())
 
+    async def _get_nearby_attractions(self, lat: float, lon: float, limit: int = 15) -> List[Dict]:
+        """Get nearby tourist attractions using Geoapify"""
+        cell, cell_lat, cell_lon = quantize('attractions', lat, lon)
         try:
-            url = "https://api.geoapify.com/v2/places"
-            params = {
-                'categories': 'tourism.attraction,tourism.sights,entertainment,leisure',
-                'filter': f'circle:{lon},{lat},10000',  # 10km radius
-                'limit': limit,
-                'apiKey': self.geoapify_key
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            attractions = []
-            for feature in data.get('features', []):
-                props = feature['properties']
-                coords = feature['geometry']['coordinates']
-                
-                attractions.append({
-                    'name': props.get('name', 'Unnamed'),
-                    'category': props.get('categories', []),
-                    'address': props.get('formatted'),
-                    'coordinates': {
-                        'latitude': coords[1],
-                        'longitude': coords[0]
-                    },
-                    'distance': props.get('distance'),
-                    'place_id': props.get('place_id')
-                })
-
-            cache.set(cache_key, attractions, 60 * 60 * 6)  # Cache for 6 hours
-            return attractions
-
+            attractions = await limited_results.aget_or_fetch(
+                self._attractions_cache_key(cell),
+                limit,
+                lambda fetch_limit: self._fetch_nearby_attractions(cell_lat, cell_lon, fetch_limit),
+                self.SECTION_TTLS['attractions'],
+                hard_timeout=60 * 60 * 24 * 2  # Then served stale while refreshing, up to 2 days
+            )
+            return measure_from(attractions or [], lat, lon)
         except Exception as e:
             logger.error(f"Error fetching attractions: {str(e)}")
             return []
 
-    def _calculate_distance(self, origin: str, destination: str) -> Optional[Dict]:
+    async def _fetch_nearby_attractions(self, lat: float, lon: float, limit: int) -> List[Dict]:
+        params = self._attractions_params(lat, lon, limit)
+        return self._parse_attractions(await place_store.afetch_places(params, lambda: self._get_places(params)))
+
+    async def _get_places(self, params: Dict) -> Dict:
+        response = await self.client.get(self.PLACES_URL, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    async def _calculate_distance(self, origin: str, destination: str) -> Optional[Dict]:
         """Calculate distance and route using OpenRouteService"""
         if not self.routing_key:
             return None
 
-        cache_key = f"distance_{origin}_{destination}".replace(' ', '_').lower()
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-
         try:
-            # First geocode both locations
-            origin_coords = self._geocode_place(origin)
-            dest_coords = self._geocode_place(destination)
-            
-            if not origin_coords or not dest_coords:
-                return None
-
-            url = "https://api.openrouteservice.org/v2/directions/driving-car"
-            headers = {'Authorization': self.routing_key}
-            body = {
-                'coordinates': [
-                    [origin_coords['lon'], origin_coords['lat']],
-                    [dest_coords['lon'], dest_coords['lat']]
-                ]
-            }
-            
-            response = self.session.post(url, json=body, headers=headers, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-
-            route = data['routes'][0]
-            summary = route['summary']
-
-            distance_info = {
-                'distance_km': round(summary['distance'] / 1000, 2),
-                'duration_hours': round(summary['duration'] / 3600, 2),
-                'origin': origin,
-                'destination': destination
-            }
-
-            cache.set(cache_key, distance_info, 60 * 60 * 24)  # Cache for 24 hours
-            return distance_info
-
+            return await single_flight.aget_or_fetch(
+                self._distance_cache_key(origin, destination),
+                lambda: self._fetch_distance(origin, destination),
+                self.SECTION_TTLS['distance']
+            )
         except Exception as e:
             logger.error(f"Error calculating distance: {str(e)}")
             return None
 
-    def _get_place_details(self, place: str, lat: float, lon: float) -> Dict:
-        """Get additional place details from Geoapify"""
-        cache_key = f"place_details_{place.lower().replace(' ', '_')}"
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
+    async def _fetch_distance(self, origin: str, destination: str) -> Optional[Dict]:
+        origin_coords = await self._geocode_place(origin)
+        dest_coords = await self._geocode_place(destination)
 
-        try:
-            url = "https://api.geoapify.com/v2/places"
-            params = {
-                'categories': 'tourism,commercial,entertainment',
-                'filter': f'circle:{lon},{lat},1000',
-                'limit': 5,
-                'apiKey': self.geoapify_key
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            details = {
-                'total_places': len(data.get('features', [])),
-                'categories': []
-            }
+        if not origin_coords or not dest_coords:
+            return None
 
-            for feature in data.get('features', []):
-                props = feature['properties']
-                if 'categories' in props:
-                    details['categories'].extend(props['categories'])
+        headers = {'Authorization': self.routing_key}
+        body = self._route_body(origin_coords, dest_coords)
 
-            details['categories'] = list(set(details['categories']))[:10]
-            
-            cache.set(cache_key, details, 60 * 60 * 12)  # Cache for 12 hours
-            return details
+        response = await self.client.post(self.ROUTE_URL, json=body, headers=headers, timeout=15)
+        response.raise_for_status()
+        return self._parse_route(origin, destination, response.json())
 
+    async def _get_place_details(self, place: str, lat: float, lon: float) -> Dict:
+        """Get additional place details from Geoapify"""
+        try:
+            return await single_flight.aget_or_fetch(
+                self._place_details_cache_key(place),
+                lambda: self._fetch_place_details(lat, lon),
+                self.SECTION_TTLS['details']
+            )
         except Exception as e:
             logger.error(f"Error fetching place details: {str(e)}")
-            return {'total_places': 0, 'categories': []}
\ No newline at end of file
+            return self._empty_place_details()
+
+    async def _fetch_place_details(self, lat: float, lon: float) -> Dict:
+        params = self._place_details_params(lat, lon)
+        return self._parse_place_details(await place_store.afetch_places(params, lambda: self._get_places(params)))
@@ -3,9 +3,11 @@ Unsplash API service for beautiful travel images.
 """
 import requests
 import logging
-from typing import List, Dict
+from typing import List, Optional
 from django.conf import settings
 
+from .http_client import get_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,9 +16,10 @@ class UnsplashService:
     
     BASE_URL = "https://api.unsplash.com"
     
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None):
         # Get access key from settings with fallback
         self.access_key = getattr(settings, 'UNSPLASH_ACCESS_KEY', '') or 'y4Pj5KzKEEp6jAjDYuZoYCO_eTjD91fs9E3pwiYJCAU'
+        self.session = session or get_session()
     
     def get_place_images(self, place: str, limit: int = 5) -> List[str]:
         """Get images for a place from Unsplash."""
@@ -33,7 +36,7 @@ class UnsplashService:
                 'orientation': 'landscape',
                 'client_id': self.access_key
             }
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -2,89 +2,96 @@
 OpenWeatherMap API service for weather information.
 """
 import requests
+import httpx
 import logging
 from typing import Optional, Dict, Tuple
 from django.conf import settings
 
+from .geocoding_service import AsyncGeocodingService, GeocodingService
+from .http_client import get_async_client, get_session
+from .request_memo import memo_scope
+
 logger = logging.getLogger(__name__)
 
 class WeatherService:
     """Service to fetch weather data from OpenWeatherMap One Call API 3.0."""
 
-    GEOCODING_URL = "https://api.openweathermap.org/geo/1.0/direct"
     ONECALL_URL = "https://api.openweathermap.org/data/3.0/onecall"
 
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None):
         # Use the API key from settings or environment variable
         self.api_key = getattr(settings, 'OPENWEATHER_API_KEY', None)
         if not self.api_key:
             logger.warning("OpenWeather API key not found. Using mock data.")
+        self.session = session or get_session()
+        self.geocoder = GeocodingService(self.session)
 
     def get_weather(self, place: str) -> Optional[Dict]:
         """Get current weather for a place using One Call API 3.0."""
         if not self.api_key:
             return self._get_mock_weather()
 
-        try:
+        with memo_scope():
             # Get coordinates from place name
             lat, lon = self._get_coordinates(place)
-            if not lat or not lon:
-                logger.warning(f"Could not get coordinates for {place}. Using mock data.")
-                return self._get_mock_weather()
-
-            # Get weather data
-            params = {
-                'lat': lat,
-                'lon': lon,
-                'appid': self.api_key,
-                'units': 'metric'
-            }
-            response = requests.get(self.ONECALL_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+        if not lat or not lon:
+            logger.warning(f"Could not get coordinates for {place}. Using mock data.")
+            return self._get_mock_weather()
+
+        return self._get_weather_at(lat, lon, place)
+
+    def get_weather_by_coordinates(self, lat: float, lon: float) -> Optional[Dict]:
+        """Get current weather at known coordinates, skipping geocoding."""
+        if not self.api_key:
+            return self._get_mock_weather()
 
-            current = data.get('current', {})
-            weather_data = current.get('weather', [{}])[0]
+        return self._get_weather_at(lat, lon, f"{lat},{lon}")
 
-            return {
-                "temp": f"{current.get('temp', 0):.1f}°C",
-                "condition": weather_data.get('description', 'Unknown').title(),
-                "humidity": f"{current.get('humidity', 0)}%",
-                "wind_speed": f"{current.get('wind_speed', 0) * 3.6:.1f} km/h",  # m/s → km/h
-                "icon": f"https://openweathermap.org/img/wn/{weather_data.get('icon', '')}@2x.png"
-            }
+    def _get_weather_at(self, lat: float, lon: float, label: str) -> Dict:
+        try:
+            response = self.session.get(self.ONECALL_URL, params=self._onecall_params(lat, lon), timeout=10)
+            response.raise_for_status()
+            return self._parse_weather(response.json())
 
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 401:
-                logger.warning(f"OpenWeather API key is invalid. Using mock data for {place}.")
+                logger.warning(f"OpenWeather API key is invalid. Using mock data for {label}.")
             else:
-                logger.warning(f"Weather API HTTP error for {place}: {str(e)}")
+                logger.warning(f"Weather API HTTP error for {label}: {str(e)}")
             return self._get_mock_weather()
         except Exception as e:
-            logger.warning(f"Weather API error for {place}: {str(e)}")
+            logger.warning(f"Weather API error for {label}: {str(e)}")
             return self._get_mock_weather()
 
-    def _get_coordinates(self, place: str) -> Tuple[Optional[float], Optional[float]]:
-        """Get latitude and longitude for a place name using geocoding API."""
-        try:
-            params = {
-                'q': place,
-                'limit': 1,
-                'appid': self.api_key
-            }
-            response = requests.get(self.GEOCODING_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+    def _onecall_params(self, lat: float, lon: float) -> Dict:
+        return {
+            'lat': lat,
+            'lon': lon,
+            'appid': self.api_key,
+            'units': 'metric'
+        }
 
-            if data and len(data) > 0:
-                location = data[0]
-                return location.get('lat'), location.get('lon')
+    def _parse_weather(self, data: Dict) -> Dict:
+        current = data.get('current', {})
+        weather_data = current.get('weather', [{}])[0]
 
-            return None, None
+        return {
+            "temp": f"{current.get('temp', 0):.1f}°C",
+            "condition": weather_data.get('description', 'Unknown').title(),
+            "humidity": f"{current.get('humidity', 0)}%",
+            "wind_speed": f"{current.get('wind_speed', 0) * 3.6:.1f} km/h",  # m/s → km/h
+            "icon": f"https://openweathermap.org/img/wn/{weather_data.get('icon', '')}@2x.png"
+        }
 
-        except Exception as e:
-            logger.warning(f"Geocoding error for {place}: {str(e)}")
-            return None, None
+    def _get_coordinates(self, place: str) -> Tuple[Optional[float], Optional[float]]:
+        """Get latitude and longitude for a place name using the shared geocoder."""
+        return self._coordinates_from(self.geocoder.geocode(place))
+
+    def _coordinates_from(self, location: Optional[Dict]) -> Tuple[Optional[float], Optional[float]]:
+        if location:
+            return location['lat'], location['lon']
+
+        return None, None
 
     def _get_mock_weather(self) -> Dict:
         """Return mock weather data when API is unavailable."""
@@ -95,3 +102,52 @@ class WeatherService:
             "wind_speed": "10 km/h",
             "icon": ""
         }
+
+
+class AsyncWeatherService(WeatherService):
+    """Async counterpart of WeatherService on the shared httpx client."""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__()
+        self.client = client or get_async_client()
+        self.geocoder = AsyncGeocodingService(self.client)
+
+    async def get_weather(self, place: str) -> Optional[Dict]:
+        """Get current weather for a place using One Call API 3.0."""
+        if not self.api_key:
+            return self._get_mock_weather()
+
+        with memo_scope():
+            lat, lon = await self._get_coordinates(place)
+        if not lat or not lon:
+            logger.warning(f"Could not get coordinates for {place}. Using mock data.")
+            return self._get_mock_weather()
+
+        return await self._get_weather_at(lat, lon, place)
+
+    async def get_weather_by_coordinates(self, lat: float, lon: float) -> Optional[Dict]:
+        """Get current weather at known coordinates, skipping geocoding."""
+        if not self.api_key:
+            return self._get_mock_weather()
+
+        return await self._get_weather_at(lat, lon, f"{lat},{lon}")
+
+    async def _get_weather_at(self, lat: float, lon: float, label: str) -> Dict:
+        try:
+            response = await self.client.get(self.ONECALL_URL, params=self._onecall_params(lat, lon), timeout=10)
+            response.raise_for_status()
+            return self._parse_weather(response.json())
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 401:
+                logger.warning(f"OpenWeather API key is invalid. Using mock data for {label}.")
+            else:
+                logger.warning(f"Weather API HTTP error for {label}: {str(e)}")
+            return self._get_mock_weather()
+        except Exception as e:
+            logger.warning(f"Weather API error for {label}: {str(e)}")
+            return self._get_mock_weather()
+
+    async def _get_coordinates(self, place: str) -> Tuple[Optional[float], Optional[float]]:
+        """Get latitude and longitude for a place name using the shared geocoder."""
+        return self._coordinates_from(await self.geocoder.geocode(place))
@@ -2,12 +2,21 @@
 Wikipedia API service for place information with Geoapify and Weather integration.
 """
 import requests
+import httpx
 import logging
 import datetime
 from typing import Optional, Dict, List, Tuple, Any
 import urllib.parse
 from django.conf import settings
 
+from .executor import agather_sections
+from .geocoding_service import AsyncGeocodingService, GeocodingService
+from .http_client import get_async_client, get_session
+from .place_store import place_store
+from .places_planner import places_plan
+from .request_memo import amemoize, memo_scope, memoize
+from .single_flight import single_flight
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,14 +33,39 @@ class WikipediaService:
     GEOPI_PLACE_DETAILS_URL = "https://api.geoapify.com/v2/place-details"
     GEOPI_GEOCODE_URL = "https://api.geoapify.com/v1/geocode/search"
 
-    def __init__(self):
+    WIKI_HEADERS = {
+        'User-Agent': 'TravelAssistant/1.0 (https://travel-assistant.example.com; contact@example.com)',
+        'Accept': 'application/json',
+        'Accept-Language': 'en-US,en;q=0.5'
+    }
+
+    NEARBY_CATEGORIES = {
+        'attractions': ['building.tourism', 'building.historic', 'activity'],
+        'restaurants': [
+            'catering.restaurant.pizza',
+            'catering.restaurant.indian',
+            'catering.restaurant.chinese'
+        ],
+        'hotels': ['accommodation.hotel', 'accommodation.guest_house'],
+        'shopping': ['building.commercial']
+    }
+
+    TOP_ATTRACTION_CATEGORIES = ['building.tourism', 'building.historic', 'activity']
+
+    def __init__(self, session: Optional[requests.Session] = None):
         self.geopi_api_key = getattr(settings, 'GEOPI_API_KEY', None)
         self.weather_service = None  # Will be set when needed
+        self.session = session or get_session()
+        self.geocoder = GeocodingService(self.session)
 
     def get_place_description(self, place: str) -> Optional[Dict]:
         """
         Get comprehensive description of a place with Wikipedia data, weather, and nearby points of interest.
         """
+        with memo_scope():
+            return self._get_place_description(place)
+
+    def _get_place_description(self, place: str) -> Optional[Dict]:
         try:
             wiki_data = self._get_wiki_summary(place)
             if not wiki_data:
@@ -47,35 +81,43 @@ class WikipediaService:
             if coordinates:
                 nearby = self._get_nearby_places(coordinates)
 
-            description_parts = []
-            extract = wiki_data.get('extract', '')
-            if extract:
-                description_parts.append(extract)
-
-            if coordinates:
-                lat, lon = coordinates
-                description_parts.append(f"\n\nLocation: Coordinates {lat:.4f}°N, {lon:.4f}°E")
-
-            desc = wiki_data.get('description', '')
-            if desc and desc not in extract:
-                description_parts.append(f"\n\n{desc}")
-
-            return {
-                'description': '\n'.join(description_parts) if description_parts else None,
-                'weather': weather,
-                'nearby': nearby,
-                'coordinates': coordinates,
-                'wikipedia_url': wiki_data.get('content_urls', {}).get('desktop', {}).get('page', '')
-            }
+            return self._build_description(wiki_data, coordinates, weather, nearby)
 
         except Exception as e:
             logger.warning(f"Error in get_place_description for {place}: {str(e)}")
             return None
 
+    def _build_description(self, wiki_data: Dict, coordinates: Optional[Tuple[float, float]],
+                           weather: Dict, nearby: Dict) -> Dict:
+        description_parts = []
+        extract = wiki_data.get('extract', '')
+        if extract:
+            description_parts.append(extract)
+
+        if coordinates:
+            lat, lon = coordinates
+            description_parts.append(f"\n\nLocation: Coordinates {lat:.4f}°N, {lon:.4f}°E")
+
+        desc = wiki_data.get('description', '')
+        if desc and desc not in extract:
+            description_parts.append(f"\n\n{desc}")
+
+        return {
+            'description': '\n'.join(description_parts) if description_parts else None,
+            'weather': weather,
+            'nearby': nearby,
+            'coordinates': coordinates,
+            'wikipedia_url': wiki_data.get('content_urls', {}).get('desktop', {}).get('page', '')
+        }
+
     def get_place_info(self, place: str) -> Optional[Dict]:
         """
         Get comprehensive place information including Wikipedia data, weather, and nearby points of interest.
         """
+        with memo_scope():
+            return self._get_place_info(place)
+
+    def _get_place_info(self, place: str) -> Optional[Dict]:
         try:
             place_data = self.get_place_description(place)
             if not place_data:
@@ -85,24 +127,10 @@ class WikipediaService:
             if not wiki_data:
                 return None
 
-            info = {
-                'title': wiki_data.get('title', place),
-                'description': place_data['description'],
-                'summary': wiki_data.get('extract', ''),
-                'thumbnail': wiki_data.get('thumbnail', {}).get('source', '') if wiki_data.get('thumbnail') else '',
-                'wikipedia_url': wiki_data.get('content_urls', {}).get('desktop', {}).get('page', ''),
-                'weather': place_data.get('weather', {}),
-                'nearby_places': place_data.get('nearby', {})
-            }
+            info = self._build_place_info(place, place_data, wiki_data)
 
             if place_data.get('coordinates'):
                 lat, lon = place_data['coordinates']
-                info['location'] = {
-                    'latitude': lat,
-                    'longitude': lon,
-                    'coordinates': f"{lat:.4f}°N, {lon:.4f}°E"
-                }
-
                 address = self._get_address_from_coords(lat, lon)
                 if address:
                     info['address'] = address
@@ -113,16 +141,41 @@ class WikipediaService:
             logger.warning(f"Error in get_place_info for {place}: {str(e)}")
             return None
 
+    def _build_place_info(self, place: str, place_data: Dict, wiki_data: Dict) -> Dict:
+        info = {
+            'title': wiki_data.get('title', place),
+            'description': place_data['description'],
+            'summary': wiki_data.get('extract', ''),
+            'thumbnail': wiki_data.get('thumbnail', {}).get('source', '') if wiki_data.get('thumbnail') else '',
+            'wikipedia_url': wiki_data.get('content_urls', {}).get('desktop', {}).get('page', ''),
+            'weather': place_data.get('weather', {}),
+            'nearby_places': place_data.get('nearby', {})
+        }
+
+        if place_data.get('coordinates'):
+            lat, lon = place_data['coordinates']
+            info['location'] = {
+                'latitude': lat,
+                'longitude': lon,
+                'coordinates': f"{lat:.4f}°N, {lon:.4f}°E"
+            }
+
+        return info
+
     def get_top_attractions(self, place: str, limit: int = 5) -> List[Dict]:
         """
         Get top attractions for a place using Geoapify Places API.
         """
+        with memo_scope():
+            return self._get_top_attractions(place, limit)
+
+    def _get_top_attractions(self, place: str, limit: int) -> List[Dict]:
         try:
             coordinates = self._get_place_coordinates(place)
             if coordinates:
                 attractions = self._get_places_by_category(
                     coordinates,
-                    categories=['building.tourism', 'building.historic', 'activity'],
+                    categories=self.TOP_ATTRACTION_CATEGORIES,
                     limit=limit
                 )
                 if attractions:
@@ -134,29 +187,16 @@ class WikipediaService:
 
     def _get_place_coordinates(self, place: str) -> Optional[Tuple[float, float]]:
         """
-        Get coordinates for a place using Geoapify Geocoding API.
+        Get coordinates for a place using the shared Geoapify geocoder.
         """
         if not self.geopi_api_key:
             return None
-        try:
-            params = {
-                'text': place,
-                'apiKey': self.geopi_api_key,
-                'limit': 1
-            }
-            response = requests.get(self.GEOPI_GEOCODE_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            features = data.get('features', [])
-            if features:
-                geometry = features[0].get('geometry', {})
-                coordinates = geometry.get('coordinates', [])
-                if coordinates and len(coordinates) >= 2:
-                    return coordinates[1], coordinates[0]  # lat, lon
-            return None
-        except Exception as e:
-            logger.warning(f"Geocoding error for {place}: {str(e)}")
-            return None
+        return self._coordinates_from(self.geocoder.geocode(place))
+
+    def _coordinates_from(self, location: Optional[Dict]) -> Optional[Tuple[float, float]]:
+        if location:
+            return location['lat'], location['lon']
+        return None
 
     def _get_weather(self, coordinates: Tuple[float, float]) -> Dict[str, Any]:
         """
@@ -165,22 +205,25 @@ class WikipediaService:
         try:
             if self.weather_service is None:
                 from .weather_service import WeatherService
-                self.weather_service = WeatherService()
+                self.weather_service = WeatherService(self.session)
             lat, lon = coordinates
-            weather_data = self.weather_service.get_weather(f"{lat},{lon}")
-            if not weather_data:
-                return {}
-            return {
-                'temperature': weather_data.get('temp', 'N/A'),
-                'condition': weather_data.get('condition', 'N/A'),
-                'humidity': weather_data.get('humidity', 'N/A'),
-                'wind_speed': weather_data.get('wind_speed', 'N/A'),
-                'icon': weather_data.get('icon', '')
-            }
+            weather_data = self.weather_service.get_weather_by_coordinates(lat, lon)
+            return self._format_weather(weather_data)
         except Exception as e:
             logger.warning(f"Error getting weather data: {str(e)}")
             return {}
 
+    def _format_weather(self, weather_data: Optional[Dict]) -> Dict[str, Any]:
+        if not weather_data:
+            return {}
+        return {
+            'temperature': weather_data.get('temp', 'N/A'),
+            'condition': weather_data.get('condition', 'N/A'),
+            'humidity': weather_data.get('humidity', 'N/A'),
+            'wind_speed': weather_data.get('wind_speed', 'N/A'),
+            'icon': weather_data.get('icon', '')
+        }
+
     def _get_nearby_places(self, coordinates: Tuple[float, float]) -> Dict[str, List[Dict]]:
         """
         Get nearby places of different categories.
@@ -188,23 +231,13 @@ class WikipediaService:
         if not self.geopi_api_key:
             return {}
 
-        lat, lon = coordinates
-        categories = {
-            'attractions': ['building.tourism', 'building.historic', 'activity'],
-            'restaurants': [
-                'catering.restaurant.pizza',
-                'catering.restaurant.indian',
-                'catering.restaurant.chinese'
-            ],
-            'hotels': ['accommodation.hotel', 'accommodation.guest_house'],
-            'shopping': ['building.commercial']
-        }
-
         nearby = {}
-        for category, cat_list in categories.items():
-            places = self._get_places_by_category(coordinates, cat_list, limit=5)
-            if places:
-                nearby[category] = places
+        # The first category fetches all of them in one merged query
+        with places_plan(self._nearby_places_params(coordinates), self._get_places):
+            for category, cat_list in self.NEARBY_CATEGORIES.items():
+                places = self._get_places_by_category(coordinates, cat_list, limit=5)
+                if places:
+                    nearby[category] = places
 
         return nearby
 
@@ -215,101 +248,129 @@ class WikipediaService:
         """
         if not self.geopi_api_key or not coordinates:
             return []
-        lat, lon = coordinates
         try:
-            params = {
-                'categories': ','.join(categories),
-                'filter': f'circle:{lon},{lat},5000',  # Geoapify expects lon,lat,radius
-                'limit': limit,
-                'apiKey': self.geopi_api_key
-            }
-            response = requests.get(self.GEOPI_BASE_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            places = []
-            for feature in data.get('features', [])[:limit]:
-                properties = feature.get('properties', {})
-                name = properties.get('name', 'Place')
-                description = properties.get('description') or properties.get('formatted', '')
-                place_type = 'place'
-                for category in categories:
-                    if category in properties.get('categories', []):
-                        place_type = category.split('.')[-1]
-                        break
-                places.append({
-                    'name': name,
-                    'description': description[:150] + '...' if len(description) > 150 else description,
-                    'type': place_type,
-                    'distance': properties.get('distance', 0) / 1000,
-                    'address': properties.get('formatted', ''),
-                    'coordinates': {
-                        'latitude': properties.get('lat'),
-                        'longitude': properties.get('lon')
-                    },
-                    'categories': properties.get('categories', [])
-                })
-            return places
+            params = self._places_params(coordinates, categories, limit)
+            data = place_store.fetch_places(params, lambda: self._get_places(params))
+            return self._parse_places(data, categories, limit)
         except Exception as e:
             logger.warning(f"Error getting places by category: {str(e)}")
             return []
 
+    def _get_places(self, params: Dict) -> Dict:
+        response = self.session.get(self.GEOPI_BASE_URL, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def _nearby_places_params(self, coordinates: Tuple[float, float]) -> List[Dict]:
+        return [
+            self._places_params(coordinates, cat_list, 5)
+            for cat_list in self.NEARBY_CATEGORIES.values()
+        ]
+
+    def _places_params(self, coordinates: Tuple[float, float], categories: List[str], limit: int) -> Dict:
+        lat, lon = coordinates
+        return {
+            'categories': ','.join(categories),
+            'filter': f'circle:{lon},{lat},5000',  # Geoapify expects lon,lat,radius
+            'bias': f'proximity:{lon},{lat}',  # Nearest first
+            'limit': limit,
+            'apiKey': self.geopi_api_key
+        }
+
+    def _parse_places(self, data: Dict, categories: List[str], limit: int) -> List[Dict]:
+        places = []
+        for feature in data.get('features', [])[:limit]:
+            properties = feature.get('properties', {})
+            name = properties.get('name', 'Place')
+            description = properties.get('description') or properties.get('formatted', '')
+            place_type = 'place'
+            for category in categories:
+                if category in properties.get('categories', []):
+                    place_type = category.split('.')[-1]
+                    break
+            places.append({
+                'name': name,
+                'description': description[:150] + '...' if len(description) > 150 else description,
+                'type': place_type,
+                'distance': properties.get('distance', 0) / 1000,
+                'address': properties.get('formatted', ''),
+                'coordinates': {
+                    'latitude': properties.get('lat'),
+                    'longitude': properties.get('lon')
+                },
+                'categories': properties.get('categories', [])
+            })
+        return places
+
     def _get_address_from_coords(self, lat: float, lon: float) -> Optional[Dict]:
         """
         Get address information from coordinates using reverse geocoding.
         """
         if not self.geopi_api_key:
             return None
+        key = self._reverse_geocode_cache_key(lat, lon)
         try:
-            params = {
-                'lat': lat,
-                'lon': lon,
-                'apiKey': self.geopi_api_key,
-                'type': 'street'
-            }
-            response = requests.get(self.GEOPI_GEOCODE_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            features = data.get('features', [])
-            if features:
-                properties = features[0].get('properties', {})
-                address = {
-                    'street': properties.get('street'),
-                    'city': properties.get('city'),
-                    'state': properties.get('state'),
-                    'country': properties.get('country'),
-                    'postcode': properties.get('postcode'),
-                    'formatted': properties.get('formatted')
-                }
-                return {k: v for k, v in address.items() if v is not None}
-            return None
+            return memoize(
+                key,
+                lambda: single_flight.get_or_fetch(
+                    key,
+                    lambda: self._fetch_address(lat, lon),
+                    60 * 60 * 24 * 7  # Cache for 7 days
+                )
+            )
         except Exception as e:
             logger.warning(f"Error in reverse geocoding: {str(e)}")
             return None
 
+    def _fetch_address(self, lat: float, lon: float) -> Optional[Dict]:
+        response = self.session.get(self.GEOPI_GEOCODE_URL, params=self._reverse_geocode_params(lat, lon), timeout=10)
+        response.raise_for_status()
+        return self._parse_address(response.json())
+
+    def _reverse_geocode_cache_key(self, lat: float, lon: float) -> str:
+        # ~1 m: the coordinates come from geocoding, so repeats are exact
+        return f"reverse_geocode_{lat:.5f}_{lon:.5f}"
+
+    def _reverse_geocode_params(self, lat: float, lon: float) -> Dict:
+        return {
+            'lat': lat,
+            'lon': lon,
+            'apiKey': self.geopi_api_key,
+            'type': 'street'
+        }
+
+    def _parse_address(self, data: Dict) -> Optional[Dict]:
+        features = data.get('features', [])
+        if features:
+            properties = features[0].get('properties', {})
+            address = {
+                'street': properties.get('street'),
+                'city': properties.get('city'),
+                'state': properties.get('state'),
+                'country': properties.get('country'),
+                'postcode': properties.get('postcode'),
+                'formatted': properties.get('formatted')
+            }
+            return {k: v for k, v in address.items() if v is not None}
+        return None
+
     def _get_wiki_summary(self, place: str) -> Optional[Dict]:
         """
-        Fetch Wikipedia summary data.
+        Fetch Wikipedia summary data, once per request and per cache period.
         """
+        key = self._wiki_cache_key(place)
         try:
-            encoded_place = urllib.parse.quote(place.replace(' ', '_'))
-            url = f"{self.WIKI_BASE_URL}/{encoded_place}"
-            headers = {
-                'User-Agent': 'TravelAssistant/1.0 (https://travel-assistant.example.com; contact@example.com)',
-                'Accept': 'application/json',
-                'Accept-Language': 'en-US,en;q=0.5'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            data['retrieved_at'] = datetime.datetime.utcnow().isoformat()
-            return data
+            return memoize(
+                key,
+                lambda: single_flight.get_or_fetch(
+                    key,
+                    lambda: self._fetch_wiki_summary(place),
+                    60 * 60 * 24,  # Fresh for 24 hours
+                    hard_timeout=60 * 60 * 24 * 7  # Then served stale while refreshing, up to 7 days
+                )
+            )
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                logger.warning(f"Wikipedia page not found for {place}")
-            elif e.response.status_code == 429:
-                logger.warning("Wikipedia API rate limit exceeded")
-            else:
-                logger.warning(f"Wikipedia API HTTP error for {place}: {str(e)}")
+            self._log_wiki_http_error(place, e.response.status_code, e)
             return None
         except requests.exceptions.RequestException as e:
             logger.warning(f"Network error while accessing Wikipedia API: {str(e)}")
@@ -317,3 +378,231 @@ class WikipediaService:
         except Exception as e:
             logger.warning(f"Unexpected error in _get_wiki_summary for {place}: {str(e)}")
             return None
+
+    def _fetch_wiki_summary(self, place: str) -> Optional[Dict]:
+        # A missing article is a result, cached as one; other errors propagate
+        # so they are not mistaken for it
+        response = self.session.get(self._wiki_url(place), headers=self.WIKI_HEADERS, timeout=10)
+        if response.status_code == 404:
+            self._log_wiki_http_error(place, 404, None)
+            return None
+        response.raise_for_status()
+        return self._parse_wiki_summary(response.json())
+
+    def _wiki_url(self, place: str) -> str:
+        return f"{self.WIKI_BASE_URL}/{self._wiki_title(place)}"
+
+    def _wiki_title(self, place: str) -> str:
+        return urllib.parse.quote(place.replace(' ', '_'))
+
+    def _wiki_cache_key(self, place: str) -> str:
+        # Wikipedia titles are case sensitive except for the first letter
+        title = self._wiki_title(place.strip())
+        return f"wiki_summary_{title[:1].upper()}{title[1:]}"
+
+    def _parse_wiki_summary(self, data: Dict) -> Dict:
+        data['retrieved_at'] = datetime.datetime.utcnow().isoformat()
+        return data
+
+    def _log_wiki_http_error(self, place: str, status_code: int, error: Optional[Exception]) -> None:
+        if status_code == 404:
+            logger.warning(f"Wikipedia page not found for {place}")
+        elif status_code == 429:
+            logger.warning("Wikipedia API rate limit exceeded")
+        else:
+            logger.warning(f"Wikipedia API HTTP error for {place}: {str(error)}")
+
+
+class AsyncWikipediaService(WikipediaService):
+    """
+    Async counterpart of WikipediaService on the shared httpx client.
+
+    Weather and the nearby-places categories are awaited concurrently once the
+    place coordinates are known.
+    """
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__()
+        self.client = client or get_async_client()
+        self.geocoder = AsyncGeocodingService(self.client)
+
+    async def get_place_description(self, place: str) -> Optional[Dict]:
+        """
+        Get comprehensive description of a place with Wikipedia data, weather, and nearby points of interest.
+        """
+        with memo_scope():
+            return await self._get_place_description(place)
+
+    async def _get_place_description(self, place: str) -> Optional[Dict]:
+        try:
+            wiki_data = await self._get_wiki_summary(place)
+            if not wiki_data:
+                return None
+
+            coordinates = await self._get_place_coordinates(place)
+
+            weather = {}
+            nearby = {}
+            if coordinates:
+                sections = await agather_sections({
+                    'weather': (self._get_weather(coordinates), {}),
+                    'nearby': (self._get_nearby_places(coordinates), {}),
+                })
+                weather, nearby = sections['weather'], sections['nearby']
+
+            return self._build_description(wiki_data, coordinates, weather, nearby)
+
+        except Exception as e:
+            logger.warning(f"Error in get_place_description for {place}: {str(e)}")
+            return None
+
+    async def get_place_info(self, place: str) -> Optional[Dict]:
+        """
+        Get comprehensive place information including Wikipedia data, weather, and nearby points of interest.
+        """
+        with memo_scope():
+            return await self._get_place_info(place)
+
+    async def _get_place_info(self, place: str) -> Optional[Dict]:
+        try:
+            place_data = await self.get_place_description(place)
+            if not place_data:
+                return None
+
+            wiki_data = await self._get_wiki_summary(place)
+            if not wiki_data:
+                return None
+
+            info = self._build_place_info(place, place_data, wiki_data)
+
+            if place_data.get('coordinates'):
+                lat, lon = place_data['coordinates']
+                address = await self._get_address_from_coords(lat, lon)
+                if address:
+                    info['address'] = address
+
+            return info
+
+        except Exception as e:
+            logger.warning(f"Error in get_place_info for {place}: {str(e)}")
+            return None
+
+    async def get_top_attractions(self, place: str, limit: int = 5) -> List[Dict]:
+        """
+        Get top attractions for a place using Geoapify Places API.
+        """
+        with memo_scope():
+            return await self._get_top_attractions(place, limit)
+
+    async def _get_top_attractions(self, place: str, limit: int) -> List[Dict]:
+        try:
+            coordinates = await self._get_place_coordinates(place)
+            if coordinates:
+                attractions = await self._get_places_by_category(
+                    coordinates,
+                    categories=self.TOP_ATTRACTION_CATEGORIES,
+                    limit=limit
+                )
+                if attractions:
+                    return attractions
+            return []
+        except Exception as e:
+            logger.warning(f"Error in get_top_attractions for {place}: {str(e)}")
+            return []
+
+    async def _get_place_coordinates(self, place: str) -> Optional[Tuple[float, float]]:
+        if not self.geopi_api_key:
+            return None
+        return self._coordinates_from(await self.geocoder.geocode(place))
+
+    async def _get_weather(self, coordinates: Tuple[float, float]) -> Dict[str, Any]:
+        try:
+            if self.weather_service is None:
+                from .weather_service import AsyncWeatherService
+                self.weather_service = AsyncWeatherService(self.client)
+            lat, lon = coordinates
+            weather_data = await self.weather_service.get_weather_by_coordinates(lat, lon)
+            return self._format_weather(weather_data)
+        except Exception as e:
+            logger.warning(f"Error getting weather data: {str(e)}")
+            return {}
+
+    async def _get_nearby_places(self, coordinates: Tuple[float, float]) -> Dict[str, List[Dict]]:
+        if not self.geopi_api_key:
+            return {}
+
+        with places_plan(self._nearby_places_params(coordinates), self._get_places):
+            results = await agather_sections({
+                category: (self._get_places_by_category(coordinates, cat_list, limit=5), [])
+                for category, cat_list in self.NEARBY_CATEGORIES.items()
+            })
+        return {category: places for category, places in results.items() if places}
+
+    async def _get_places_by_category(self, coordinates: Tuple[float, float],
+                                      categories: List[str], limit: int = 5) -> List[Dict]:
+        if not self.geopi_api_key or not coordinates:
+            return []
+        try:
+            params = self._places_params(coordinates, categories, limit)
+            data = await place_store.afetch_places(params, lambda: self._get_places(params))
+            return self._parse_places(data, categories, limit)
+        except Exception as e:
+            logger.warning(f"Error getting places by category: {str(e)}")
+            return []
+
+    async def _get_places(self, params: Dict) -> Dict:
+        response = await self.client.get(self.GEOPI_BASE_URL, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    async def _get_address_from_coords(self, lat: float, lon: float) -> Optional[Dict]:
+        if not self.geopi_api_key:
+            return None
+        key = self._reverse_geocode_cache_key(lat, lon)
+        try:
+            return await amemoize(
+                key,
+                lambda: single_flight.aget_or_fetch(
+                    key,
+                    lambda: self._fetch_address(lat, lon),
+                    60 * 60 * 24 * 7  # Cache for 7 days
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Error in reverse geocoding: {str(e)}")
+            return None
+
+    async def _fetch_address(self, lat: float, lon: float) -> Optional[Dict]:
+        response = await self.client.get(self.GEOPI_GEOCODE_URL, params=self._reverse_geocode_params(lat, lon), timeout=10)
+        response.raise_for_status()
+        return self._parse_address(response.json())
+
+    async def _get_wiki_summary(self, place: str) -> Optional[Dict]:
+        key = self._wiki_cache_key(place)
+        try:
+            return await amemoize(
+                key,
+                lambda: single_flight.aget_or_fetch(
+                    key,
+                    lambda: self._fetch_wiki_summary(place),
+                    60 * 60 * 24,  # Fresh for 24 hours
+                    hard_timeout=60 * 60 * 24 * 7  # Then served stale while refreshing, up to 7 days
+                )
+            )
+        except httpx.HTTPStatusError as e:
+            self._log_wiki_http_error(place, e.response.status_code, e)
+            return None
+        except httpx.RequestError as e:
+            logger.warning(f"Network error while accessing Wikipedia API: {str(e)}")
+            return None
+        except Exception as e:
+            logger.warning(f"Unexpected error in _get_wiki_summary for {place}: {str(e)}")
+            return None
+
+    async def _fetch_wiki_summary(self, place: str) -> Optional[Dict]:
+        response = await self.client.get(self._wiki_url(place), headers=self.WIKI_HEADERS, timeout=10)
+        if response.status_code == 404:
+            self._log_wiki_http_error(place, 404, None)
+            return None
+        response.raise_for_status()
+        return self._parse_wiki_summary(response.json())
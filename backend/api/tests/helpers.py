@@ -0,0 +1,179 @@
+"""
+Shared fixtures for the API tests.
+"""
+import asyncio
+import inspect
+import re
+from typing import Any, Dict, List, Tuple
+from unittest import mock
+
+import httpx
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from api.services.circuit_breaker import circuit_breakers
+from api.services.geocoding_service import unresolvable_places
+from api.services.rate_limiter import rate_limiter
+from api.services.spatial_index import spatial_index
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+PARIS = (48.85, 2.35)
+
+
+def feature(lat: float, lon: float, categories: List[str], name: str = 'Place') -> Dict:
+    """A Geoapify places feature"""
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+        'properties': {
+            'name': name,
+            'formatted': f"{name}, Paris, France",
+            'categories': categories,
+            'place_id': f"{name}-{lat}-{lon}"
+        }
+    }
+
+
+def geocode_answer(request: httpx.Request) -> Dict:
+    # Every place resolves near Paris; places starting with 'nowhere' do not resolve
+    text = request.url.params.get('text', '')
+    if text.lower().startswith('nowhere'):
+        return {'features': []}
+    return {'features': [{
+        'geometry': {'coordinates': [PARIS[1], PARIS[0]]},
+        'properties': {'name': text, 'formatted': f"{text}, France", 'place_id': text.lower(),
+                       'country': 'France', 'city': text}
+    }]}
+
+
+def places_answer(request: httpx.Request) -> Dict:
+    # One feature per requested category, each 100 m farther north of the centre
+    categories = request.url.params['categories'].split(',')
+    lon, lat, _ = (float(part) for part in request.url.params['filter'][len('circle:'):].split(','))
+    limit = int(request.url.params['limit'])
+    return {'type': 'FeatureCollection', 'features': [
+        feature(lat + 0.0009 * (i + 1), lon, [category.split('.')[0], category], f"Place {i}")
+        for i, category in enumerate(categories[:limit])
+    ]}
+
+
+WEATHER = {
+    'main': {'temp': 18.4, 'feels_like': 17.9, 'humidity': 63, 'pressure': 1014},
+    'weather': [{'description': 'scattered clouds', 'icon': '03d'}],
+    'wind': {'speed': 4.1}
+}
+
+IMAGES = {'results': [{
+    'id': 'photo',
+    'urls': {'regular': 'https://images.example/regular', 'thumb': 'https://images.example/thumb',
+             'full': 'https://images.example/full'},
+    'user': {'name': 'Photographer', 'links': {'html': 'https://unsplash.com/@photographer'}},
+    'description': 'Eiffel Tower',
+    'width': 4000,
+    'height': 6000
+}]}
+
+ROUTE = {'routes': [{'summary': {'distance': 463521.7, 'duration': 21142.3}}]}
+
+
+class FakeUpstream:
+    """
+    Canned answers for every upstream API, standing in for the network below
+    the shared HTTP clients, so circuit breakers and deadlines still apply.
+
+    Answers are looked up by URL path. Each is a JSON body, a callable
+    (or coroutine function) taking the request and returning one, an
+    httpx.Response, or an exception to raise. Every call is recorded as (path, params).
+    """
+
+    def __init__(self):
+        self.calls: List[Tuple[str, Dict[str, str]]] = []
+        self.answers: Dict[str, Any] = {
+            '/v1/geocode/search': geocode_answer,
+            '/v1/geocode/reverse': geocode_answer,
+            '/v2/places': places_answer,
+            '/data/2.5/weather': WEATHER,
+            '/search/photos': IMAGES,
+            '/v2/directions/driving-car': ROUTE,
+        }
+        self.delays: Dict[str, float] = {}
+
+    def slow_geocode(self, place: str, seconds: float) -> None:
+        """Make geocoding `place` (in lower case) take `seconds`"""
+        async def answer(request):
+            if request.url.params['text'].lower() == place:
+                await asyncio.sleep(seconds)
+            return geocode_answer(request)
+        self.answers['/v1/geocode/search'] = answer
+
+    def count(self, path: str, **params: str) -> int:
+        """Calls made to a path, with at least the given query parameters"""
+        return sum(
+            1 for called, called_params in self.calls
+            if called == path and all(called_params.get(name) == value for name, value in params.items())
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.calls.append((path, dict(request.url.params)))
+        if self.delays.get(path):
+            await asyncio.sleep(self.delays[path])
+
+        answer = self.answers.get(path)
+        if answer is None:
+            return httpx.Response(404, json={'error': 'not found'})
+        if isinstance(answer, BaseException):
+            raise answer
+        if isinstance(answer, httpx.Response):
+            return answer
+        if callable(answer):
+            answer = answer(request)
+            if inspect.isawaitable(answer):
+                answer = await answer
+        return httpx.Response(200, json=answer)
+
+
+def max_age(response) -> int:
+    """The max-age of a response's Cache-Control header"""
+    return int(re.search(r'max-age=(\d+)', response['Cache-Control']).group(1))
+
+
+upstream_settings = override_settings(
+    CACHES=LOCMEM_CACHE, UPSTREAM_RATE_LIMITS={},
+    GEOPI_API_KEY='geoapify-key', OPENWEATHER_API_KEY='openweather-key',
+    UNSPLASH_ACCESS_KEY='unsplash-key', OPENROUTESERVICE_API_KEY='openrouteservice-key'
+)
+
+
+class UpstreamMixin:
+    """Upstream faked and process-wide state reset for every test"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        spatial_index.clear()
+        unresolvable_places.clear()
+        circuit_breakers.reset()
+        # Budget rows are rolled back with every test
+        rate_limiter._created.clear()
+        self.upstream = FakeUpstream()
+        patcher = mock.patch.object(
+            httpx.AsyncHTTPTransport, 'handle_async_request', self.upstream.handle_async_request
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@upstream_settings
+class UpstreamTestCase(UpstreamMixin, TestCase):
+    """Tests that call the services or views with upstream faked"""
+
+
+@upstream_settings
+class UpstreamTransactionTestCase(UpstreamMixin, TransactionTestCase):
+    """
+    Like UpstreamTestCase, for code that runs an event loop of its own, such
+    as a management command: its database writes are committed from another
+    thread, so the tables are flushed after each test instead
+    """
@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from django.core.cache import cache
+
+from api.services.batch_service import TravelBatch
+
+from .helpers import UpstreamTestCase
+
+
+async def collect(batch: TravelBatch):
+    return [entry async for entry in batch.results()]
+
+
+class TravelBatchTests(UpstreamTestCase):
+    async def test_repeated_places_are_fetched_once(self):
+        entries = await collect(TravelBatch([('Paris', None), (' PARIS ', None), ('Rome', None)], {'weather'}))
+
+        self.assertEqual(sorted(entry['index'] for entry in entries), [0, 1, 2])
+        by_index = {entry['index']: entry for entry in entries}
+        self.assertEqual(by_index[1]['place'], ' PARIS ')
+        self.assertEqual(by_index[0]['result'], by_index[1]['result'])
+        self.assertTrue(all(entry['status'] == 200 for entry in entries))
+        self.assertEqual(self.upstream.count('/v1/geocode/search'), 2)
+
+    async def test_results_stream_in_completion_order(self):
+        self.upstream.slow_geocode('rome', 0.2)
+
+        entries = await collect(TravelBatch([('Rome', None), ('Paris', None)], {'weather'}))
+
+        self.assertEqual([entry['index'] for entry in entries], [1, 0])
+
+    async def test_unknown_place_does_not_fail_the_batch(self):
+        entries = await collect(TravelBatch([('nowhere', None), ('Paris', None)], {'weather'}))
+
+        statuses = {entry['index']: entry['status'] for entry in entries}
+        self.assertEqual(statuses, {0: 404, 1: 200})
+
+    async def test_stopping_early_releases_locks(self):
+        self.upstream.slow_geocode('rome', 5)
+
+        results = TravelBatch([('Paris', None), ('Rome', None)], {'weather'}).results()
+        first = await results.__anext__()
+        await results.aclose()
+
+        self.assertEqual(first['index'], 0)
+        self.assertIsNone(await cache.aget('singleflight:geocode_rome'))
+
+
+class TravelBatchViewTests(UpstreamTestCase):
+    async def test_streams_one_line_per_place(self):
+        response = await self.async_client.post(
+            '/api/travel/batch/', {'places': ['Paris', {'place': 'Rome'}], 'fields': 'weather'},
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(sorted(line['index'] for line in lines), [0, 1])
+        self.assertTrue(all(line['status'] == 200 for line in lines))
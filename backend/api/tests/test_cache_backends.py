@@ -0,0 +1,146 @@
+import asyncio
+import pickle
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from api.cache_backends import TieredCache, _SQLiteStore
+
+
+def make_cache(**options):
+    # Tiers are shared per location, so every test gets a file of its own
+    location = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False).name
+    return TieredCache(location, {'OPTIONS': options})
+
+
+class TieredCacheTests(SimpleTestCase):
+    def test_l2_hit_is_promoted_into_l1(self):
+        tiered = make_cache()
+        tiered.set('geocode_paris', 'coordinates')
+        # As in another worker process, which has only the shared file
+        with tiered._l1_lock:
+            tiered._l1['other'].clear()
+
+        self.assertEqual(tiered.get('geocode_paris'), 'coordinates')
+        self.assertEqual(tiered.get('geocode_paris'), 'coordinates')
+        stats = tiered.stats()
+        self.assertEqual((stats['l2']['hits'], stats['l1']['hits'], stats['l1']['promotions']), (1, 1, 1))
+
+    def test_l1_picks_up_other_workers_writes_after_its_timeout(self):
+        tiered = make_cache(L1_TIMEOUT=0.05)
+        tiered.set('weather_u09t', 'sunny')
+        # Another worker overwrites the key in the shared file
+        tiered._l2.set(tiered.make_and_validate_key('weather_u09t'), pickle.dumps('rain'), None)
+
+        self.assertEqual(tiered.get('weather_u09t'), 'sunny')
+        time.sleep(0.06)
+        self.assertEqual(tiered.get('weather_u09t'), 'rain')
+
+
+class TieredCacheAsyncTests(SimpleTestCase):
+    async def test_async_calls_round_trip(self):
+        tiered = make_cache()
+        await tiered.aset('weather_u09t', 'sunny')
+
+        self.assertEqual(await tiered.aget('weather_u09t'), 'sunny')
+        self.assertTrue(await tiered.ahas_key('weather_u09t'))
+        self.assertFalse(await tiered.aadd('weather_u09t', 'rain'))
+        self.assertTrue(await tiered.adelete('weather_u09t'))
+        self.assertIsNone(await tiered.aget('weather_u09t'))
+
+    async def test_l1_hit_does_not_touch_the_disk(self):
+        tiered = make_cache()
+        await tiered.aset('weather_u09t', 'sunny')
+
+        with mock.patch.object(_SQLiteStore, 'get') as l2_get:
+            self.assertEqual(await tiered.aget('weather_u09t'), 'sunny')
+        l2_get.assert_not_called()
+
+    async def test_l2_reads_run_concurrently_off_the_request_thread(self):
+        tiered = make_cache()
+        threads = set()
+
+        def slow_get(store, key):
+            threads.add(threading.current_thread())
+            time.sleep(0.2)
+            return None
+
+        with mock.patch.object(_SQLiteStore, 'get', slow_get):
+            started = time.monotonic()
+            await asyncio.gather(tiered.aget('weather_a'), tiered.aget('weather_b'))
+
+        self.assertLess(time.monotonic() - started, 0.35)
+        self.assertNotIn(threading.main_thread(), threads)
+
+
+class L1QuotaTests(SimpleTestCase):
+    def make_cache(self, **options):
+        options.setdefault('L1_QUOTAS', {'hotels': 4000, 'geocode': 4000})
+        return make_cache(**options)
+
+    def l1_keys(self, tiered, namespace):
+        return [key.split(':')[-1] for key in tiered._l1[namespace]._entries]
+
+    def test_namespace_stays_within_its_quota(self):
+        tiered = self.make_cache()
+        for i in range(20):
+            tiered.set(f'hotels_{i}', 'x' * 500)
+
+        stats = tiered.stats()['namespaces']['hotels']
+        self.assertLessEqual(stats['bytes'], 4000)
+        self.assertGreater(stats['demotions'], 0)
+        # Demoted entries are still in L2
+        self.assertEqual(tiered.get('hotels_0'), 'x' * 500)
+
+    def test_full_namespace_does_not_demote_others(self):
+        tiered = self.make_cache()
+        tiered.set('geocode_paris', 'coordinates')
+        for i in range(20):
+            tiered.set(f'hotels_{i}', 'x' * 500)
+
+        self.assertEqual(self.l1_keys(tiered, 'geocode'), ['geocode_paris'])
+
+    def test_lru_demotes_least_recently_used(self):
+        # Room for two of these entries
+        tiered = self.make_cache(L1_QUOTAS={'hotels': 2000})
+        tiered.set('hotels_a', 'x' * 500)
+        tiered.set('hotels_b', 'x' * 500)
+        tiered.get('hotels_a')
+        tiered.set('hotels_c', 'x' * 500)
+
+        self.assertEqual(self.l1_keys(tiered, 'hotels'), ['hotels_a', 'hotels_c'])
+
+    def test_lfu_demotes_least_frequently_used(self):
+        tiered = self.make_cache(L1_QUOTAS={'hotels': 2000}, L1_EVICTION='lfu')
+        tiered.set('hotels_a', 'x' * 500)
+        tiered.set('hotels_b', 'x' * 500)
+        for _ in range(3):
+            tiered.get('hotels_a')
+        tiered.get('hotels_b')
+        tiered.set('hotels_c', 'x' * 500)
+
+        self.assertEqual(sorted(self.l1_keys(tiered, 'hotels')), ['hotels_a', 'hotels_c'])
+
+    def test_entry_larger_than_quota_only_goes_to_l2(self):
+        tiered = self.make_cache()
+        tiered.set('hotels_big', 'x' * 5000)
+
+        self.assertEqual(self.l1_keys(tiered, 'hotels'), [])
+        self.assertEqual(tiered.stats()['namespaces']['hotels']['too_large'], 1)
+        self.assertEqual(tiered.get('hotels_big'), 'x' * 5000)
+
+    async def test_async_writes_respect_the_quota(self):
+        tiered = self.make_cache()
+        for i in range(20):
+            await tiered.aset(f'hotels_{i}', 'x' * 500)
+
+        self.assertLessEqual(tiered.stats()['namespaces']['hotels']['bytes'], 4000)
+        self.assertEqual(await tiered.aget('hotels_0'), 'x' * 500)
+
+    def test_unknown_eviction_policy_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.make_cache(L1_EVICTION='fifo')
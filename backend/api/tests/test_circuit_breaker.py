@@ -0,0 +1,95 @@
+import time
+
+import httpx
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from api.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from api.services.http_client import get_async_client
+
+from .helpers import UpstreamTestCase
+
+WEATHER_URL = 'https://api.openweathermap.org/data/2.5/weather'
+
+
+@override_settings(
+    CIRCUIT_BREAKER_MIN_CALLS=2, CIRCUIT_BREAKER_FAILURE_RATE=0.5,
+    CIRCUIT_BREAKER_OPEN_SECONDS=0.05, CIRCUIT_BREAKER_SLOW_CALL=1
+)
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('geoapify:/v2/places', 'geoapify')
+
+    def open(self):
+        for _ in range(2):
+            self.breaker.before_call()
+            self.breaker.record(True)
+
+    def test_opens_after_enough_failures(self):
+        self.breaker.record(False)
+        self.breaker.record(True)
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpen):
+            self.breaker.before_call()
+
+    def test_slow_calls_count_as_failures(self):
+        self.breaker.record(False, latency=2)
+        self.breaker.record(False, latency=2)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_calls_that_never_reached_upstream_are_ignored(self):
+        for _ in range(3):
+            self.breaker.record(None)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe_closes_on_success(self):
+        self.open()
+        time.sleep(0.06)
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        # One probe at a time
+        with self.assertRaises(CircuitOpen):
+            self.breaker.before_call()
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe_reopens_on_failure(self):
+        self.open()
+        time.sleep(0.06)
+        self.breaker.before_call()
+        self.breaker.record(True)
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpen):
+            self.breaker.check()
+
+
+@override_settings(
+    CIRCUIT_BREAKER_MIN_CALLS=2, CIRCUIT_BREAKER_FAILURE_RATE=0.5, CIRCUIT_BREAKER_OPEN_SECONDS=60
+)
+class UpstreamCircuitTests(UpstreamTestCase):
+    async def test_open_circuit_stops_calls_to_its_endpoint_only(self):
+        self.upstream.answers['/data/2.5/weather'] = httpx.Response(500)
+        client = get_async_client()
+        for _ in range(2):
+            await client.get(WEATHER_URL)
+
+        with self.assertRaises(CircuitOpen):
+            await client.get(WEATHER_URL)
+        self.assertEqual(self.upstream.count('/data/2.5/weather'), 2)
+
+        response = await client.get('https://api.geoapify.com/v1/geocode/search', params={'text': 'Paris'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_open_circuit_falls_back_without_waiting(self):
+        self.upstream.answers['/data/2.5/weather'] = httpx.ConnectError('connection refused')
+        for _ in range(2):
+            # Not answered from a cached failure
+            cache.clear()
+            self.client.get('/api/travel/info/', {'place': 'Paris', 'fields': 'weather'})
+        calls = self.upstream.count('/data/2.5/weather')
+
+        cache.clear()
+        response = self.client.get('/api/travel/info/', {'place': 'Paris', 'fields': 'weather'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.upstream.count('/data/2.5/weather'), calls)
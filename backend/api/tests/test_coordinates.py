@@ -0,0 +1,41 @@
+from django.test import SimpleTestCase, override_settings
+
+from api.services.coordinates import measure_from, quantize
+from api.services.hotels_service import AsyncHotelsService
+
+from .helpers import PARIS, UpstreamTestCase
+
+LAT, LON = PARIS
+
+
+class QuantizeTests(SimpleTestCase):
+    def test_nearby_points_share_a_cell_and_its_centre(self):
+        # About 100 m apart
+        first = quantize('weather', 48.8566, 2.3522)
+        second = quantize('weather', 48.8575, 2.3530)
+        self.assertEqual(first, second)
+        self.assertEqual(len(first[0]), 5)
+
+    @override_settings(CACHE_KEY_GEOHASH_PRECISION={'weather': 3})
+    def test_precision_is_set_per_kind(self):
+        self.assertEqual(len(quantize('weather', LAT, LON)[0]), 3)
+        self.assertEqual(len(quantize('hotels', LAT, LON)[0]), 7)
+
+    def test_distances_are_measured_from_the_caller(self):
+        places = [
+            {'name': 'Far', 'coordinates': {'latitude': LAT + 0.002, 'longitude': LON}, 'distance': 5},
+            {'name': 'Near', 'coordinates': {'latitude': LAT + 0.001, 'longitude': LON}, 'distance': 9},
+        ]
+
+        measured = measure_from(places, LAT, LON, radius=150)
+        self.assertEqual([(p['name'], p['distance']) for p in measured], [('Near', 111)])
+
+
+class QuantizedCacheKeyTests(UpstreamTestCase):
+    async def test_nearby_callers_share_one_hotels_fetch(self):
+        service = AsyncHotelsService()
+        first = await service.get_hotels_by_coordinates(48.85661, 2.35221)
+        second = await service.get_hotels_by_coordinates(48.85671, 2.35231)
+
+        self.assertEqual(self.upstream.count('/v2/places'), 1)
+        self.assertNotEqual(first[0]['distance'], second[0]['distance'])
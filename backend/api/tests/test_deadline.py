@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.services import deadline
+from api.services.coordinates import quantize
+from api.services.executor import agather_sections
+from api.services.response_cache import response_cache
+from api.services.single_flight import single_flight
+from api.services.travel_service import AsyncTravelService
+from api.views import _request_deadline
+
+from .helpers import LOCMEM_CACHE, PARIS, UpstreamTestCase
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DeadlineTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_section_cut_at_the_deadline_releases_its_lock(self):
+        async def slow():
+            await asyncio.sleep(5)
+            return 'value'
+
+        started = time.monotonic()
+        with deadline.deadline(0.1):
+            results = await agather_sections({
+                'weather': (single_flight.aget_or_fetch('key', slow, 60), None),
+                'images': (asyncio.sleep(0, result=['image']), [])
+            })
+            incomplete = deadline.incomplete_sections()
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(results, {'weather': None, 'images': ['image']})
+        self.assertEqual(incomplete, {'skipped': ['weather'], 'stale': []})
+        self.assertIsNone(await cache.aget('singleflight:key'))
+
+
+@override_settings(REQUEST_DEADLINES={'travel_info': 2}, REQUEST_DEADLINE_MAX=30)
+class RequestDeadlineTests(SimpleTestCase):
+    def deadline_for(self, header=None):
+        headers = {} if header is None else {'HTTP_X_REQUEST_DEADLINE': header}
+        return _request_deadline(RequestFactory().get('/api/travel/info/', **headers), 'travel_info')
+
+    def test_header_sets_the_deadline(self):
+        self.assertEqual(self.deadline_for('0.5'), 0.5)
+        self.assertEqual(self.deadline_for(), 2)
+
+    def test_header_is_clamped_to_the_maximum(self):
+        self.assertEqual(self.deadline_for('100'), 30)
+
+    def test_invalid_header_falls_back_to_the_endpoint_default(self):
+        for header in ('0', '-1', 'nan', 'inf', 'soon'):
+            with self.subTest(header=header):
+                self.assertEqual(self.deadline_for(header), 2)
+
+    @override_settings(REQUEST_DEADLINES={'travel_info': 0})
+    def test_only_the_setting_disables_the_deadline(self):
+        self.assertIsNone(self.deadline_for())
+        self.assertIsNone(self.deadline_for('0'))
+        self.assertEqual(self.deadline_for('5'), 5)
+
+
+class DeadlineViewTests(UpstreamTestCase):
+    url = '/api/travel/info/'
+
+    def weather_key(self):
+        cell, _, _ = quantize('weather', *PARIS)
+        return AsyncTravelService()._weather_cache_key(cell)
+
+    def test_section_not_done_in_time_is_skipped(self):
+        self.upstream.delays['/data/2.5/weather'] = 1
+
+        started = time.monotonic()
+        response = self.client.get(
+            self.url, {'place': 'Paris', 'fields': 'weather,images'}, HTTP_X_REQUEST_DEADLINE='0.2'
+        )
+
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['weather'])
+        self.assertEqual(response.json()['partial'], {'skipped': ['weather'], 'stale': []})
+        self.assertEqual(len(response.json()['images']), 1)
+
+    def test_stale_section_is_reported_and_refreshed(self):
+        self.client.get(self.url, {'place': 'Paris', 'fields': 'weather'})
+        entry = cache.get(self.weather_key())
+        cache.set(self.weather_key(), entry._replace(fresh_until=time.time() - 1), 3600)
+        cache.delete(response_cache.key(
+            'travel_info', 'application/json', place='paris', user_location='', fields=['weather']
+        ))
+
+        response = self.client.get(self.url, {'place': 'Paris', 'fields': 'weather'})
+        self.assertEqual(response.json()['partial'], {'skipped': [], 'stale': ['weather']})
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        for refresh in list(single_flight._refresh_tasks):
+            refresh.result(timeout=5)
+        self.assertGreater(cache.get(self.weather_key()).fresh_until, time.time())
+        self.assertNotIn('partial', self.client.get(self.url, {'place': 'Paris', 'fields': 'weather'}).json())
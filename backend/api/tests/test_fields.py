@@ -0,0 +1,35 @@
+from api.services.travel_service import AsyncTravelService
+
+from .helpers import UpstreamTestCase
+
+
+class FieldsTests(UpstreamTestCase):
+    async def test_unrequested_sections_are_not_fetched(self):
+        info = await AsyncTravelService().get_travel_info('Paris', fields={'weather'})
+
+        self.assertEqual(info['weather']['temperature'], 18.4)
+        self.assertNotIn('images', info)
+        self.assertNotIn('hotels', info)
+        self.assertEqual(self.upstream.count('/v2/places'), 0)
+        self.assertEqual(self.upstream.count('/search/photos'), 0)
+
+    async def test_only_the_requested_places_categories_are_queried(self):
+        await AsyncTravelService().get_travel_info('Paris', fields={'hotels'})
+
+        self.assertEqual(self.upstream.count('/v2/places'), 1)
+        self.assertEqual(self.upstream.count('/v2/places', categories='accommodation.hotel,accommodation'), 1)
+        self.assertEqual(self.upstream.count('/data/2.5/weather'), 0)
+
+    def test_fields_are_read_from_the_query_string(self):
+        response = self.client.get('/api/travel/info/', {'place': 'Paris', 'fields': 'weather, images'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()) - {'place', 'timestamp'}, {'weather', 'images'})
+        self.assertEqual(self.upstream.count('/v2/places'), 0)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/travel/info/', {'place': 'Paris', 'fields': 'weather,beaches'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Unknown fields: beaches')
+        self.assertEqual(self.upstream.calls, [])
@@ -0,0 +1,77 @@
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from api.services.coordinates import quantize
+from api.services.response_cache import response_cache
+from api.services.single_flight import SingleFlight, _Entry, freshness
+from api.services.travel_service import TravelService
+
+from .helpers import LOCMEM_CACHE, PARIS, UpstreamTestCase, max_age
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FreshnessTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_freshness_records_time_left_of_values_served(self):
+        flight = SingleFlight()
+        cache.set('old', _Entry('value', time.time() + 100), 600)
+
+        with freshness() as fresh:
+            flight.get_or_fetch('new', lambda: 'value', 1000)
+            self.assertAlmostEqual(fresh.remaining(), 1000, delta=1)
+            flight.get_or_fetch('old', lambda: 'value', 1000)
+            self.assertAlmostEqual(fresh.remaining(), 100, delta=1)
+
+
+class ResponseTtlTests(SimpleTestCase):
+    def setUp(self):
+        self.travel = TravelService()
+        self.info = {'place': {'name': 'Paris', 'details': {'name': 'Paris'}}, 'weather': {'temperature': 18.4}}
+
+    def test_shortest_section_ttl_bounds_the_response(self):
+        self.assertEqual(self.travel.response_ttl(self.info), TravelService.SECTION_TTLS['weather'])
+
+    def test_time_left_of_cached_sections_bounds_the_response(self):
+        self.assertEqual(self.travel.response_ttl(self.info, fresh_for=120), 120)
+        self.assertIsNone(self.travel.response_ttl(self.info, fresh_for=0))
+
+    @override_settings(NEGATIVE_CACHE_ERROR_TTL=60)
+    def test_empty_section_keeps_the_response_briefly(self):
+        self.info['weather'] = None
+        self.assertEqual(self.travel.response_ttl(self.info), 60)
+
+    def test_distance_is_expected_only_with_a_user_location(self):
+        self.info['distance'] = None
+        self.assertEqual(self.travel.response_ttl(self.info), TravelService.SECTION_TTLS['weather'])
+        self.assertLessEqual(self.travel.response_ttl(self.info, 'London'), 60)
+
+    def test_partial_response_is_not_reused(self):
+        self.info['partial'] = {'skipped': ['weather'], 'stale': []}
+        self.assertIsNone(self.travel.response_ttl(self.info))
+
+
+class TravelInfoMaxAgeTests(UpstreamTestCase):
+    url = '/api/travel/info/'
+    params = {'place': 'Paris', 'fields': 'weather'}
+
+    def test_max_age_is_the_freshness_left(self):
+        self.assertAlmostEqual(
+            max_age(self.client.get(self.url, self.params)), TravelService.SECTION_TTLS['weather'], delta=2
+        )
+
+        # Age the cached weather, and drop the response built from it
+        cell, _, _ = quantize('weather', *PARIS)
+        key = TravelService()._weather_cache_key(cell)
+        cache.set(key, cache.get(key)._replace(fresh_until=time.time() + 300), 3600)
+        cache.delete(response_cache.key(
+            'travel_info', 'application/json', place='paris', user_location='', fields=['weather']
+        ))
+
+        self.assertAlmostEqual(max_age(self.client.get(self.url, self.params)), 300, delta=10)
+        # The response cached from it ages along
+        self.assertAlmostEqual(max_age(self.client.get(self.url, self.params)), 300, delta=10)
+        self.assertEqual(self.upstream.count('/data/2.5/weather'), 1)
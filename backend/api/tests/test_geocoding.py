@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase
+
+from api.services.geocoding_service import AsyncGeocodingService, normalize_place
+from api.services.request_memo import memo_scope
+from api.services.travel_service import AsyncTravelService
+
+from .helpers import UpstreamTestCase
+
+
+class NormalizePlaceTests(SimpleTestCase):
+    def test_spelling_variants_normalize_alike(self):
+        self.assertEqual(normalize_place('  Paris,   FRANCE '), 'paris, france')
+        self.assertEqual(normalize_place('ＰＡＲＩＳ'), 'paris')
+
+
+class SharedGeocodingTests(UpstreamTestCase):
+    async def test_travel_info_geocodes_each_place_once(self):
+        # The destination is geocoded for the place itself, its hotels and the route
+        await AsyncTravelService().get_travel_info('Paris', 'London')
+
+        self.assertEqual(self.upstream.count('/v1/geocode/search', text='Paris'), 1)
+        self.assertEqual(self.upstream.count('/v1/geocode/search', text='London'), 1)
+
+    async def test_spelling_variants_share_one_lookup(self):
+        geocoder = AsyncGeocodingService()
+        with memo_scope():
+            first = await geocoder.geocode('Paris')
+            second = await geocoder.geocode(' paris ')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.upstream.count('/v1/geocode/search'), 1)
+
+    async def test_spelling_variants_share_cached_sections(self):
+        await AsyncTravelService().get_travel_info('Paris', fields={'images', 'details'})
+        calls = len(self.upstream.calls)
+        await AsyncTravelService().get_travel_info('  PARIS ', fields={'images', 'details'})
+
+        self.assertEqual(len(self.upstream.calls), calls)
@@ -0,0 +1,74 @@
+import datetime
+import time
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+
+from api.models import PlaceSearch
+from api.services.coordinates import quantize
+from api.services.hotels_service import HotelsService
+from api.services.response_cache import response_cache
+from api.services.restaurants_service import RestaurantsService
+from api.services.spatial_index import spatial_index
+
+from .helpers import PARIS, UpstreamTestCase, max_age
+
+
+class ConditionalRequestTests(UpstreamTestCase):
+    url = '/api/travel/info/'
+    params = {'place': 'Paris', 'fields': 'weather'}
+
+    def test_sends_etag_and_answers_if_none_match_with_304(self):
+        response = self.client.get(self.url, self.params)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        calls = len(self.upstream.calls)
+
+        not_modified = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(len(self.upstream.calls), calls)
+
+        other = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(other.status_code, 200)
+        self.assertEqual(len(self.upstream.calls), calls)
+
+
+class ListMaxAgeTests(UpstreamTestCase):
+    def test_hotels_max_age_is_the_freshness_left(self):
+        url = '/api/hotels/'
+        params = {'lat': PARIS[0], 'lon': PARIS[1], 'limit': 5}
+        response = self.client.get(url, params)
+        self.assertTrue(response.json()['hotels'])
+        self.assertAlmostEqual(max_age(response), HotelsService.CACHE_TTL, delta=2)
+
+        cell, _, _ = quantize('hotels', *PARIS)
+        key = f'hotels_coords_{cell}'
+        cache.set(key, cache.get(key)._replace(fresh_until=time.time() + 120), 3600)
+        cache.delete(response_cache.key('hotels', 'application/json', place=None, lat=PARIS[0], lon=PARIS[1], limit=5))
+
+        self.assertAlmostEqual(max_age(self.client.get(url, params)), 120, delta=5)
+
+    @override_settings(PLACE_STORE_PLACES_TTL_DAYS=7)
+    def test_restaurants_max_age_is_the_freshness_left_of_their_places(self):
+        url = '/api/restaurants/'
+        params = {'lat': PARIS[0], 'lon': PARIS[1], 'limit': 5, 'radius': 1000}
+        restaurants = self.client.get(url, params)
+        self.assertTrue(restaurants.json()['restaurants'])
+        self.assertAlmostEqual(max_age(restaurants), RestaurantsService.CACHE_TTL, delta=2)
+
+        # The stored search is due for a refetch in two minutes
+        PlaceSearch.objects.update(fetched_at=timezone.now() - datetime.timedelta(days=7, seconds=-120))
+        spatial_index.clear()
+
+        # Read back from the store, then from the spatial index it fills
+        for _ in range(2):
+            cache.delete(response_cache.key(
+                'restaurants', 'application/json', lat=PARIS[0], lon=PARIS[1], limit=5, radius=1000
+            ))
+            response = self.client.get(url, params)
+            self.assertEqual(response.json()['total'], restaurants.json()['total'])
+            self.assertAlmostEqual(max_age(response), 120, delta=5)
+        self.assertEqual(self.upstream.count('/v2/places'), 1)
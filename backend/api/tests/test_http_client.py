@@ -0,0 +1,23 @@
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from api.services import http_client
+
+
+class AsyncClientTests(SimpleTestCase):
+    def test_loop_client_is_closed_with_its_loop(self):
+        # Under WSGI each request awaits its view on a loop of its own
+        async def request():
+            return http_client._loop_client()
+
+        client = async_to_sync(request)()
+        self.assertTrue(client.is_closed)
+
+    def test_each_loop_gets_a_client_of_its_own(self):
+        async def request():
+            return http_client._loop_client(), http_client._loop_client()
+
+        first, same = async_to_sync(request)()
+        second, _ = async_to_sync(request)()
+        self.assertIs(first, same)
+        self.assertIsNot(first, second)
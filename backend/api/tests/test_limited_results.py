@@ -0,0 +1,40 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from api.services import limited_results
+
+from .helpers import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LimitedResultsTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.limits = []
+
+    def fetch(self, available):
+        def fetch(limit):
+            self.limits.append(limit)
+            return list(range(min(limit, available)))
+        return fetch
+
+    def test_smaller_limit_is_sliced_from_a_larger_result(self):
+        limited_results.get_or_fetch('key', 10, self.fetch(100), 60)
+
+        self.assertEqual(limited_results.get_or_fetch('key', 3, self.fetch(100), 60), [0, 1, 2])
+        self.assertEqual(self.limits, [10])
+
+    def test_larger_limit_fetches_again_when_the_result_was_cut_off(self):
+        limited_results.get_or_fetch('key', 5, self.fetch(100), 60)
+
+        self.assertEqual(len(limited_results.get_or_fetch('key', 8, self.fetch(100), 60)), 8)
+        self.assertEqual(self.limits, [5, 8])
+        # The larger result now serves both
+        limited_results.get_or_fetch('key', 5, self.fetch(100), 60)
+        self.assertEqual(self.limits, [5, 8])
+
+    def test_larger_limit_is_served_when_upstream_had_no_more(self):
+        limited_results.get_or_fetch('key', 10, self.fetch(4), 60)
+
+        self.assertEqual(limited_results.get_or_fetch('key', 50, self.fetch(4), 60), [0, 1, 2, 3])
+        self.assertEqual(self.limits, [10])
@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from api.services.geocoding_service import AsyncGeocodingService, unresolvable_places
+from api.services.rate_limiter import RateLimited
+from api.services.single_flight import CachedFailure, SingleFlight
+from api.services.travel_service import AsyncTravelService
+
+from .helpers import LOCMEM_CACHE, UpstreamTestCase
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class NegativeCachingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.flight = SingleFlight()
+
+    def test_empty_result_is_cached(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return []
+
+        self.assertEqual(self.flight.get_or_fetch('key', fetch, 60), [])
+        self.assertEqual(self.flight.get_or_fetch('key', fetch, 60), [])
+        self.assertEqual(len(calls), 1)
+
+    def test_failure_is_cached_briefly(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            raise ValueError('upstream error')
+
+        with self.assertRaises(ValueError):
+            self.flight.get_or_fetch('key', fetch, 60)
+        with self.assertRaises(CachedFailure):
+            self.flight.get_or_fetch('key', fetch, 60)
+        self.assertEqual(len(calls), 1)
+
+    def test_call_never_sent_is_not_cached(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            raise RateLimited('geoapify', None)
+
+        for _ in range(2):
+            with self.assertRaises(RateLimited):
+                self.flight.get_or_fetch('key', fetch, 60)
+        self.assertEqual(len(calls), 2)
+
+
+class NotFoundTests(UpstreamTestCase):
+    async def test_unresolvable_place_is_not_looked_up_again(self):
+        geocoder = AsyncGeocodingService()
+        self.assertIsNone(await geocoder.geocode('nowhere at all'))
+        self.assertIn('nowhere at all', unresolvable_places)
+
+        # Even once its cached answer is gone
+        await cache.aclear()
+        self.assertIsNone(await geocoder.geocode('  Nowhere at ALL '))
+        self.assertEqual(self.upstream.count('/v1/geocode/search'), 1)
+
+    async def test_empty_section_counts_as_a_cache_hit(self):
+        self.upstream.answers['/search/photos'] = {'results': []}
+        self.upstream.answers['/v2/places'] = {'features': []}
+
+        for _ in range(2):
+            info = await AsyncTravelService().get_travel_info('Paris', fields={'images', 'attractions'})
+            self.assertEqual(info['images'], [])
+            self.assertEqual(info['attractions'], [])
+
+        self.assertEqual(self.upstream.count('/search/photos'), 1)
+        self.assertEqual(self.upstream.count('/v2/places'), 1)
+
+    def test_unknown_place_answers_404_from_one_lookup(self):
+        for _ in range(2):
+            response = self.client.get('/api/travel/info/', {'place': 'nowhere'})
+            self.assertEqual(response.status_code, 404)
+
+        self.assertEqual(self.upstream.count('/v1/geocode/search'), 1)
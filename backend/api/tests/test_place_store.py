@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from api.models import PlaceSearch
+from api.services.geocoding_service import AsyncGeocodingService
+from api.services.place_store import place_store
+from api.services.spatial_index import spatial_index
+
+from .helpers import PARIS, UpstreamTestCase, feature
+
+
+def hotels_params(radius=5000, limit=10):
+    lat, lon = PARIS
+    return {
+        'categories': 'accommodation',
+        'filter': f'circle:{lon},{lat},{radius}',
+        'limit': limit
+    }
+
+
+class PlaceStoreTests(UpstreamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fetches = 0
+
+    def fetch(self):
+        self.fetches += 1
+        lat, lon = PARIS
+        return {'features': [
+            feature(lat + 0.001, lon, ['accommodation', 'accommodation.hotel'], 'Near'),
+            feature(lat + 0.02, lon, ['accommodation', 'accommodation.hotel'], 'Far'),
+        ]}
+
+    def test_places_are_read_through_the_store(self):
+        place_store.fetch_places(hotels_params(), self.fetch)
+        # A restarted worker: nothing in memory
+        spatial_index.clear()
+
+        data = place_store.fetch_places(hotels_params(), self.fetch)
+        self.assertEqual(self.fetches, 1)
+        self.assertEqual([f['properties']['name'] for f in data['features']], ['Near', 'Far'])
+
+    def test_smaller_query_is_answered_from_a_larger_search(self):
+        place_store.fetch_places(hotels_params(), self.fetch)
+        spatial_index.clear()
+
+        data = place_store.fetch_places(hotels_params(radius=1000, limit=5), self.fetch)
+        self.assertEqual(self.fetches, 1)
+        self.assertEqual([f['properties']['name'] for f in data['features']], ['Near'])
+        self.assertEqual(data['features'][0]['properties']['distance'], 111)
+
+    def test_expired_search_is_fetched_again(self):
+        place_store.fetch_places(hotels_params(), self.fetch)
+        spatial_index.clear()
+        PlaceSearch.objects.update(fetched_at=timezone.now() - place_store.places_ttl - timedelta(minutes=1))
+
+        place_store.fetch_places(hotels_params(), self.fetch)
+        self.assertEqual(self.fetches, 2)
+
+    async def test_geocode_is_read_through_the_store(self):
+        await AsyncGeocodingService().geocode('Paris')
+        # The cache was lost, the database was not
+        cache.clear()
+
+        place = await AsyncGeocodingService().geocode('Paris')
+        self.assertEqual((place['lat'], place['lon']), PARIS)
+        self.assertEqual(self.upstream.count('/v1/geocode/search'), 1)
@@ -0,0 +1,42 @@
+from api.services.place_store import place_store
+from api.services.places_planner import current_plan, parse_query, places_plan
+from api.services.travel_service import AsyncTravelService
+
+from .helpers import PARIS, UpstreamTestCase, feature
+
+
+class PlacesPlanTests(UpstreamTestCase):
+    def test_plan_merges_queries_except_broad_categories(self):
+        params = AsyncTravelService()._planned_places({'lat': PARIS[0], 'lon': PARIS[1]}, None)
+        merged = []
+
+        def get_places(merged_params):
+            merged.append(merged_params)
+            return {'features': [feature(48.8501, 2.3501, ['accommodation.hotel', 'tourism.sights'])]}
+
+        with places_plan(params, get_places):
+            plan = current_plan()
+            queries = [parse_query(query_params) for query_params in params]
+            self.assertEqual(len(plan.queries), 2)
+            self.assertNotIn('commercial', ','.join(query[0] for query in plan.queries))
+
+            details = next(query for query in queries if 'commercial' in query[0])
+            self.assertFalse(plan.prefetch(place_store, details))
+            self.assertEqual(merged, [])
+
+            hotels = next(query for query in queries if query[0].startswith('accommodation'))
+            self.assertTrue(plan.prefetch(place_store, hotels))
+        self.assertEqual(len(merged), 1)
+        self.assertNotIn('commercial', merged[0]['categories'])
+
+    async def test_travel_info_sends_one_merged_query(self):
+        info = await AsyncTravelService().get_travel_info('Paris', fields={'attractions', 'details', 'hotels'})
+
+        self.assertTrue(info['attractions'])
+        self.assertTrue(info['hotels'])
+        categories = [params['categories'] for path, params in self.upstream.calls if path == '/v2/places']
+        # The merged attractions and hotels query, and the details query of its own
+        self.assertEqual(len(categories), 2)
+        merged = next(query for query in categories if 'commercial' not in query)
+        self.assertIn('accommodation', merged)
+        self.assertIn('tourism.attraction', merged)
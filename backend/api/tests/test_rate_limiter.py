@@ -0,0 +1,65 @@
+from django.test import TestCase, override_settings
+
+from api.services.rate_limiter import RateLimited, RateLimiter, essential, rate_limiter
+
+from .helpers import UpstreamTestCase
+
+
+class RateLimiterTests(TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter()
+
+    @override_settings(UPSTREAM_RATE_LIMITS={'geoapify': {'rate': 0.001, 'burst': 2, 'daily': None}})
+    def test_bucket_holds_burst_tokens(self):
+        self.assertTrue(self.limiter.try_acquire('geoapify'))
+        self.assertTrue(self.limiter.try_acquire('geoapify'))
+        self.assertFalse(self.limiter.try_acquire('geoapify'))
+
+    @override_settings(UPSTREAM_RATE_LIMITS={'geoapify': {'rate': 0.001, 'burst': 1, 'daily': None}})
+    def test_workers_share_one_budget(self):
+        # A second limiter stands in for another worker process
+        self.assertTrue(self.limiter.try_acquire('geoapify'))
+        self.assertFalse(RateLimiter().try_acquire('geoapify'))
+
+    @override_settings(
+        UPSTREAM_RATE_LIMITS={'geoapify': {'rate': 100, 'burst': 100, 'daily': 10}},
+        UPSTREAM_QUOTA_RESERVE=0.1
+    )
+    def test_reserve_is_kept_for_essential_calls(self):
+        granted = sum(self.limiter.try_acquire('geoapify') for _ in range(10))
+        self.assertEqual(granted, 9)
+        with essential():
+            self.assertTrue(self.limiter.try_acquire('geoapify'))
+            self.assertFalse(self.limiter.try_acquire('geoapify'))
+
+    @override_settings(
+        UPSTREAM_RATE_LIMITS={'geoapify': {'rate': 0.001, 'burst': 1, 'daily': None}},
+        UPSTREAM_RATE_LIMIT_MAX_WAIT=0
+    )
+    def test_acquire_raises_when_budget_is_spent(self):
+        self.limiter.acquire('geoapify')
+        with self.assertRaises(RateLimited):
+            self.limiter.acquire('geoapify')
+        self.assertEqual(self.limiter.denied(), {'geoapify': 1})
+
+    @override_settings(UPSTREAM_RATE_LIMITS={'geoapify': {'rate': 1, 'burst': 5, 'daily': None}})
+    def test_penalty_empties_the_bucket(self):
+        self.limiter.penalize('geoapify', 30)
+        self.assertFalse(self.limiter.try_acquire('geoapify'))
+        self.assertAlmostEqual(self.limiter.retry_after('geoapify'), 31, delta=1)
+
+
+@override_settings(
+    UPSTREAM_RATE_LIMITS={'geoapify': {'rate': 0.001, 'burst': 1, 'daily': None}},
+    UPSTREAM_RATE_LIMIT_MAX_WAIT=0
+)
+class RateLimitedViewTests(UpstreamTestCase):
+    def test_spent_budget_is_answered_with_503_without_calling_upstream(self):
+        self.assertTrue(rate_limiter.try_acquire('geoapify'))
+
+        response = self.client.get('/api/travel/info/', {'place': 'Paris'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['provider'], 'geoapify')
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(self.upstream.calls, [])
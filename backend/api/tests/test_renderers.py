@@ -0,0 +1,67 @@
+import datetime
+import decimal
+import json
+import unittest
+import uuid
+from unittest import mock
+
+from rest_framework import renderers
+
+from api import renderers as api_renderers
+from api.renderers import JSONRenderer, msgpack, orjson
+
+from .helpers import UpstreamTestCase
+
+PAYLOAD = {
+    'place': {'name': 'Zürich', 'lat': 47.3769, 'lon': 8.5417, 'tags': ['café', '東京']},
+    'price': decimal.Decimal('12.50'),
+    'fetched_at': datetime.datetime(2024, 5, 1, 12, 30, 5, 123456, tzinfo=datetime.timezone.utc),
+    'opens': datetime.time(9, 30),
+    'day': datetime.date(2024, 5, 1),
+    'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'note': 'line\u2028separator',
+    'empty': None,
+    7: 'integer key',
+}
+
+
+class JSONRendererTests(unittest.TestCase):
+    def assert_renders_as_drf(self, data, media_type='application/json'):
+        self.assertEqual(
+            JSONRenderer().render(data, media_type, {}),
+            renderers.JSONRenderer().render(data, media_type, {})
+        )
+
+    @unittest.skipUnless(orjson, 'orjson is not installed')
+    def test_orjson_output_matches_drf(self):
+        self.assert_renders_as_drf(PAYLOAD)
+        self.assert_renders_as_drf([1, 2.5, True, 'a'])
+        self.assert_renders_as_drf(None)
+
+    def test_indented_output_is_left_to_drf(self):
+        self.assert_renders_as_drf(PAYLOAD, 'application/json; indent=2')
+
+    def test_standard_library_fallback_matches_drf(self):
+        with mock.patch.object(api_renderers, 'orjson', None):
+            self.assert_renders_as_drf(PAYLOAD)
+            self.assertEqual(api_renderers.ndjson_line({'a': 'é'}), '{"a":"é"}\n')
+
+
+class ContentNegotiationTests(UpstreamTestCase):
+    url = '/api/travel/info/'
+    params = {'place': 'Paris', 'fields': 'weather'}
+
+    def test_json_by_default(self):
+        response = self.client.get(self.url, self.params)
+
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['weather']['temperature'], 18.4)
+
+    @unittest.skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack_is_negotiated_through_accept(self):
+        packed = self.client.get(self.url, self.params, HTTP_ACCEPT='application/msgpack')
+        plain = self.client.get(self.url, self.params)
+
+        self.assertEqual(packed['Content-Type'], 'application/msgpack')
+        self.assertIn('Accept', packed['Vary'])
+        self.assertEqual(msgpack.unpackb(packed.content), json.loads(plain.content))
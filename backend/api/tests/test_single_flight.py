@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from api.services.single_flight import SingleFlight, _Entry
+
+from .helpers import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE, SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.flight = SingleFlight()
+
+    def test_concurrent_callers_share_one_fetch(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.flight.get_or_fetch('key', fetch, 60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+        self.assertIsNone(cache.get('singleflight:key'))
+
+    def test_concurrent_async_callers_share_one_fetch(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'value'
+
+        async def gather():
+            return await asyncio.gather(*(self.flight.aget_or_fetch('key', fetch, 60) for _ in range(5)))
+
+        self.assertEqual(async_to_sync(gather)(), ['value'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_cached_value_is_not_fetched_again(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return 'value'
+
+        self.flight.get_or_fetch('key', fetch, 60)
+        self.assertEqual(self.flight.get_or_fetch('key', fetch, 60), 'value')
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(SINGLE_FLIGHT_WAIT_TIMEOUT=0.1)
+    def test_fetches_itself_when_another_worker_holds_the_lock_too_long(self):
+        cache.add('singleflight:key', 'other worker', 30)
+
+        started = time.monotonic()
+        self.assertEqual(self.flight.get_or_fetch('key', lambda: 'value', 60), 'value')
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        # The other worker's lock is left alone
+        self.assertEqual(cache.get('singleflight:key'), 'other worker')
+
+    def test_returns_what_another_worker_fetched_while_waiting(self):
+        cache.add('singleflight:key', 'other worker', 30)
+        threading.Timer(0.05, lambda: cache.set('key', _Entry('theirs', time.time() + 60), 60)).start()
+
+        self.assertEqual(self.flight.get_or_fetch('key', lambda: 'ours', 60), 'theirs')
+
+    def test_lock_is_released_when_the_fetch_fails(self):
+        def fetch():
+            raise ValueError('upstream error')
+
+        with self.assertRaises(ValueError):
+            self.flight.get_or_fetch('key', fetch, 60)
+        self.assertIsNone(cache.get('singleflight:key'))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.flight = SingleFlight()
+
+    def wait_for_refreshes(self):
+        for refresh in list(self.flight._refresh_tasks):
+            refresh.result(timeout=5)
+
+    def test_serves_stale_value_and_refreshes_it(self):
+        cache.set('key', _Entry('old', time.time() - 1), 600)
+        refreshed = threading.Event()
+
+        def fetch():
+            refreshed.set()
+            return 'new'
+
+        self.assertEqual(self.flight.get_or_fetch('key', fetch, 60, 600), 'old')
+        self.assertTrue(refreshed.wait(5))
+        give_up_at = time.monotonic() + 5
+        while cache.get('key').value != 'new' and time.monotonic() < give_up_at:
+            time.sleep(0.01)
+
+        entry = cache.get('key')
+        self.assertEqual(entry.value, 'new')
+        self.assertGreater(entry.fresh_until, time.time())
+
+    def test_one_refresh_for_many_stale_reads(self):
+        cache.set('key', _Entry('old', time.time() - 1), 600)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'new'
+
+        async def reads():
+            return [await self.flight.aget_or_fetch('key', fetch, 60, 600) for _ in range(5)]
+
+        self.assertEqual(async_to_sync(reads)(), ['old'] * 5)
+        self.wait_for_refreshes()
+        self.assertEqual(len(calls), 1)
+
+    def test_async_refresh_outlives_the_request_loop(self):
+        # Under WSGI each request awaits its view on a loop of its own
+        cache.set('key', _Entry('old', time.time() - 1), 600)
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return 'new'
+
+        async def view():
+            return await self.flight.aget_or_fetch('key', fetch, 60, 600)
+
+        self.assertEqual(async_to_sync(view)(), 'old')
+        self.wait_for_refreshes()
+
+        entry = cache.get('key')
+        self.assertEqual(entry.value, 'new')
+        self.assertGreater(entry.fresh_until, time.time())
+
+    def test_failed_refresh_keeps_serving_the_stale_value(self):
+        cache.set('key', _Entry('old', time.time() - 1), 600)
+
+        async def fetch():
+            raise ValueError('upstream error')
+
+        async def view():
+            return await self.flight.aget_or_fetch('key', fetch, 60, 600)
+
+        self.assertEqual(async_to_sync(view)(), 'old')
+        self.wait_for_refreshes()
+        self.assertEqual(async_to_sync(view)(), 'old')
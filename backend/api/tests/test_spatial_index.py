@@ -0,0 +1,55 @@
+from django.test import SimpleTestCase
+
+from api.services.spatial_index import SpatialIndex
+
+from .helpers import PARIS, feature
+
+LAT, LON = PARIS
+
+
+class SpatialIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = SpatialIndex()
+
+    def test_complete_result_covers_its_circle(self):
+        self.index.add('accommodation', LAT, LON, 1000, 10, {'features': [
+            feature(LAT + 0.001, LON, ['accommodation', 'accommodation.hotel'])
+        ]})
+
+        self.assertTrue(self.index.covers('accommodation', LAT, LON, 1000, 10))
+        self.assertTrue(self.index.covers('accommodation.hotel', LAT, LON, 500, 5))
+        self.assertFalse(self.index.covers('accommodation', LAT, LON, 2000, 10))
+        self.assertFalse(self.index.covers('catering', LAT, LON, 500, 5))
+
+    def test_find_answers_nearest_first_with_distances(self):
+        self.index.add('accommodation,catering', LAT, LON, 5000, 10, {'features': [
+            feature(LAT + 0.002, LON, ['accommodation'], 'Farther'),
+            feature(LAT + 0.001, LON, ['accommodation'], 'Nearer'),
+            feature(LAT + 0.0015, LON, ['catering'], 'Cafe'),
+        ]})
+
+        found = self.index.find('accommodation', LAT, LON, 5000, 10)
+        self.assertEqual([f['properties']['name'] for f in found['features']], ['Nearer', 'Farther'])
+        self.assertEqual([f['properties']['distance'] for f in found['features']], [111, 222])
+
+    def test_query_centred_off_the_region_is_covered_only_inside_it(self):
+        self.index.add('accommodation', LAT, LON, 1000, 10, {'features': []})
+
+        # 222 m north: a 500 m circle still lies inside the 1 km region
+        self.assertTrue(self.index.covers('accommodation', LAT + 0.002, LON, 500, 10))
+        self.assertFalse(self.index.covers('accommodation', LAT + 0.002, LON, 900, 10))
+
+    def test_truncated_result_covers_up_to_its_farthest_feature(self):
+        # Two features for a limit of two: anything farther is unknown
+        self.index.add('accommodation', LAT, LON, 5000, 2, {'features': [
+            feature(LAT + 0.001, LON, ['accommodation']),
+            feature(LAT + 0.009, LON, ['accommodation'])
+        ]})
+
+        self.assertTrue(self.index.covers('accommodation', LAT, LON, 500, 10))
+        self.assertTrue(self.index.covers('accommodation', LAT, LON, 5000, 1))
+        self.assertFalse(self.index.covers('accommodation', LAT, LON, 5000, 10))
+
+        found = self.index.find('accommodation', LAT, LON, 5000, 1)
+        self.assertEqual(len(found['features']), 1)
+        self.assertEqual(found['features'][0]['properties']['distance'], 111)
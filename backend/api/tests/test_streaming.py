@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+from django.core.cache import cache
+
+from api.services.travel_service import AsyncTravelService
+
+from .helpers import UpstreamTestCase
+
+
+async def read(response) -> str:
+    return b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+
+
+class TravelInfoStreamingTests(UpstreamTestCase):
+    async def test_ndjson_sends_place_first_and_done_last(self):
+        response = await self.async_client.get('/api/travel/info/', {'place': 'Paris', 'format': 'ndjson'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        sections = [json.loads(line)['section'] for line in (await read(response)).splitlines()]
+        self.assertEqual(sections[0], 'place')
+        self.assertEqual(sections[-1], 'done')
+        self.assertCountEqual(sections[1:-1], ['images', 'weather', 'attractions', 'details', 'hotels'])
+
+    async def test_sse_names_events_after_sections(self):
+        response = await self.async_client.get(
+            '/api/travel/info/', {'place': 'Paris', 'fields': 'weather'}, headers={'Accept': 'text/event-stream'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        events = [
+            line[len('event: '):] for line in (await read(response)).splitlines() if line.startswith('event: ')
+        ]
+        self.assertEqual(events, ['place', 'weather', 'done'])
+
+    async def test_unknown_place_is_not_streamed(self):
+        response = await self.async_client.get('/api/travel/info/', {'place': 'nowhere', 'format': 'ndjson'})
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_closing_the_stream_releases_locks(self):
+        self.upstream.slow_geocode('london', 5)
+
+        events = AsyncTravelService().stream_travel_info('Paris', 'London', {'distance'})
+        first = await events.__anext__()
+        # Let the distance section get as far as geocoding London
+        await asyncio.sleep(0.1)
+        await events.aclose()
+
+        self.assertEqual(first[0], 'place')
+        self.assertIsNone(await cache.aget('singleflight:geocode_london'))
@@ -0,0 +1,41 @@
+import time
+
+import httpx
+
+from api.services.travel_service import AsyncTravelService
+
+from .helpers import UpstreamTestCase
+
+
+class TravelInfoFanOutTests(UpstreamTestCase):
+    async def test_sections_are_fetched_concurrently(self):
+        for path in ('/data/2.5/weather', '/search/photos', '/v2/places'):
+            self.upstream.delays[path] = 0.2
+
+        started = time.monotonic()
+        info = await AsyncTravelService().get_travel_info('Paris')
+
+        # Weather, images and the one merged places query, side by side
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(info['weather']['temperature'], 18.4)
+        self.assertEqual(len(info['images']), 1)
+        self.assertTrue(info['attractions'])
+        self.assertTrue(info['hotels'])
+
+    async def test_failed_section_leaves_the_others_intact(self):
+        self.upstream.answers['/data/2.5/weather'] = httpx.Response(500)
+        self.upstream.answers['/search/photos'] = httpx.ConnectError('connection refused')
+
+        info = await AsyncTravelService().get_travel_info('Paris')
+
+        self.assertIsNone(info['weather'])
+        self.assertEqual(info['images'], [])
+        self.assertTrue(info['attractions'])
+        self.assertTrue(info['hotels'])
+        self.assertEqual(info['place']['name'], 'Paris')
+
+    async def test_unknown_place_fetches_no_sections(self):
+        info = await AsyncTravelService().get_travel_info('Nowhere at all')
+
+        self.assertEqual(info, {'error': 'Place not found'})
+        self.assertEqual([path for path, _ in self.upstream.calls], ['/v1/geocode/search'])
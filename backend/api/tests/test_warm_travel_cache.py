@@ -0,0 +1,64 @@
+import os
+import tempfile
+from io import StringIO
+
+import httpx
+from django.core.cache import cache
+from django.core.management import call_command
+
+from .helpers import WEATHER, UpstreamTransactionTestCase
+
+
+class WarmTravelCacheTests(UpstreamTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.progress_file = os.path.join(directory.name, 'warm.progress')
+
+    def warm(self, *places):
+        out = StringIO()
+        call_command(
+            'warm_travel_cache', *places, fields='weather', progress_file=self.progress_file, stdout=out
+        )
+        return out.getvalue()
+
+    def progress(self):
+        with open(self.progress_file, encoding='utf-8') as f:
+            return f.read().split()
+
+    def test_warms_every_place_and_starts_over_next_time(self):
+        output = self.warm('Paris', 'Rome')
+
+        self.assertIn('Warmed 2 places', output)
+        self.assertEqual(self.upstream.count('/v1/geocode/search'), 2)
+        self.assertFalse(os.path.exists(self.progress_file))
+
+    def test_resumes_after_the_places_already_warmed(self):
+        with open(self.progress_file, 'w', encoding='utf-8') as f:
+            f.write('paris\n')
+
+        output = self.warm('Paris', 'Rome')
+
+        self.assertIn('Resuming: 1 of 2 places already warmed', output)
+        self.assertEqual(self.upstream.count('/v1/geocode/search', text='Paris'), 0)
+        self.assertEqual(self.upstream.count('/v1/geocode/search', text='Rome'), 1)
+
+    def test_place_with_a_failed_section_is_tried_again(self):
+        self.upstream.answers['/data/2.5/weather'] = httpx.Response(500)
+
+        output = self.warm('Paris', 'nowhere')
+
+        self.assertIn('Paris: incomplete weather', output)
+        self.assertIn('Not all places were warmed', output)
+        # Not found is final; the failed place is left for the next run
+        self.assertEqual(self.progress(), ['nowhere'])
+
+        self.upstream.answers['/data/2.5/weather'] = WEATHER
+        # The failure is remembered briefly
+        cache.clear()
+        output = self.warm('Paris', 'nowhere')
+
+        self.assertIn('Resuming: 1 of 2 places already warmed', output)
+        self.assertIn('Warmed 1 places', output)
+        self.assertFalse(os.path.exists(self.progress_file))
@@ -0,0 +1,49 @@
+from unittest import mock
+
+from api.services.single_flight import single_flight
+from api.services.wikipedia_service import AsyncWikipediaService
+
+from .helpers import UpstreamTestCase
+
+SUMMARY_PATH = '/api/rest_v1/page/summary/Paris'
+# Addresses are reverse geocoded through the search endpoint
+ADDRESS = {'type': 'street'}
+
+
+async def uncached(key, fetch, *args, **kwargs):
+    return await fetch()
+
+
+class WikipediaMemoTests(UpstreamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upstream.answers[SUMMARY_PATH] = {
+            'title': 'Paris', 'extract': 'Paris is the capital of France.',
+            'content_urls': {'desktop': {'page': 'https://en.wikipedia.org/wiki/Paris'}}
+        }
+
+    async def test_place_info_fetches_each_call_once_per_request(self):
+        # Without the cache, only the request memo de-duplicates the calls
+        with mock.patch.object(single_flight, 'aget_or_fetch', uncached):
+            info = await AsyncWikipediaService().get_place_info('Paris')
+
+        self.assertEqual(info['summary'], 'Paris is the capital of France.')
+        self.assertIn('address', info)
+        self.assertEqual(self.upstream.count(SUMMARY_PATH), 1)
+        self.assertEqual(self.upstream.count('/v1/geocode/search', text='Paris'), 1)
+        self.assertEqual(self.upstream.count('/v1/geocode/search', **ADDRESS), 1)
+
+    async def test_summary_and_address_are_cached_across_requests(self):
+        await AsyncWikipediaService().get_place_info('Paris')
+        await AsyncWikipediaService().get_place_info('paris')
+
+        self.assertEqual(self.upstream.count(SUMMARY_PATH), 1)
+        self.assertEqual(self.upstream.count('/v1/geocode/search', **ADDRESS), 1)
+
+    async def test_missing_article_is_not_fetched_again(self):
+        self.upstream.answers.pop(SUMMARY_PATH)
+
+        self.assertIsNone(await AsyncWikipediaService().get_place_info('Paris'))
+        self.assertIsNone(await AsyncWikipediaService().get_place_info('Paris'))
+
+        self.assertEqual(self.upstream.count(SUMMARY_PATH), 1)
@@ -3,7 +3,9 @@ from . import views
 
 urlpatterns = [
     path('', views.health_check, name='health_check'),
+    path('stats/', views.stats, name='stats'),
     path('travel/info/', views.travel_info, name='travel_info'),
+    path('travel/batch/', views.travel_batch, name='travel_batch'),
     path('restaurants/', views.get_restaurants, name='get_restaurants'), 
     path('hotels/',views.get_hotels,name='get_hotels') # NEW endpoint
 ]
@@ -1,16 +1,154 @@
-from rest_framework.decorators import api_view
+from adrf.decorators import api_view
+from rest_framework.decorators import renderer_classes
 from rest_framework.response import Response
 from rest_framework import status
-from django.views.decorators.cache import cache_page
+from rest_framework.settings import api_settings
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.core.cache import cache
 from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
 import logging
-import requests
+import math
+import re
+import httpx
+from contextlib import aclosing
+from typing import Optional
 
-from .services.travel_service import TravelService
-from .services.hotels_service import HotelsService
+from .renderers import EventStreamRenderer, NDJSONRenderer, ndjson_line, sse_event
+from .services.batch_service import TravelBatch
+from .services.travel_service import AsyncTravelService
+from .services.hotels_service import AsyncHotelsService, HotelsService
+from .services.restaurants_service import AsyncRestaurantsService, RestaurantsService
+from .services.http_client import pool_stats
+from .services.circuit_breaker import circuit_breakers
+from .services.deadline import DeadlineExceeded, deadline
+from .services.errors import UpstreamUnavailable, unavailable_error
+from .services.geocoding_service import normalize_place, unresolvable_places
+from .services.rate_limiter import rate_limiter
+from .services.response_cache import CachedResponse, encoded, response_cache
+from .services.spatial_index import spatial_index
+from .services.single_flight import freshness
 
 logger = logging.getLogger(__name__)
 
+# Endpoints that can stream also accept NDJSON and server-sent events
+STREAMING_RENDERERS = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer, EventStreamRenderer]
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def _parse_fields(request):
+    """
+    Sections requested through `fields` (or `include`) in the body or query
+    string, as a comma-separated string or a list.
+
+    Returns:
+        (fields or None for all sections, error Response or None)
+    """
+    raw = None
+    for source in (request.data, request.query_params):
+        if not hasattr(source, 'get'):
+            continue
+        raw = source.get('fields') or source.get('include')
+        if raw:
+            break
+    if not raw:
+        return None, None
+
+    names = raw if isinstance(raw, list) else str(raw).split(',')
+    fields = {str(name).strip().lower() for name in names if str(name).strip()}
+    unknown = fields - set(AsyncTravelService.SECTIONS)
+    if unknown:
+        return None, Response({
+            'error': f"Unknown fields: {', '.join(sorted(unknown))}",
+            'fields': list(AsyncTravelService.SECTIONS)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    return fields, None
+
+
+def _request_deadline(request, endpoint: str):
+    """
+    Seconds the endpoint has to answer: the X-Request-Deadline header if it
+    is a positive number, up to REQUEST_DEADLINE_MAX, else the endpoint's
+    entry in REQUEST_DEADLINES. None means no deadline, which only the
+    setting can ask for.
+    """
+    maximum = getattr(settings, 'REQUEST_DEADLINE_MAX', 30)
+    try:
+        seconds = float(request.headers.get('X-Request-Deadline', ''))
+    except ValueError:
+        seconds = None
+    # 0, negative numbers, nan and inf neither lift the deadline nor expire it at once
+    if seconds is not None and math.isfinite(seconds) and seconds > 0:
+        return min(seconds, maximum)
+
+    seconds = getattr(settings, 'REQUEST_DEADLINES', {}).get(endpoint)
+    if not seconds or seconds <= 0:
+        return None
+    return min(seconds, maximum)
+
+
+def _unavailable_response(body: dict) -> Response:
+    """503 for a request upstream cannot serve for now"""
+    response = Response(body, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if body.get('retry_after') is not None:
+        response['Retry-After'] = str(body['retry_after'])
+    return response
+
+
+def _encode(request, data, timeout) -> CachedResponse:
+    """Render data as the response would, fresh for timeout seconds, for the response cache"""
+    renderer = request.accepted_renderer
+    body = renderer.render(data, request.accepted_media_type, {'request': request})
+    content_type = f"{renderer.media_type}; charset={renderer.charset}" if renderer.charset else renderer.media_type
+    return encoded(body, content_type, timeout)
+
+
+def _encoded_response(request, cached: CachedResponse) -> HttpResponse:
+    """
+    Response with an already encoded body, gzipped if the client accepts it.
+
+    GET requests also get its ETag and freshness as Cache-Control, and a 304
+    without the body if If-None-Match names it.
+    """
+    accepts_gzip = bool(ACCEPTS_GZIP.search(request.headers.get('Accept-Encoding', '')))
+    gzipped = cached.gzipped and accepts_gzip
+    conditional = request.method in ('GET', 'HEAD')
+    if conditional and cached.matches(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(cached.content(accepts_gzip), content_type=cached.content_type)
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+    if conditional:
+        response['ETag'] = cached.etag_for(gzipped)
+        if cached.fresh_until is None:
+            patch_cache_control(response, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=cached.max_age())
+    patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+    return response
+
+
+def _list_ttl(items, ttl: float, fresh_for: Optional[float] = None) -> float:
+    """
+    Freshness of a list response: what is left of the cached entry it was
+    built from (fresh_for, as recorded by freshness()), ttl at most. An empty
+    list may stand for a failure.
+    """
+    if fresh_for is not None:
+        ttl = min(ttl, fresh_for)
+    return ttl if items else min(ttl, getattr(settings, 'NEGATIVE_CACHE_ERROR_TTL', 60))
+
+
+def _streaming_response(content, stream_format: str) -> StreamingHttpResponse:
+    content_type = EventStreamRenderer.media_type if stream_format == 'sse' else NDJSONRenderer.media_type
+    response = StreamingHttpResponse(content, content_type=content_type)
+    # Let proxies pass each event through as soon as it is written
+    response['X-Accel-Buffering'] = 'no'
+    response['Cache-Control'] = 'no-cache'
+    return response
+
 
 # ------------------------
 # Health Check Endpoint
@@ -25,11 +163,32 @@ def health_check(request):
     }, status=status.HTTP_200_OK)
 
 
+# ------------------------
+# Stats Endpoint
+# ------------------------
+@api_view(['GET'])
+def stats(request):
+    """
+    Cache, spatial index and HTTP pool counters of the worker process serving
+    the request, and the upstream rate-limit budget left across all workers
+    """
+    cache_stats = cache.stats() if hasattr(cache, 'stats') else None
+    return Response({
+        'cache': cache_stats,
+        'spatial_index': spatial_index.stats(),
+        'http': pool_stats(),
+        'rate_limits': rate_limiter.stats(),
+        'circuits': circuit_breakers.stats(),
+        'unresolvable_places': unresolvable_places.stats()
+    }, status=status.HTTP_200_OK)
+
+
 # ------------------------
 # Main Travel Info Endpoint
 # ------------------------
-@api_view(['POST'])
-def travel_info(request):
+@api_view(['GET', 'POST'])
+@renderer_classes(STREAMING_RENDERERS)
+async def travel_info(request):
     """
     Get comprehensive travel information for a place including:
     - Place details and coordinates
@@ -42,11 +201,41 @@ def travel_info(request):
     Request Body:
         {
             "place": "Paris, France",
-            "user_location": "London, UK" (optional)
+            "user_location": "London, UK" (optional),
+            "fields": "weather,hotels" (optional, also accepted as `include`
+                or in the query string; default: all sections)
         }
+
+    A GET takes the same parameters from the query string, e.g.
+    /api/travel/info/?place=Paris&fields=weather,hotels
+
+    Sections are images, weather, attractions, details, hotels and distance.
+    Sections left out of `fields` are not fetched and not in the response.
+
+    Caching:
+        Complete responses are kept encoded, and gzipped for clients that
+        accept it, for the shortest freshness of their sections. Requests
+        for the same place, user location and fields are answered from that
+        copy; its `timestamp` is when its content last changed. GET
+        responses carry an ETag and that freshness as Cache-Control
+        max-age, and If-None-Match is answered with 304.
+
+    Deadline:
+        The response is sent within REQUEST_DEADLINES['travel_info'] seconds,
+        or the X-Request-Deadline header's. Sections not fetched by then are
+        left empty and listed under `partial.skipped`; sections served from
+        a stale cache entry are listed under `partial.stale`.
+
+    Streaming:
+        With `Accept: application/x-ndjson` (or ?format=ndjson) the response
+        is streamed as one line per section, `{"section": ..., "data": ...}`;
+        with `Accept: text/event-stream` (or ?format=sse) as server-sent
+        events named after the sections. `place` is sent once the place is
+        geocoded, then `images`, `weather`, `attractions`, `details`,
+        `hotels` and `distance` as each one finishes, and `done` last.
     """
     try:
-        data = request.data
+        data = request.data if request.method == 'POST' else request.query_params
         place = data.get('place', '').strip()
         user_location = data.get('user_location', '').strip()
 
@@ -59,22 +248,51 @@ def travel_info(request):
                 }
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        fields, error = _parse_fields(request)
+        if error:
+            return error
+
         logger.info(f"Fetching travel info for: {place}")
 
-        # Get comprehensive travel information
-        travel_service = TravelService()
-        result = travel_service.get_travel_info(place, user_location)
-        
+        stream_format = request.accepted_renderer.format
+        streaming = stream_format in (NDJSONRenderer.format, EventStreamRenderer.format)
+        if not streaming:
+            cache_key = response_cache.key(
+                'travel_info', request.accepted_media_type,
+                place=normalize_place(place),
+                user_location=normalize_place(user_location),
+                fields=sorted(fields) if fields is not None else None
+            )
+            cached = await response_cache.aget(cache_key)
+            if cached is not None:
+                return _encoded_response(request, cached)
+
+        with deadline(_request_deadline(request, 'travel_info')):
+            if streaming:
+                return await _stream_travel_info(place, user_location, fields, stream_format)
+
+            # Get comprehensive travel information
+            travel_service = AsyncTravelService()
+            with freshness() as fresh:
+                result = await travel_service.get_travel_info(place, user_location, fields)
+
         if 'error' in result:
             return Response(result, status=status.HTTP_404_NOT_FOUND)
 
-        # Add hotels information
-        hotels_service = HotelsService()
-        hotels = hotels_service.get_hotels(place, limit=10)
-        result['hotels'] = hotels
-
         logger.info(f"Successfully fetched travel info for: {place}")
-        return Response(result, status=status.HTTP_200_OK)
+        ttl = travel_service.response_ttl(result, user_location, fresh.remaining())
+        if ttl:
+            await response_cache.apin_timestamp(cache_key, result, max(travel_service.SECTION_TTLS.values()))
+        response = _encode(request, result, ttl)
+        await response_cache.aset(cache_key, response)
+        return _encoded_response(request, response)
+
+    except DeadlineExceeded as e:
+        # The place itself could not be geocoded in time
+        return Response(unavailable_error(e), status=status.HTTP_504_GATEWAY_TIMEOUT)
+
+    except UpstreamUnavailable as e:
+        return _unavailable_response(unavailable_error(e))
 
     except Exception as e:
         logger.error(f"Error in travel_info: {str(e)}", exc_info=True)
@@ -84,11 +302,114 @@ def travel_info(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+async def _stream_travel_info(place: str, user_location: str, fields, stream_format: str):
+    events = AsyncTravelService().stream_travel_info(place, user_location, fields)
+
+    # Wait for geocoding so a place that cannot be found still gets a 404
+    first = await events.__anext__()
+    if first[0] == 'error':
+        await events.aclose()
+        if 'retry_after' in first[1]:
+            return _unavailable_response(first[1])
+        not_found = first[1].get('error') == 'Place not found'
+        return Response(first[1], status=status.HTTP_404_NOT_FOUND if not_found
+                        else status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def content():
+        # Closed as soon as the response is, so the sections are cancelled then
+        async with aclosing(events):
+            event = first
+            while True:
+                name, data = event
+                if stream_format == EventStreamRenderer.format:
+                    yield sse_event(name, data)
+                else:
+                    yield ndjson_line({'section': name, 'data': data})
+                try:
+                    event = await events.__anext__()
+                except StopAsyncIteration:
+                    break
+
+    return _streaming_response(content(), stream_format)
+
+
+# ------------------------
+# Batch Travel Info Endpoint
+# ------------------------
+@api_view(['POST'])
+@renderer_classes(STREAMING_RENDERERS)
+async def travel_batch(request):
+    """
+    Get travel information for many places at once.
+
+    Results are streamed as newline-delimited JSON, one line per place in
+    the order they complete, each carrying the index of its place in the
+    request. Repeated places are fetched once.
+
+    Request Body:
+        {
+            "places": ["Paris, France", {"place": "Rome", "user_location": "Milan"}],
+            "user_location": "London, UK" (optional, default for all places),
+            "fields": "weather,hotels" (optional, sections for every place)
+        }
+
+    Response lines:
+        {"index": 0, "place": "Paris, France", "user_location": "London, UK",
+         "status": 200, "result": {...travel info...}}
+    """
+    data = request.data
+    places = data.get('places')
+    default_user_location = (data.get('user_location') or '').strip()
+    max_places = getattr(settings, 'TRAVEL_BATCH_MAX_PLACES', 50)
+
+    if not isinstance(places, list) or not places:
+        return Response({
+            'error': 'places must be a non-empty list',
+            'example': {
+                'places': ['Paris, France', {'place': 'Rome, Italy', 'user_location': 'Milan, Italy'}],
+                'user_location': 'London, UK'
+            }
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if len(places) > max_places:
+        return Response({
+            'error': f'At most {max_places} places are allowed per batch'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    fields, error = _parse_fields(request)
+    if error:
+        return error
+
+    items = []
+    for entry in places:
+        if isinstance(entry, dict):
+            place = str(entry.get('place') or '').strip()
+            user_location = str(entry.get('user_location') or '').strip() or default_user_location
+        else:
+            place = str(entry or '').strip()
+            user_location = default_user_location
+        if not place:
+            return Response({
+                'error': 'Every entry in places needs a place name'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        items.append((place, user_location))
+
+    logger.info(f"Fetching travel info for a batch of {len(items)} places")
+
+    async def ndjson():
+        # Closed as soon as the response is, so the batch is cancelled then
+        async with aclosing(TravelBatch(items, fields).results()) as results:
+            async for result in results:
+                yield ndjson_line(result)
+
+    return _streaming_response(ndjson(), NDJSONRenderer.format)
+
+
 # ------------------------
 # Nearby Restaurants Endpoint
 # ------------------------
 @api_view(['GET'])
-def get_restaurants(request):
+async def get_restaurants(request):
     """
     Get nearby restaurants using Geoapify API.
     
@@ -99,6 +420,9 @@ def get_restaurants(request):
         radius: Search radius in meters (optional, default: 5000)
     
     Example: /api/restaurants/?lat=48.8566&lon=2.3522&limit=10&radius=3000
+
+    Responses carry an ETag and Cache-Control max-age; If-None-Match is
+    answered with 304.
     """
     try:
         lat = request.GET.get('lat')
@@ -125,44 +449,28 @@ def get_restaurants(request):
                 'error': 'Geoapify API key not configured'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Build Geoapify API URL
-        url = (
-            f"https://api.geoapify.com/v2/places?"
-            f"categories=catering.restaurant,catering.cafe,catering.fast_food&"
-            f"filter=circle:{lon},{lat},{radius}&"
-            f"limit={limit}&"
-            f"apiKey={settings.GEOPI_API_KEY}"
+        cache_key = response_cache.key(
+            'restaurants', request.accepted_media_type, lat=lat, lon=lon, limit=limit, radius=radius
         )
-        
-        logger.info(f"Fetching restaurants near ({lat}, {lon})")
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        # Format response
-        restaurants = []
-        for feature in data.get('features', []):
-            props = feature['properties']
-            coords = feature['geometry']['coordinates']
-            
-            restaurants.append({
-                'name': props.get('name', 'Unnamed Restaurant'),
-                'address': props.get('formatted'),
-                'categories': props.get('categories', []),
-                'coordinates': {
-                    'latitude': coords[1],
-                    'longitude': coords[0]
-                },
-                'distance': props.get('distance'),
-                'place_id': props.get('place_id')
-            })
+        cached = await response_cache.aget(cache_key)
+        if cached is not None:
+            return _encoded_response(request, cached)
 
-        return Response({
+        restaurants_service = AsyncRestaurantsService()
+        with freshness() as fresh:
+            restaurants = await restaurants_service.get_restaurants(lat, lon, limit=limit, radius=radius)
+
+        response = _encode(request, {
             'total': len(restaurants),
             'restaurants': restaurants
-        }, status=status.HTTP_200_OK)
+        }, _list_ttl(restaurants, RestaurantsService.CACHE_TTL, fresh.remaining()))
+        await response_cache.aset(cache_key, response)
+        return _encoded_response(request, response)
 
-    except requests.exceptions.RequestException as e:
+    except UpstreamUnavailable as e:
+        return _unavailable_response(unavailable_error(e))
+
+    except httpx.HTTPError as e:
         logger.error(f"Geoapify API request failed: {str(e)}", exc_info=True)
         return Response({
             'error': 'Failed to fetch data from Geoapify API',
@@ -181,7 +489,7 @@ def get_restaurants(request):
 # Hotels Endpoint
 # ------------------------
 @api_view(['GET'])
-def get_hotels(request):
+async def get_hotels(request):
     """
     Get hotels near a place.
     
@@ -196,6 +504,9 @@ def get_hotels(request):
     Examples:
         /api/hotels/?place=Paris&limit=5
         /api/hotels/?lat=48.8566&lon=2.3522&limit=10
+
+    Responses carry an ETag and Cache-Control max-age; If-None-Match is
+    answered with 304.
     """
     try:
         place = request.GET.get('place', '').strip()
@@ -203,22 +514,18 @@ def get_hotels(request):
         lon = request.GET.get('lon')
         limit = int(request.GET.get('limit', 10))
 
-        hotels_service = HotelsService()
-
         # Use coordinates if provided, otherwise use place name
         if lat and lon:
             try:
                 lat = float(lat)
                 lon = float(lon)
-                logger.info(f"Fetching hotels near coordinates ({lat}, {lon})")
-                hotels = hotels_service.get_hotels_by_coordinates(lat, lon, limit=limit)
             except ValueError:
                 return Response({
                     'error': 'Invalid lat or lon value. Must be valid numbers.'
                 }, status=status.HTTP_400_BAD_REQUEST)
+            place = None
         elif place:
-            logger.info(f"Fetching hotels near: {place}")
-            hotels = hotels_service.get_hotels(place, limit=limit)
+            lat = lon = None
         else:
             return Response({
                 'error': 'Either place name or coordinates (lat, lon) are required',
@@ -228,10 +535,29 @@ def get_hotels(request):
                 ]
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({
+        cache_key = response_cache.key(
+            'hotels', request.accepted_media_type,
+            place=normalize_place(place) if place else None, lat=lat, lon=lon, limit=limit
+        )
+        cached = await response_cache.aget(cache_key)
+        if cached is not None:
+            return _encoded_response(request, cached)
+
+        hotels_service = AsyncHotelsService()
+        with freshness() as fresh:
+            if place is None:
+                logger.info(f"Fetching hotels near coordinates ({lat}, {lon})")
+                hotels = await hotels_service.get_hotels_by_coordinates(lat, lon, limit=limit)
+            else:
+                logger.info(f"Fetching hotels near: {place}")
+                hotels = await hotels_service.get_hotels(place, limit=limit)
+
+        response = _encode(request, {
             'total': len(hotels),
             'hotels': hotels
-        }, status=status.HTTP_200_OK)
+        }, _list_ttl(hotels, HotelsService.CACHE_TTL, fresh.remaining()))
+        await response_cache.aset(cache_key, response)
+        return _encoded_response(request, response)
 
     except Exception as e:
         logger.error(f"Error in get_hotels: {str(e)}", exc_info=True)
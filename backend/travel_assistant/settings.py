@@ -3,6 +3,7 @@ Django settings for travel_assistant project.
 """
 
 from pathlib import Path
+import importlib.util
 import os
 from dotenv import load_dotenv
 
@@ -74,6 +75,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'travel_assistant.wsgi.application'
+ASGI_APPLICATION = 'travel_assistant.asgi.application'
 
 
 # Database
@@ -83,6 +85,44 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Workers share the place store; wait for a writer instead of failing
+            'timeout': 20,
+        },
+    }
+}
+
+# Cache
+# Two tiers so no Redis or memcached is needed: an in-process cache in each
+# worker in front of a SQLite file on local disk shared by all workers.
+# Worker memory is split by key namespace; each gets a quota in megabytes
+# (CACHE_QUOTA_<NAMESPACE>_MB) and other keys share CACHE_QUOTA_OTHER_MB.
+# CACHE_EVICTION picks what goes when a namespace is full: 'lru' or 'lfu'.
+
+CACHE_QUOTAS_MB = {
+    'geocode': 1,
+    'weather': 2,
+    'images': 4,
+    'attractions': 4,
+    'hotels': 8,
+    'distance': 1,
+    'responses': 8,
+    'other': 4,
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'api.cache_backends.TieredCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache.sqlite3')),
+        'OPTIONS': {
+            'L1_QUOTAS': {
+                name: int(float(os.getenv(f'CACHE_QUOTA_{name.upper()}_MB', str(megabytes))) * 2 ** 20)
+                for name, megabytes in CACHE_QUOTAS_MB.items()
+            },
+            'L1_EVICTION': os.getenv('CACHE_EVICTION', 'lru'),
+            'L1_TIMEOUT': int(os.getenv('CACHE_L1_TIMEOUT', '60')),
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '100000')),
+        },
     }
 }
 
@@ -140,8 +180,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # JSON by default; MessagePack for clients that send
+    # `Accept: application/msgpack`, when the msgpack package is installed
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.JSONRenderer',
+        *(['api.renderers.MessagePackRenderer'] if importlib.util.find_spec('msgpack') else []),
     ],
 }
 
@@ -152,3 +195,114 @@ OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY', '')
 OPENROUTESERVICE_API_KEY = os.getenv('OPENROUTESERVICE_API_KEY', '')
 GEOPI_API_KEY = os.getenv('GEOPI_API_KEY', '6f681d232cb6487e836bdaa45185abba')
 
+
+# Size of the process-wide executor that refreshes stale cache entries in
+# the background for the sync services
+UPSTREAM_MAX_WORKERS = int(os.getenv('UPSTREAM_MAX_WORKERS', '32'))
+
+# Async views: connection cap of the shared httpx client in each ASGI worker
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', '1000'))
+
+# Pooled upstream HTTP clients shared by all services: keep-alive connections
+# kept per host (defaults to UPSTREAM_MAX_WORKERS, one per fetching thread),
+# number of upstream hosts pooled, idle connection lifetime in seconds, and
+# HTTP/2 for the async client (needs the h2 package)
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '0')) or UPSTREAM_MAX_WORKERS
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '10'))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30'))
+HTTP2_ENABLED = os.getenv('HTTP2_ENABLED', 'False').lower() == 'true'
+
+# Single-flight coalescing of cache misses: how long the cross-process fetch
+# lock lives and how long other workers wait on it before fetching themselves
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_LOCK_TIMEOUT', '30'))
+SINGLE_FLIGHT_WAIT_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_WAIT_TIMEOUT', '15'))
+
+# Negative caching: how long (seconds) lookups that found nothing, and fetches
+# that failed, are remembered before upstream is asked again, and how many
+# unresolvable place strings each worker keeps in memory
+NEGATIVE_CACHE_NOT_FOUND_TTL = int(os.getenv('NEGATIVE_CACHE_NOT_FOUND_TTL', '3600'))
+NEGATIVE_CACHE_ERROR_TTL = int(os.getenv('NEGATIVE_CACHE_ERROR_TTL', '60'))
+UNRESOLVABLE_PLACES_MAX_ENTRIES = int(os.getenv('UNRESOLVABLE_PLACES_MAX_ENTRIES', '10000'))
+
+# Response cache: travel info, hotels and restaurants responses kept
+# encoded, for the shortest freshness of their sections, and gzipped when at
+# least RESPONSE_CACHE_GZIP_MIN_BYTES long
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+RESPONSE_CACHE_GZIP = os.getenv('RESPONSE_CACHE_GZIP', 'True').lower() == 'true'
+RESPONSE_CACHE_GZIP_MIN_BYTES = int(os.getenv('RESPONSE_CACHE_GZIP_MIN_BYTES', '1024'))
+
+# Place store: how long persisted geocodes and places searches are trusted
+# before services go back to Geoapify
+PLACE_STORE_GEOCODE_TTL_DAYS = int(os.getenv('PLACE_STORE_GEOCODE_TTL_DAYS', '30'))
+PLACE_STORE_PLACES_TTL_DAYS = int(os.getenv('PLACE_STORE_PLACES_TTL_DAYS', '7'))
+
+# Spatial index: covered places query circles kept in memory per worker, so
+# queries inside an area fetched before are answered without Geoapify
+SPATIAL_INDEX_MAX_REGIONS = int(os.getenv('SPATIAL_INDEX_MAX_REGIONS', '5000'))
+SPATIAL_INDEX_TTL = int(os.getenv('SPATIAL_INDEX_TTL', str(60 * 60 * 6)))
+
+# Coordinate cache keys: geohash length per data type. Requests from points
+# in the same cell share a cache entry (5 ~ 4.9 km, 6 ~ 1.2 km, 7 ~ 150 m,
+# 8 ~ 38 m)
+CACHE_KEY_GEOHASH_PRECISION = {
+    'weather': int(os.getenv('WEATHER_GEOHASH_PRECISION', '5')),
+    'attractions': int(os.getenv('ATTRACTIONS_GEOHASH_PRECISION', '6')),
+    'hotels': int(os.getenv('HOTELS_GEOHASH_PRECISION', '7')),
+    'restaurants': int(os.getenv('RESTAURANTS_GEOHASH_PRECISION', '8')),
+}
+
+# Batch travel info: most places per request, and how many are fetched at
+# the same time
+TRAVEL_BATCH_MAX_PLACES = int(os.getenv('TRAVEL_BATCH_MAX_PLACES', '50'))
+TRAVEL_BATCH_CONCURRENCY = int(os.getenv('TRAVEL_BATCH_CONCURRENCY', '8'))
+
+# End-to-end deadline (seconds) per endpoint: upstream timeouts are cut to
+# the time left and sections not done by then are skipped. Clients may ask
+# for another deadline with the X-Request-Deadline header, up to
+# REQUEST_DEADLINE_MAX; only this setting can disable the deadline, with 0.
+REQUEST_DEADLINES = {
+    'travel_info': float(os.getenv('TRAVEL_INFO_DEADLINE', '2')),
+}
+REQUEST_DEADLINE_MAX = float(os.getenv('REQUEST_DEADLINE_MAX', '30'))
+
+# Places planner: features requested by the merged Geoapify places query that
+# stands in for the several queries of one travel info or Wikipedia request,
+# how far (metres) from the plan centre a query may be and still be merged,
+# and categories too broad to merge (queries for them are sent on their own)
+PLACES_PLAN_LIMIT = int(os.getenv('PLACES_PLAN_LIMIT', '200'))
+PLACES_PLAN_MAX_OFFSET = int(os.getenv('PLACES_PLAN_MAX_OFFSET', '2000'))
+PLACES_PLAN_UNMERGED_CATEGORIES = [
+    category.strip()
+    for category in os.getenv('PLACES_PLAN_UNMERGED_CATEGORIES', 'commercial').split(',')
+    if category.strip()
+]
+
+# Upstream rate limits shared by all workers: token bucket refill rate
+# (requests per second) and burst per provider, and daily quota (None for
+# none). Defaults follow the providers' free plans; Unsplash demo apps get
+# 50 requests per hour.
+UNSPLASH_HOURLY_LIMIT = int(os.getenv('UNSPLASH_HOURLY_LIMIT', '50'))
+UPSTREAM_RATE_LIMITS = {
+    'geoapify': {'rate': 5, 'burst': 5, 'daily': int(os.getenv('GEOAPIFY_DAILY_QUOTA', '3000'))},
+    'unsplash': {'rate': UNSPLASH_HOURLY_LIMIT / 3600, 'burst': UNSPLASH_HOURLY_LIMIT, 'daily': None},
+    'openweather': {'rate': 1, 'burst': 60, 'daily': int(os.getenv('OPENWEATHER_DAILY_QUOTA', '1000'))},
+    'openrouteservice': {'rate': 40 / 60, 'burst': 40, 'daily': int(os.getenv('OPENROUTESERVICE_DAILY_QUOTA', '2000'))},
+    'wikipedia': {'rate': 50, 'burst': 50, 'daily': None},
+}
+# Share of each daily quota kept for geocoding, which every endpoint needs,
+# and how long (seconds) a call may wait for its bucket to refill before it
+# is given up
+UPSTREAM_QUOTA_RESERVE = float(os.getenv('UPSTREAM_QUOTA_RESERVE', '0.1'))
+UPSTREAM_RATE_LIMIT_MAX_WAIT = float(os.getenv('UPSTREAM_RATE_LIMIT_MAX_WAIT', '1'))
+
+# Circuit breakers per upstream endpoint: a breaker opens once at least
+# CIRCUIT_BREAKER_MIN_CALLS calls in the last CIRCUIT_BREAKER_WINDOW seconds
+# saw this failure rate, counting calls slower than CIRCUIT_BREAKER_SLOW_CALL
+# seconds as failed. It then fails fast for CIRCUIT_BREAKER_OPEN_SECONDS and
+# lets CIRCUIT_BREAKER_PROBES calls through to test the endpoint again.
+CIRCUIT_BREAKER_WINDOW = int(os.getenv('CIRCUIT_BREAKER_WINDOW', '60'))
+CIRCUIT_BREAKER_MIN_CALLS = int(os.getenv('CIRCUIT_BREAKER_MIN_CALLS', '5'))
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv('CIRCUIT_BREAKER_FAILURE_RATE', '0.5'))
+CIRCUIT_BREAKER_SLOW_CALL = float(os.getenv('CIRCUIT_BREAKER_SLOW_CALL', '3'))
+CIRCUIT_BREAKER_OPEN_SECONDS = int(os.getenv('CIRCUIT_BREAKER_OPEN_SECONDS', '30'))
+CIRCUIT_BREAKER_PROBES = int(os.getenv('CIRCUIT_BREAKER_PROBES', '1'))